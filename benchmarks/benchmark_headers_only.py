@@ -0,0 +1,98 @@
+"""
+This module benchmarks the headers-only fast path of the EmailAnalyzer class against the full parsing path.
+
+The sample emails from the assets directory are copied a number of times into a temporary directory, and the
+directory is analyzed with iter_metrics using both paths. The elapsed time, throughput and speedup are printed, and
+the metrics shared by both paths are checked to be identical.
+
+Usage:
+    python benchmarks/benchmark_headers_only.py --copies 200
+
+Author: S S R C Kashyap
+Email: 1kasyap97@gmail.com
+Reviewer: Daniel Caffrey
+Email: dcaffrey@topsec.com
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from email_analyzer import EmailAnalyzer  # noqa: E402
+
+ASSETS_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'assets')
+
+
+def build_scaled_corpus(target_directory: str, copies: int) -> int:
+    """
+    Copies every sample email of the assets directory into target_directory the given number of times.
+
+    Args:
+        target_directory (str): The directory receiving the copies.
+        copies (int): The number of copies of each sample email.
+
+    Returns:
+        int: The total size of the corpus in bytes.
+    """
+    total_size = 0
+    sample_files = [file for file in sorted(os.listdir(ASSETS_DIRECTORY)) if file.endswith('.eml')]
+    for copy_index in range(copies):
+        for sample_file in sample_files:
+            target_path = os.path.join(target_directory, f'{copy_index:06d}-{sample_file}')
+            shutil.copyfile(os.path.join(ASSETS_DIRECTORY, sample_file), target_path)
+            total_size += os.path.getsize(target_path)
+    return total_size
+
+
+def time_analysis(directory: str, headers_only: bool) -> tuple:
+    """
+    Analyzes a directory with iter_metrics and measures the elapsed time.
+
+    Args:
+        directory (str): The directory containing the email files.
+        headers_only (bool): Whether the headers-only fast path is used.
+
+    Returns:
+        tuple: An (elapsed_seconds, metrics) tuple, where metrics maps each file path to its metrics.
+    """
+    mail_analyzer = EmailAnalyzer(directory, headers_only=headers_only)
+    start_time = time.perf_counter()
+    metrics = {item['File Path']: item for item in mail_analyzer.iter_metrics()}
+    return time.perf_counter() - start_time, metrics
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    argument_parser.add_argument('--copies', type=int, default=200,
+                                 help='number of copies of each sample email in the benchmark corpus')
+    arguments = argument_parser.parse_args()
+
+    corpus_directory = tempfile.mkdtemp(prefix='email_analyzer_benchmark_')
+    try:
+        corpus_size = build_scaled_corpus(corpus_directory, arguments.copies)
+
+        full_seconds, full_metrics = time_analysis(corpus_directory, headers_only=False)
+        fast_seconds, fast_metrics = time_analysis(corpus_directory, headers_only=True)
+
+        for file_path, fast_item in fast_metrics.items():
+            full_item = full_metrics[file_path]
+            assert all(full_item[key] == value for key, value in fast_item.items()), file_path
+
+        message_count = len(full_metrics)
+        corpus_megabytes = corpus_size / (1024 * 1024)
+        print(f'Corpus: {message_count} emails, {corpus_megabytes:.1f} MB')
+        for label, seconds in (('full parse', full_seconds), ('headers-only', fast_seconds)):
+            print(f'{label:>14}: {seconds:8.3f}s  {message_count / seconds:10.1f} msg/s  '
+                  f'{corpus_megabytes / seconds:8.1f} MB/s')
+        print(f'{"speedup":>14}: {full_seconds / fast_seconds:8.1f}x')
+    finally:
+        shutil.rmtree(corpus_directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+This module benchmarks the cold start of the package, as paid by short-lived, per-file invocations.
+
+Every measurement runs in a fresh interpreter: the wall-clock time of a bare interpreter, of "import email_analyzer",
+and of headers-only and full command line runs ("python -m email_analyzer") on a single email of a deterministic
+synthetic corpus. The heavy optional modules (libmagic, asyncio, multiprocessing, sqlite3, pyarrow, ...) loaded by
+each run are reported as well, so a regression in the lazy loading of the package shows up in the JSON output.
+
+Usage:
+    python benchmarks/benchmark_import_time.py --runs 15 --output import_time.json
+
+Author: S S R C Kashyap
+Email: 1kasyap97@gmail.com
+Reviewer: Daniel Caffrey
+Email: dcaffrey@topsec.com
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from corpus_generator import generate_corpus
+
+PACKAGE_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The modules whose loading is reported, they are only needed by some of the features of the package
+HEAVY_MODULES = ('magic', 'asyncio', 'multiprocessing', 'concurrent.futures', 'sqlite3', 'csv', 'logging.handlers',
+                 'pyarrow')
+
+# Appended to the code of every run, prints the heavy modules loaded by the run on the standard error
+_LOADED_MODULES_PROBE = ("import sys, json; "
+                         f"print(json.dumps([name for name in {HEAVY_MODULES!r} if name in sys.modules]), "
+                         "file=sys.stderr)")
+
+
+def time_run(code: str, runs: int) -> dict:
+    """
+    Runs a snippet of Python code in fresh interpreters and measures their wall-clock time.
+
+    Args:
+        code (str): The code run by every interpreter, from the package directory.
+        runs (int): The number of interpreters started.
+
+    Returns:
+        dict: The median, minimum and maximum time of the runs in milliseconds, and the heavy modules loaded.
+    """
+    run_milliseconds = []
+    loaded_modules = []
+    for _ in range(runs):
+        start_time = time.perf_counter()
+        completed = subprocess.run([sys.executable, '-c', f'{code}\n{_LOADED_MODULES_PROBE}'], cwd=PACKAGE_DIRECTORY,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+        run_milliseconds.append((time.perf_counter() - start_time) * 1000)
+        loaded_modules = json.loads(completed.stderr.strip().splitlines()[-1])
+    return {'median_ms': round(statistics.median(run_milliseconds), 2),
+            'min_ms': round(min(run_milliseconds), 2),
+            'max_ms': round(max(run_milliseconds), 2),
+            'heavy_modules_loaded': loaded_modules}
+
+
+def run_benchmark(email_path: str, runs: int) -> dict:
+    """
+    Measures the cold start of the package and of its command line interface.
+
+    Args:
+        email_path (str): The email file analyzed by the command line runs.
+        runs (int): The number of interpreters started for every measurement.
+
+    Returns:
+        dict: The measurements, keyed by scenario.
+    """
+    # The command line interface is run in-process, as "python -m email_analyzer" would, without exiting before
+    # the loaded modules are reported
+    cli_run = "from email_analyzer.__main__ import main; main([{}{!r}])"
+    scenarios = {
+        'interpreter': 'pass',
+        'import_package': 'import email_analyzer',
+        'import_email_analyzer_class': 'from email_analyzer import EmailAnalyzer',
+        'cli_headers_only': cli_run.format("'--headers-only', ", email_path),
+        'cli_full_analysis': cli_run.format('', email_path),
+    }
+    return {scenario: time_run(code, runs) for scenario, code in scenarios.items()}
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    argument_parser.add_argument('--runs', type=int, default=15, help='number of interpreters started per scenario')
+    argument_parser.add_argument('--seed', type=int, default=42, help='seed of the generated email')
+    argument_parser.add_argument('--output', help='file receiving the JSON results, defaults to stdout')
+    arguments = argument_parser.parse_args()
+
+    corpus_directory = tempfile.mkdtemp(prefix='email_analyzer_import_benchmark_')
+    try:
+        generate_corpus(corpus_directory, messages=1, seed=arguments.seed)
+        email_path = os.path.join(corpus_directory, sorted(os.listdir(corpus_directory))[0])
+        results = {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'runs': arguments.runs,
+            'email_size': os.path.getsize(email_path),
+            'scenarios': run_benchmark(email_path, arguments.runs),
+        }
+    finally:
+        shutil.rmtree(corpus_directory)
+
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if arguments.output:
+        with open(arguments.output, 'w', encoding='utf-8') as output_file:
+            output_file.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""
+This module benchmarks every stage of the EmailAnalyzer pipeline on a deterministic synthetic corpus.
+
+A corpus is generated with corpus_generator (or an existing directory of .eml files is used), and the following
+stages are timed separately: get_email_from_path, parse_email, get_email_metrics and _identify_attachments (the
+latter is also part of get_email_metrics, it is timed alone on the decoded attachments of the corpus). The per-email
+latency of the streaming iter_metrics API is measured as well. The results (messages/sec, MB/sec, p50/p99 latency and
+peak RSS) are written as JSON, so the output of two releases can be diffed.
+
+Usage:
+    python benchmarks/benchmark_pipeline.py --messages 2000 --output bench_output.json
+    python benchmarks/benchmark_pipeline.py --corpus /path/to/eml/directory
+
+Author: S S R C Kashyap
+Email: 1kasyap97@gmail.com
+Reviewer: Daniel Caffrey
+Email: dcaffrey@topsec.com
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from email_analyzer import EmailAnalyzer  # noqa: E402
+from corpus_generator import add_corpus_arguments, corpus_options, generate_corpus  # noqa: E402
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """
+    Returns the value at the given fraction of a sorted list, using the nearest-rank method.
+
+    Args:
+        sorted_values (list): The values, sorted in ascending order.
+        fraction (float): The fraction, between 0 and 1.
+
+    Returns:
+        float: The percentile value, or 0.0 for an empty list.
+    """
+    if not sorted_values:
+        return 0.0
+    # The nearest rank is the smallest rank covering the fraction of the values, e.g. the 99th of 100 values for p99
+    rank = min(max(math.ceil(fraction * len(sorted_values)) - 1, 0), len(sorted_values) - 1)
+    return sorted_values[rank]
+
+
+def peak_rss_megabytes() -> float:
+    """
+    Returns the peak resident set size of the current process.
+
+    Returns:
+        float: The peak RSS in megabytes.
+    """
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes on Linux
+    return peak_rss / (1024 * 1024) if sys.platform == 'darwin' else peak_rss / 1024
+
+
+def stage_result(seconds: float, message_count: int, corpus_bytes: int) -> dict:
+    """
+    Builds the result of a timed stage.
+
+    Args:
+        seconds (float): The elapsed time of the stage.
+        message_count (int): The number of emails processed by the stage.
+        corpus_bytes (int): The number of bytes processed by the stage.
+
+    Returns:
+        dict: The elapsed time and the throughput of the stage.
+    """
+    return {'seconds': round(seconds, 6),
+            'messages_per_second': round(message_count / seconds, 2) if seconds else None,
+            'megabytes_per_second': round(corpus_bytes / (1024 * 1024) / seconds, 2) if seconds else None}
+
+
+def run_benchmark(corpus_directory: str) -> dict:
+    """
+    Runs every benchmark on a directory of .eml files.
+
+    Args:
+        corpus_directory (str): The directory containing the email files.
+
+    Returns:
+        dict: The benchmark results.
+    """
+    # Warm up the page cache and libmagic with a full analysis (libmagic is only loaded once an attachment type is
+    # detected), so the first stage is not penalized
+    for _ in EmailAnalyzer(corpus_directory).iter_metrics():
+        pass
+
+    mail_analyzer = EmailAnalyzer(corpus_directory)
+
+    start_time = time.perf_counter()
+    raw_emails = mail_analyzer.get_email_from_path()
+    read_seconds = time.perf_counter() - start_time
+
+    message_count = len(raw_emails)
+    corpus_bytes = sum(len(raw_email) for raw_email in raw_emails)
+
+    start_time = time.perf_counter()
+    parsed_emails = mail_analyzer.parse_email(raw_email=raw_emails)
+    parse_seconds = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    mail_analyzer.get_email_metrics(parsed_email=parsed_emails)
+    metrics_seconds = time.perf_counter() - start_time
+
+    attachment_payloads = [part.get_payload(decode=True) or b'' for parsed_email in parsed_emails
+                           for part in parsed_email.walk() if part.get_content_disposition() == 'attachment']
+    start_time = time.perf_counter()
+    for attachment_payload in attachment_payloads:
+        EmailAnalyzer._identify_attachments(attachment_payload)
+    identify_seconds = time.perf_counter() - start_time
+
+    del raw_emails, parsed_emails, mail_analyzer
+
+    latencies = []
+    streaming_analyzer = EmailAnalyzer(corpus_directory)
+    start_time = time.perf_counter()
+    previous_time = start_time
+    for _ in streaming_analyzer.iter_metrics():
+        current_time = time.perf_counter()
+        latencies.append(current_time - previous_time)
+        previous_time = current_time
+    streaming_seconds = time.perf_counter() - start_time
+    latencies.sort()
+
+    attachment_bytes = sum(len(attachment_payload) for attachment_payload in attachment_payloads)
+    return {
+        'corpus': {'messages': message_count,
+                   'bytes': corpus_bytes,
+                   'attachments': len(attachment_payloads)},
+        'stages': {'get_email_from_path': stage_result(read_seconds, message_count, corpus_bytes),
+                   'parse_email': stage_result(parse_seconds, message_count, corpus_bytes),
+                   'get_email_metrics': stage_result(metrics_seconds, message_count, corpus_bytes),
+                   '_identify_attachments': dict(stage_result(identify_seconds, len(attachment_payloads),
+                                                              attachment_bytes),
+                                                 attachments_per_second=round(len(attachment_payloads) /
+                                                                              identify_seconds, 2)
+                                                 if identify_seconds else None),
+                   'iter_metrics': stage_result(streaming_seconds, message_count, corpus_bytes)},
+        'latency_ms': {'p50': round(percentile(latencies, 0.50) * 1000, 3),
+                       'p99': round(percentile(latencies, 0.99) * 1000, 3),
+                       'max': round(latencies[-1] * 1000, 3) if latencies else 0.0},
+        'peak_rss_mb': round(peak_rss_megabytes(), 1),
+    }
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    argument_parser.add_argument('--corpus', help='existing directory of .eml files, instead of a generated corpus')
+    argument_parser.add_argument('--output', help='file receiving the JSON results, defaults to stdout')
+    add_corpus_arguments(argument_parser)
+    arguments = argument_parser.parse_args()
+
+    corpus_directory = arguments.corpus or tempfile.mkdtemp(prefix='email_analyzer_benchmark_')
+    try:
+        if not arguments.corpus:
+            generate_corpus(corpus_directory, **corpus_options(arguments))
+        results = run_benchmark(corpus_directory)
+    finally:
+        if not arguments.corpus:
+            shutil.rmtree(corpus_directory)
+
+    results['environment'] = {'python': platform.python_version(),
+                              'platform': platform.platform(),
+                              'cpu_count': os.cpu_count()}
+    if not arguments.corpus:
+        results['corpus']['options'] = corpus_options(arguments)
+
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if arguments.output:
+        with open(arguments.output, 'w', encoding='utf-8') as output_file:
+            output_file.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
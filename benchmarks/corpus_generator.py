@@ -0,0 +1,209 @@
+"""
+This module generates deterministic synthetic corpora of .eml files to benchmark the EmailAnalyzer class.
+
+The generated emails are controlled by the number of messages, the size of the text body, the number, size and type
+mix of the attachments, and the character sets used for the headers and bodies. The same arguments and seed always
+produce byte-identical corpora, so benchmark results can be compared across releases.
+
+Usage:
+    python benchmarks/corpus_generator.py /tmp/corpus --messages 1000 --body-size 4096 --max-attachments 3
+
+Author: S S R C Kashyap
+Email: 1kasyap97@gmail.com
+Reviewer: Daniel Caffrey
+Email: dcaffrey@topsec.com
+"""
+
+import argparse
+import io
+import os
+import random
+import zipfile
+from email.message import EmailMessage
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+# The attachment types that can be generated, mapped to their MIME type and file extension
+ATTACHMENT_TYPES = {'pdf': ('application', 'pdf', 'pdf'),
+                    'png': ('image', 'png', 'png'),
+                    'zip': ('application', 'zip', 'zip'),
+                    'csv': ('text', 'csv', 'csv'),
+                    'xls': ('application', 'vnd.ms-excel', 'xls'),
+                    'bin': ('application', 'octet-stream', 'bin')}
+
+# The character sets that can be used for the subjects and bodies, with sample text they can encode
+CHARSET_SAMPLES = {'us-ascii': 'Quarterly report and meeting notes',
+                   'utf-8': 'Rapport trimestriel – réunion ✓ 会議',
+                   'iso-8859-1': 'Grüße aus München, Señor',
+                   'koi8-r': 'Ежеквартальный отчёт',
+                   'shift_jis': '四半期報告書の送付'}
+
+# The date of the first generated email, the following emails are spread over the next year
+_FIRST_EMAIL_DATE = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _attachment_payload(generator: random.Random, attachment_type: str, size: int) -> bytes:
+    """
+    Builds an attachment payload of roughly the given size that libmagic detects as the requested type.
+
+    Args:
+        generator (random.Random): The random generator of the corpus.
+        attachment_type (str): One of the keys of ATTACHMENT_TYPES.
+        size (int): The approximate size of the payload in bytes.
+
+    Returns:
+        bytes: The attachment payload.
+    """
+    filler = generator.randbytes(size)
+    if attachment_type == 'pdf':
+        return b'%PDF-1.4\n' + filler + b'\n%%EOF\n'
+    elif attachment_type == 'png':
+        return b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR' + filler
+    elif attachment_type == 'zip':
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w', compression=zipfile.ZIP_STORED) as zip_file:
+            zip_file.writestr('data.bin', filler)
+        return archive.getvalue()
+    elif attachment_type == 'csv':
+        rows = max(size // 24, 1)
+        return ''.join(f'{row},{generator.randint(0, 10 ** 6)},{generator.random():.6f}\n'
+                       for row in range(rows)).encode('ascii')
+    elif attachment_type == 'xls':
+        return b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1' + filler
+    return filler
+
+
+def generate_email(generator: random.Random, index: int, body_size: int, max_attachments: int,
+                   attachment_size: int, attachment_types: list, charsets: list) -> bytes:
+    """
+    Generates a single synthetic email.
+
+    Args:
+        generator (random.Random): The random generator of the corpus.
+        index (int): The index of the email in the corpus, used for its Message-ID and date.
+        body_size (int): The approximate size of the text body in characters.
+        max_attachments (int): The maximum number of attachments, the actual number is drawn uniformly.
+        attachment_size (int): The approximate size of every attachment in bytes.
+        attachment_types (list): The attachment types to draw from, keys of ATTACHMENT_TYPES.
+        charsets (list): The character sets to draw from, keys of CHARSET_SAMPLES.
+
+    Returns:
+        bytes: The raw email content.
+    """
+    charset = generator.choice(charsets)
+    sample_text = CHARSET_SAMPLES[charset]
+
+    email_message = EmailMessage()
+    email_message['Subject'] = f'{sample_text} #{index}'
+    email_message['From'] = f'Sender {generator.randint(1, 500)} <sender{generator.randint(1, 500)}@example.com>'
+    email_message['To'] = f'recipient{generator.randint(1, 500)}@example.org'
+    email_message['Date'] = format_datetime(_FIRST_EMAIL_DATE + timedelta(minutes=index * 17))
+    email_message['Message-ID'] = f'<{index:08d}.{generator.getrandbits(48):012x}@corpus.example.com>'
+
+    body_lines = []
+    body_length = 0
+    while body_length < body_size:
+        line = f'{sample_text} {generator.randint(0, 10 ** 9)}'
+        body_lines.append(line)
+        body_length += len(line) + 1
+    email_message.set_content('\n'.join(body_lines) + '\n', charset=charset)
+
+    for attachment_index in range(generator.randint(0, max_attachments)):
+        attachment_type = generator.choice(attachment_types)
+        maintype, subtype, extension = ATTACHMENT_TYPES[attachment_type]
+        email_message.add_attachment(_attachment_payload(generator, attachment_type, attachment_size),
+                                     maintype=maintype, subtype=subtype,
+                                     filename=f'attachment-{index}-{attachment_index}.{extension}')
+
+    # The email package draws MIME boundaries from an unseeded generator, derive them from the corpus seed instead
+    if email_message.is_multipart():
+        email_message.set_boundary(f'=_corpus_{index:08d}_{generator.getrandbits(64):016x}')
+
+    return email_message.as_bytes()
+
+
+def generate_corpus(target_directory: str, messages: int = 1000, body_size: int = 4096, max_attachments: int = 2,
+                    attachment_size: int = 64 * 1024, attachment_types: list = None, charsets: list = None,
+                    seed: int = 0) -> int:
+    """
+    Generates a deterministic corpus of .eml files.
+
+    Args:
+        target_directory (str): The directory receiving the .eml files, created if it does not exist.
+        messages (int): The number of emails.
+        body_size (int): The approximate size of the text body of every email in characters.
+        max_attachments (int): The maximum number of attachments of an email.
+        attachment_size (int): The approximate size of every attachment in bytes.
+        attachment_types (list): The attachment types to draw from, defaults to every key of ATTACHMENT_TYPES.
+        charsets (list): The character sets to draw from, defaults to every key of CHARSET_SAMPLES.
+        seed (int): The seed of the random generator.
+
+    Returns:
+        int: The total size of the corpus in bytes.
+    """
+    generator = random.Random(seed)
+    attachment_types = attachment_types or list(ATTACHMENT_TYPES)
+    charsets = charsets or list(CHARSET_SAMPLES)
+    os.makedirs(target_directory, exist_ok=True)
+
+    total_size = 0
+    for index in range(messages):
+        raw_email = generate_email(generator, index, body_size, max_attachments, attachment_size,
+                                   attachment_types, charsets)
+        with open(os.path.join(target_directory, f'{index:08d}.eml'), 'wb') as email_file:
+            email_file.write(raw_email)
+        total_size += len(raw_email)
+    return total_size
+
+
+def add_corpus_arguments(argument_parser: argparse.ArgumentParser):
+    """
+    Adds the options controlling the generated corpus to an argument parser.
+
+    Args:
+        argument_parser (argparse.ArgumentParser): The argument parser.
+    """
+    argument_parser.add_argument('--messages', type=int, default=1000, help='number of emails')
+    argument_parser.add_argument('--body-size', type=int, default=4096, help='approximate body size in characters')
+    argument_parser.add_argument('--max-attachments', type=int, default=2, help='maximum attachments per email')
+    argument_parser.add_argument('--attachment-size', type=int, default=64 * 1024,
+                                 help='approximate size of every attachment in bytes')
+    argument_parser.add_argument('--attachment-types', default=','.join(ATTACHMENT_TYPES),
+                                 help=f'comma-separated attachment types among {", ".join(ATTACHMENT_TYPES)}')
+    argument_parser.add_argument('--charsets', default=','.join(CHARSET_SAMPLES),
+                                 help=f'comma-separated charsets among {", ".join(CHARSET_SAMPLES)}')
+    argument_parser.add_argument('--seed', type=int, default=0, help='seed of the random generator')
+
+
+def corpus_options(arguments: argparse.Namespace) -> dict:
+    """
+    Converts the parsed corpus options into keyword arguments of generate_corpus.
+
+    Args:
+        arguments (argparse.Namespace): The arguments parsed by a parser set up with add_corpus_arguments.
+
+    Returns:
+        dict: The keyword arguments of generate_corpus, except target_directory.
+    """
+    return {'messages': arguments.messages,
+            'body_size': arguments.body_size,
+            'max_attachments': arguments.max_attachments,
+            'attachment_size': arguments.attachment_size,
+            'attachment_types': arguments.attachment_types.split(','),
+            'charsets': arguments.charsets.split(','),
+            'seed': arguments.seed}
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    argument_parser.add_argument('target_directory', help='directory receiving the .eml files')
+    add_corpus_arguments(argument_parser)
+    arguments = argument_parser.parse_args()
+
+    total_size = generate_corpus(arguments.target_directory, **corpus_options(arguments))
+    print(f'Generated {arguments.messages} emails ({total_size / (1024 * 1024):.1f} MB) '
+          f'in {arguments.target_directory}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,46 @@
 # email_analyzer/__init__.py
 
-from .email_analyzer import EmailAnalyzer
+import importlib
+
+# The public names of the package, mapped to the modules defining them. A module is only imported when one of its
+# names is first used, so "import email_analyzer" stays cheap for short-lived processes: e.g. the asyncio front-end,
+# the process pool and libmagic are never loaded by a headers-only run.
+_LAZY_EXPORTS = {
+    'EmailAnalyzer': '.email_analyzer',
+    'AsyncEmailAnalyzer': '.async_email_analyzer',
+    'AnalyzerStats': '.instrumentation',
+    'configure_logging': '.log_config',
+    'shutdown_logging': '.log_config',
+    'EmailMetricsRecord': '.result_writers',
+    'create_metrics_writer': '.result_writers',
+    'EmailAnalysisEngine': '.engine',
+    'LazyEmailMessage': '.lazy_message',
+    'AnalysisLimits': '.analysis_limits',
+}
+
+__all__ = list(_LAZY_EXPORTS)
+
+
+def __getattr__(name: str):
+    """
+    Imports the module defining a public name of the package on first use, and caches the name in the package.
+
+    Args:
+        name (str): The name looked up in the package.
+
+    Returns:
+        The object bound to the name in its module.
+
+    Raises:
+        AttributeError: If the name is not a public name of the package.
+    """
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(__all__))
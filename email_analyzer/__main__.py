@@ -0,0 +1,198 @@
+"""
+Module: __main__.py
+
+This module provides the command line interface of the package, run with "python -m email_analyzer". It analyzes
+email files, directories of email files, mbox archives, Maildir directories or a single email read from the standard
+input, and streams the metrics of every email to the standard output or to a file, as NDJSON, CSV or Parquet records.
+
+Only the modules needed by the requested analysis are imported, so short-lived invocations (e.g. a headers-only check
+of a single file) do not pay for libmagic, the process pool or the Parquet writer.
+
+Usage:
+    python -m email_analyzer message.eml
+    python -m email_analyzer --headers-only --max-depth -1 /var/mail/inbox > metrics.ndjson
+    python -m email_analyzer --workers 8 --format parquet --output metrics.parquet /var/mail/archive.mbox
+    cat message.eml | python -m email_analyzer -
+
+Author: S S R C Kashyap
+Email: 1kasyap97@gmail.com
+Reviewer: Daniel Caffrey
+Email: dcaffrey@topsec.com
+"""
+
+import argparse
+import logging
+import os
+import sys
+from typing import TYPE_CHECKING, Iterator, List
+
+if TYPE_CHECKING:
+    from .email_analyzer import EmailAnalyzer
+
+# The path standing for the standard input on the command line
+STDIN_PATH = '-'
+
+
+def build_argument_parser() -> argparse.ArgumentParser:
+    """
+    Builds the parser of the command line arguments.
+
+    Returns:
+        argparse.ArgumentParser: The parser of the command line arguments.
+    """
+    argument_parser = argparse.ArgumentParser(
+        prog='python -m email_analyzer',
+        description='Analyzes emails and streams their metrics (Subject, Message-ID, From Address, size and '
+                    'attachments) as NDJSON, CSV or Parquet records.')
+    argument_parser.add_argument('paths', nargs='+', metavar='PATH',
+                                 help="email file, directory of email files, mbox archive or Maildir directory, "
+                                      f"'{STDIN_PATH}' reads a single email from the standard input")
+    argument_parser.add_argument('--workers', type=int, default=1,
+                                 help='number of worker processes analyzing the emails of a path (default: 1)')
+    argument_parser.add_argument('--unordered', action='store_true',
+                                 help='with several workers, write the metrics as soon as they are ready instead of '
+                                      'in file name order')
+    argument_parser.add_argument('--format', dest='output_format', choices=('ndjson', 'csv', 'parquet'),
+                                 default='ndjson', help='output format (default: ndjson)')
+    argument_parser.add_argument('--output', help='file receiving the metrics, defaults to the standard output')
+    argument_parser.add_argument('--chunk-size', type=int,
+                                 help='number of records buffered before they are written out (default: 1 on the '
+                                      'standard output, so the records are streamed, 1000 otherwise)')
+    argument_parser.add_argument('--headers-only', action='store_true',
+                                 help='only read the headers of the emails (attachment names and types are not '
+                                      'reported)')
+    argument_parser.add_argument('--no-type-detection', action='store_true',
+                                 help='do not detect the file types of the attachments with libmagic')
+    argument_parser.add_argument('--max-depth', type=int, default=0,
+                                 help='depth of the deepest sub-directories walked, -1 walks the whole tree '
+                                      '(default: 0)')
+    argument_parser.add_argument('--include', action='append', metavar='PATTERN',
+                                 help="glob pattern of the email files of a directory, may be repeated "
+                                      "(default: '*.eml')")
+    argument_parser.add_argument('--exclude', action='append', metavar='PATTERN', default=[],
+                                 help='glob pattern of the files and directories skipped, may be repeated')
+    argument_parser.add_argument('--log-level', choices=('DEBUG', 'INFO', 'WARNING', 'ERROR'),
+                                 help='write the records of the package logger at this level to the standard error')
+    return argument_parser
+
+
+def create_path_analyzer(path: str, arguments: argparse.Namespace) -> 'EmailAnalyzer':
+    """
+    Creates the analyzer of the emails found at a path.
+
+    Args:
+        path (str): The email file, directory, mbox archive or Maildir directory.
+        arguments (argparse.Namespace): The parsed command line arguments.
+
+    Returns:
+        EmailAnalyzer: The analyzer of the path, configured from the command line arguments.
+    """
+    from .email_analyzer import EmailAnalyzer
+    from .directory_walker import DEFAULT_INCLUDE_PATTERNS
+
+    return EmailAnalyzer(path, headers_only=arguments.headers_only,
+                         detect_attachment_types=not arguments.no_type_detection,
+                         include_patterns=arguments.include or DEFAULT_INCLUDE_PATTERNS,
+                         exclude_patterns=arguments.exclude,
+                         max_depth=None if arguments.max_depth < 0 else arguments.max_depth)
+
+
+def iter_path_metrics(mail_analyzer: 'EmailAnalyzer', arguments: argparse.Namespace) -> Iterator[dict]:
+    """
+    Analyzes the emails found at the path of an analyzer.
+
+    Args:
+        mail_analyzer (EmailAnalyzer): The analyzer created by create_path_analyzer.
+        arguments (argparse.Namespace): The parsed command line arguments.
+
+    Yields:
+        dict: The metrics of every email found at the path.
+    """
+    if arguments.workers > 1:
+        yield from mail_analyzer.analyze_parallel(max_workers=arguments.workers, ordered=not arguments.unordered)
+    else:
+        yield from mail_analyzer.iter_metrics()
+
+
+def analyze_stdin(arguments: argparse.Namespace) -> dict:
+    """
+    Analyzes a single raw email read from the standard input.
+
+    Args:
+        arguments (argparse.Namespace): The parsed command line arguments.
+
+    Returns:
+        dict: The metrics of the email, with STDIN_PATH as its 'File Path'.
+    """
+    from .engine import EmailAnalysisEngine
+
+    engine = EmailAnalysisEngine(headers_only=arguments.headers_only,
+                                 detect_attachment_types=not arguments.no_type_detection)
+    return engine.analyze_bytes(sys.stdin.buffer.read(), source_fields={'File Path': STDIN_PATH})
+
+
+def main(argv: List[str] = None) -> int:
+    """
+    Runs the command line interface.
+
+    Args:
+        argv (List[str]): The command line arguments, defaults to sys.argv[1:].
+
+    Returns:
+        int: The exit status: 0 on success, 1 if a path does not exist or is not a valid email path (e.g. a file
+            that is not an email, or a directory without email files).
+    """
+    argument_parser = build_argument_parser()
+    arguments = argument_parser.parse_args(argv)
+    if arguments.workers < 1:
+        argument_parser.error('--workers must be greater than or equal to 1')
+    if arguments.chunk_size is not None and arguments.chunk_size < 1:
+        argument_parser.error('--chunk-size must be greater than or equal to 1')
+    if arguments.output_format == 'parquet' and arguments.output is None:
+        argument_parser.error('--format parquet requires --output')
+    if arguments.paths.count(STDIN_PATH) > 1:
+        argument_parser.error(f"'{STDIN_PATH}' can only be given once")
+
+    if arguments.log_level:
+        from .log_config import configure_logging
+        configure_logging(level=getattr(logging, arguments.log_level))
+
+    from .result_writers import DEFAULT_CHUNK_SIZE, create_metrics_writer
+
+    chunk_size = arguments.chunk_size
+    if chunk_size is None:
+        # The records written to the standard output are streamed one by one, e.g. to a consumer reading a pipe
+        chunk_size = DEFAULT_CHUNK_SIZE if arguments.output else 1
+
+    exit_status = 0
+    metrics_writer = create_metrics_writer(arguments.output or sys.stdout, output_format=arguments.output_format,
+                                           chunk_size=chunk_size)
+    try:
+        with metrics_writer:
+            for path in arguments.paths:
+                if path == STDIN_PATH:
+                    metrics_writer.write(analyze_stdin(arguments))
+                elif not os.path.exists(path):
+                    print(f"email_analyzer: no such file or directory: '{path}'", file=sys.stderr)
+                    exit_status = 1
+                else:
+                    mail_analyzer = create_path_analyzer(path, arguments)
+                    metrics_writer.write_all(iter_path_metrics(mail_analyzer, arguments))
+                    # The analyzer logs an invalid path and yields no metrics, the error is reported here as well so
+                    # it is not mistaken for a path without emails
+                    if mail_analyzer.path_error is not None:
+                        print(f"email_analyzer: cannot analyze '{path}': {mail_analyzer.path_error}", file=sys.stderr)
+                        exit_status = 1
+    except BrokenPipeError:
+        # The consumer of the standard output went away (e.g. head): the remaining records are dropped, and the
+        # standard output is pointed at the null device so the interpreter does not fail flushing it on exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    finally:
+        if arguments.log_level:
+            from .log_config import shutdown_logging
+            shutdown_logging()
+    return exit_status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
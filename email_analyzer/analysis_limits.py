@@ -0,0 +1,238 @@
+"""
+Module: analysis_limits.py
+
+This module provides the AnalysisLimits class, holding the bounds on the resources the analysis of a single email
+may use: its size, the nesting depth and number of its MIME parts, the decoded size of its attachments and the time
+spent on it. It keeps a single malformed, huge or hostile email (e.g. a multipart bomb or an attachment decoding to
+gigabytes) from stalling a run or exhausting the memory of a worker.
+
+An email going over a limit raises a MessageLimitExceededError while it is analyzed. The analysis engine catches it,
+skips the rest of the analysis of the email, and flags the email in its metrics with the name of the limit, using
+flag_limit_exceeded (also used by the analyzers when an email file is over the size limit before it is even read).
+
+Author: S S R C Kashyap
+Email: 1kasyap97@gmail.com
+Reviewer: Daniel Caffrey
+Email: dcaffrey@topsec.com
+"""
+
+import time
+from typing import TYPE_CHECKING, Union
+
+# Importing custom exceptions from custom_email_analyzer_exceptions.py to raise proper exception messages
+from .custom_email_analyzer_exceptions import MessageLimitExceededError
+
+# importing the package logger from log_config.py to use the same logger instance across the package/s
+from .log_config import logger
+
+# The statistics object recording the errors is created by the callers enabling instrumentation, it is only imported
+# here for the type annotations
+if TYPE_CHECKING:
+    from .instrumentation import AnalyzerStats
+
+# The names of the limits, as reported in the 'Limit Exceeded' field of the metrics of an email
+LIMIT_NAMES = ('max_message_bytes', 'max_mime_depth', 'max_parts', 'max_attachment_bytes', 'time_budget')
+
+
+class AnalysisLimits:
+    """
+    AnalysisLimits holds the bounds on the resources used by the analysis of a single email. A limit set to None
+    is not enforced.
+
+    Attributes:
+        max_message_bytes (Union[int, None]): The maximum size in bytes of an email. Larger email files are not
+            even read.
+        max_mime_depth (Union[int, None]): The maximum nesting depth of the MIME parts of an email, the email
+            itself being at depth 0.
+        max_parts (Union[int, None]): The maximum number of MIME parts of an email, the email itself included.
+        max_attachment_bytes (Union[int, None]): The maximum total decoded size in bytes of the attachments of an
+            email. Attachments whose decoded size can be computed from their encoded form are checked before
+            they are decoded.
+        time_budget (Union[float, None]): The maximum number of seconds spent analyzing an email. The budget is
+            checked between MIME parts and attachments, a single step of the analysis is never interrupted.
+    """
+    def __init__(self, max_message_bytes: int = None, max_mime_depth: int = None, max_parts: int = None,
+                 max_attachment_bytes: int = None, time_budget: float = None):
+        """
+        Initializes the limits.
+
+        Args:
+            max_message_bytes (int): The maximum size in bytes of an email.
+            max_mime_depth (int): The maximum nesting depth of the MIME parts of an email.
+            max_parts (int): The maximum number of MIME parts of an email.
+            max_attachment_bytes (int): The maximum total decoded size in bytes of the attachments of an email.
+            time_budget (float): The maximum number of seconds spent analyzing an email.
+
+        Raises:
+            ValueError: If a limit is negative, or the time budget is not positive.
+        """
+        for limit_name, limit in (('max_message_bytes', max_message_bytes), ('max_mime_depth', max_mime_depth),
+                                  ('max_parts', max_parts), ('max_attachment_bytes', max_attachment_bytes)):
+            if limit is not None and limit < 0:
+                raise ValueError(f"{limit_name} must be None or greater than or equal to 0")
+        if time_budget is not None and time_budget <= 0:
+            raise ValueError("time_budget must be None or greater than 0")
+
+        self.max_message_bytes = max_message_bytes
+        self.max_mime_depth = max_mime_depth
+        self.max_parts = max_parts
+        self.max_attachment_bytes = max_attachment_bytes
+        self.time_budget = time_budget
+
+    def as_dict(self) -> dict:
+        """
+        Returns the limits as a dictionary keyed by LIMIT_NAMES, e.g. to identify the options of a metrics index.
+
+        Returns:
+            dict: The value of every limit, None for the limits that are not enforced.
+        """
+        return {limit_name: getattr(self, limit_name) for limit_name in LIMIT_NAMES}
+
+    def check_message_size(self, message_size: int):
+        """
+        Checks the size of an email against max_message_bytes.
+
+        Args:
+            message_size (int): The size in bytes of the email.
+
+        Raises:
+            MessageLimitExceededError: If the email is larger than max_message_bytes.
+        """
+        if self.max_message_bytes is not None and message_size > self.max_message_bytes:
+            raise MessageLimitExceededError(limit_name='max_message_bytes', limit=self.max_message_bytes,
+                                            value=message_size)
+
+    def start_message(self, message_size: int) -> 'MessageGuard':
+        """
+        Starts enforcing the limits on the analysis of an email.
+
+        Args:
+            message_size (int): The size in bytes of the email.
+
+        Returns:
+            MessageGuard: The guard tracking the resources used by the analysis of the email.
+
+        Raises:
+            MessageLimitExceededError: If the email is larger than max_message_bytes.
+        """
+        self.check_message_size(message_size)
+        return MessageGuard(self)
+
+    def __repr__(self):
+        limits = ', '.join(f'{limit_name}={limit!r}' for limit_name, limit in self.as_dict().items())
+        return f'AnalysisLimits({limits})'
+
+
+def flag_limit_exceeded(limit_error: MessageLimitExceededError, mail_item_metrics: dict,
+                        message_size: Union[int, None], stats: Union['AnalyzerStats', None] = None) -> dict:
+    """
+    Flags an email that went over one of the limits, instead of analyzing it.
+
+    Args:
+        limit_error (MessageLimitExceededError): The error raised by the exceeded limit.
+        mail_item_metrics (dict): The metrics identifying where the email comes from, completed in place.
+        message_size (Union[int, None]): The size in bytes of the raw email, if known.
+        stats (Union[AnalyzerStats, None]): The statistics recording the error, if any.
+
+    Returns:
+        dict: The completed mail_item_metrics dictionary, with the 'Total Message Size' and 'Limit Exceeded' fields.
+    """
+    logger.warning("Skipping email %s: %s", mail_item_metrics.get('File Path'), limit_error)
+    if stats is not None:
+        stats.record_error(limit_error)
+    mail_item_metrics['Total Message Size'] = message_size
+    mail_item_metrics['Limit Exceeded'] = limit_error.limit_name
+    return mail_item_metrics
+
+
+class MessageGuard:
+    """
+    MessageGuard tracks the resources used by the analysis of a single email, and raises a
+    MessageLimitExceededError as soon as one of its limits is exceeded. A guard is used by a single thread.
+
+    Attributes:
+        limits (AnalysisLimits): The enforced limits.
+        part_count (int): The number of MIME parts indexed so far.
+        attachment_bytes (int): The total decoded size of the attachments decoded so far.
+    """
+    __slots__ = ('limits', 'part_count', 'attachment_bytes', '_start_time')
+
+    def __init__(self, limits: AnalysisLimits):
+        """
+        Initializes the guard, the time budget of the email starts running.
+
+        Args:
+            limits (AnalysisLimits): The enforced limits.
+        """
+        self.limits = limits
+        self.part_count = 0
+        self.attachment_bytes = 0
+        self._start_time: float = time.perf_counter()
+
+    def check_time(self):
+        """
+        Checks the time spent on the email against the time budget.
+
+        Raises:
+            MessageLimitExceededError: If the time budget of the email is spent.
+        """
+        time_budget = self.limits.time_budget
+        if time_budget is not None:
+            elapsed_seconds = time.perf_counter() - self._start_time
+            if elapsed_seconds > time_budget:
+                raise MessageLimitExceededError(limit_name='time_budget', limit=time_budget,
+                                                value=round(elapsed_seconds, 6))
+
+    def check_part(self, depth: int):
+        """
+        Counts a MIME part of the email, before it is indexed.
+
+        Args:
+            depth (int): The nesting depth of the part.
+
+        Raises:
+            MessageLimitExceededError: If the part is nested too deeply, the email has too many parts, or the time
+                budget of the email is spent.
+        """
+        self.part_count += 1
+        limits = self.limits
+        if limits.max_mime_depth is not None and depth > limits.max_mime_depth:
+            raise MessageLimitExceededError(limit_name='max_mime_depth', limit=limits.max_mime_depth, value=depth)
+        if limits.max_parts is not None and self.part_count > limits.max_parts:
+            raise MessageLimitExceededError(limit_name='max_parts', limit=limits.max_parts, value=self.part_count)
+        self.check_time()
+
+    def check_attachment(self, decoded_size: Union[int, None]):
+        """
+        Checks the expected decoded size of an attachment before it is decoded.
+
+        Args:
+            decoded_size (Union[int, None]): The decoded size of the attachment, if it can be computed without
+                decoding it.
+
+        Raises:
+            MessageLimitExceededError: If the attachments would go over max_attachment_bytes, or the time budget of
+                the email is spent.
+        """
+        max_attachment_bytes = self.limits.max_attachment_bytes
+        if max_attachment_bytes is not None and decoded_size is not None and \
+                self.attachment_bytes + decoded_size > max_attachment_bytes:
+            raise MessageLimitExceededError(limit_name='max_attachment_bytes', limit=max_attachment_bytes,
+                                            value=self.attachment_bytes + decoded_size)
+        self.check_time()
+
+    def add_attachment(self, decoded_size: int):
+        """
+        Counts the decoded size of an attachment, once it is known.
+
+        Args:
+            decoded_size (int): The decoded size of the attachment.
+
+        Raises:
+            MessageLimitExceededError: If the attachments went over max_attachment_bytes.
+        """
+        self.attachment_bytes += decoded_size
+        max_attachment_bytes = self.limits.max_attachment_bytes
+        if max_attachment_bytes is not None and self.attachment_bytes > max_attachment_bytes:
+            raise MessageLimitExceededError(limit_name='max_attachment_bytes', limit=max_attachment_bytes,
+                                            value=self.attachment_bytes)
@@ -0,0 +1,227 @@
+"""
+Module: async_email_analyzer.py
+
+This module provides the AsyncEmailAnalyzer class, an asyncio front-end of the EmailAnalyzer class meant for emails
+stored on slow or networked storage (NFS, object-store backed mounts, ...), where the latency of opening and reading
+every file dominates the analysis time. Up to a configurable number of files are read concurrently on a thread pool,
+and the CPU-bound parsing is handed to an executor, so the event loop is never blocked and the analyzer can be
+embedded in an asyncio service.
+
+Author: S S R C Kashyap
+Email: 1kasyap97@gmail.com
+Reviewer: Daniel Caffrey
+Email: dcaffrey@topsec.com
+"""
+
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+from typing import AsyncIterator, Callable, Iterable, Union
+
+from .analysis_limits import AnalysisLimits, flag_limit_exceeded
+from .custom_email_analyzer_exceptions import MessageLimitExceededError
+from .directory_walker import DEFAULT_INCLUDE_PATTERNS, SYMLINKS_FILES
+from .email_analyzer import EmailAnalyzer, _init_parallel_worker, _analyze_raw_email_in_worker
+from .instrumentation import AnalyzerStats
+
+
+class AsyncEmailAnalyzer:
+    """
+    AsyncEmailAnalyzer analyzes the email(s) found at a path with asyncio, overlapping the reads of the email files.
+
+    The emails are located by an EmailAnalyzer instance, so the same inputs are supported (single email files,
+    directories of EML files, mbox archives and Maildir directories), and the same metrics are produced. The
+    persistent metrics index of the EmailAnalyzer class is not supported.
+
+    Attributes:
+        email_file_path (str): The path to the email file, directory, mbox archive or Maildir directory.
+        concurrency (int): The maximum number of emails being read or parsed at the same time.
+    """
+    def __init__(self, email_file_path: str, concurrency: int = 16, parse_workers: int = 0,
+                 file_reader: Callable[[tuple], bytes] = None, headers_only: bool = False,
+                 detect_attachment_types: bool = True, deduplicate: bool = False, dedup_cache_size: int = 4096,
+                 collect_stats: bool = False, include_patterns: Iterable[str] = DEFAULT_INCLUDE_PATTERNS,
+                 exclude_patterns: Iterable[str] = (), max_depth: Union[int, None] = 0,
+                 symlink_policy: str = SYMLINKS_FILES, limits: AnalysisLimits = None):
+        """
+        Initializes the AsyncEmailAnalyzer class with the provided email_file_path.
+
+        Args:
+            email_file_path (str): The path to the email file, directory, mbox archive or Maildir directory.
+            concurrency (int): The maximum number of emails being read or parsed at the same time, i.e. the I/O
+                queue depth of the analyzer.
+            parse_workers (int): The number of worker processes parsing the emails. If 0, the emails are parsed
+                one at a time on a single background thread, which keeps the event loop responsive but does not
+                use more than one core.
+            file_reader (Callable[[tuple], bytes]): The blocking function reading an email, given the
+                (file_path, offset, length) tuple locating it. Defaults to the reader of the EmailAnalyzer class,
+                it can be replaced to read from another storage or to simulate a slow file system.
+            headers_only (bool): The headers_only option of the EmailAnalyzer class.
+            detect_attachment_types (bool): The detect_attachment_types option of the EmailAnalyzer class.
+            deduplicate (bool): The deduplicate option of the EmailAnalyzer class.
+            dedup_cache_size (int): The dedup_cache_size option of the EmailAnalyzer class.
+            collect_stats (bool): The collect_stats option of the EmailAnalyzer class. The time spent reading is
+                not recorded, as the reads overlap each other.
+            include_patterns (Iterable[str]): The include_patterns option of the EmailAnalyzer class.
+            exclude_patterns (Iterable[str]): The exclude_patterns option of the EmailAnalyzer class.
+            max_depth (Union[int, None]): The max_depth option of the EmailAnalyzer class.
+            symlink_policy (str): The symlink_policy option of the EmailAnalyzer class.
+            limits (AnalysisLimits): The limits option of the EmailAnalyzer class. With the default file_reader,
+                email files over the size limit are not read, custom readers are checked once the email is read.
+
+        Raises:
+            ValueError: If concurrency is lower than 1 or parse_workers is lower than 0, or if a directory
+                walking option is invalid.
+        """
+        if concurrency < 1 or parse_workers < 0:
+            raise ValueError("concurrency must be greater than or equal to 1 and parse_workers must not be negative")
+
+        self.email_file_path = email_file_path
+        self.concurrency = concurrency
+        self._parse_workers = parse_workers
+        self._email_analyzer = EmailAnalyzer(email_file_path, headers_only=headers_only,
+                                             detect_attachment_types=detect_attachment_types,
+                                             deduplicate=deduplicate, dedup_cache_size=dedup_cache_size,
+                                             collect_stats=collect_stats, include_patterns=include_patterns,
+                                             exclude_patterns=exclude_patterns, max_depth=max_depth,
+                                             symlink_policy=symlink_policy, limits=limits)
+        self._file_reader = file_reader or self._read_email_source
+
+    def _create_parse_executor(self) -> Executor:
+        """
+        Creates the executor parsing the emails.
+
+        Returns:
+            Executor: A process pool of parse_workers processes, or a single thread if parse_workers is 0.
+        """
+        if self._parse_workers:
+            return ProcessPoolExecutor(max_workers=self._parse_workers, initializer=_init_parallel_worker,
+                                       initargs=(self.email_file_path, self._email_analyzer._analyzer_options))
+        return ThreadPoolExecutor(max_workers=1, thread_name_prefix='email_analyzer_parse')
+
+    async def iter_metrics(self) -> AsyncIterator[dict]:
+        """
+        Streams the metrics of the email(s) found at the given path, in the order in which they are completed.
+
+        At most `concurrency` emails are in flight at any time: their files are read on a thread pool, then they
+        are parsed on the parse executor, and their metrics are yielded as soon as they are ready. Once the run
+        is finished, its summary is available through get_directory_report().
+
+        Yields:
+            dict: The metrics of one email, with the same fields as the metrics yielded by
+            EmailAnalyzer.iter_metrics.
+        """
+        loop = asyncio.get_running_loop()
+        email_analyzer = self._email_analyzer
+
+        start_time = time.perf_counter()
+        processed_count = 0
+        run_trackers = email_analyzer._create_run_trackers()
+        pending_tasks = set()
+
+        read_executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='email_analyzer_read')
+        parse_executor = self._create_parse_executor()
+        try:
+            # Listing the emails touches the file system too, so it is also kept off the event loop
+            await loop.run_in_executor(read_executor, email_analyzer._path_checker)
+            email_sources = email_analyzer._iter_email_sources()
+
+            while True:
+                # Top up the in-flight emails until the concurrency limit is reached
+                free_slots = self.concurrency - len(pending_tasks)
+                if free_slots:
+                    new_sources = await loop.run_in_executor(read_executor, list, islice(email_sources, free_slots))
+                    for email_source in new_sources:
+                        pending_tasks.add(asyncio.ensure_future(
+                            self._analyze_email_source(email_source, read_executor, parse_executor)))
+
+                if not pending_tasks:
+                    break
+
+                done_tasks, pending_tasks = await asyncio.wait(pending_tasks, return_when=asyncio.FIRST_COMPLETED)
+                for done_task in done_tasks:
+                    mail_item_metrics = done_task.result()
+                    for run_tracker in run_trackers:
+                        run_tracker.add(mail_item_metrics)
+                    yield mail_item_metrics
+                    processed_count += 1
+        finally:
+            for pending_task in pending_tasks:
+                pending_task.cancel()
+            read_executor.shutdown(wait=False, cancel_futures=True)
+            parse_executor.shutdown(wait=False, cancel_futures=True)
+            email_analyzer._close_mbox_readers()
+            email_analyzer._update_directory_report(processed_count=processed_count, start_time=start_time,
+                                                    workers=self._parse_workers or 1, run_trackers=run_trackers)
+
+    def _read_email_source(self, email_source: tuple) -> bytes:
+        """
+        Reads an email with the reader of the EmailAnalyzer class, once its size is checked against the size limit.
+
+        Args:
+            email_source (tuple): The (file_path, offset, length) tuple locating the email.
+
+        Returns:
+            bytes: The raw email content.
+
+        Raises:
+            MessageLimitExceededError: If the email is larger than the max_message_bytes limit.
+        """
+        self._email_analyzer._check_email_source_size(email_source)
+        return self._email_analyzer._read_email_source(email_source)
+
+    async def _analyze_email_source(self, email_source: tuple, read_executor: Executor,
+                                    parse_executor: Executor) -> dict:
+        """
+        Reads an email on the read executor, then parses it and extracts its metrics on the parse executor.
+
+        Args:
+            email_source (tuple): The (file_path, offset, length) tuple locating the email.
+            read_executor (Executor): The executor running the blocking reads.
+            parse_executor (Executor): The executor running the CPU-bound parsing.
+
+        Returns:
+            dict: The metrics of the email.
+        """
+        loop = asyncio.get_running_loop()
+        file_path, offset, _ = email_source
+        mail_item_metrics = {'File Path': file_path}
+        if offset is not None:
+            mail_item_metrics['Message Offset'] = offset
+
+        try:
+            raw_email = await loop.run_in_executor(read_executor, self._file_reader, email_source)
+        except MessageLimitExceededError as limit_error:
+            # Email files over the size limit are flagged without being read
+            return flag_limit_exceeded(limit_error, mail_item_metrics, limit_error.value, self.stats)
+
+        if self._parse_workers:
+            mail_item_metrics, worker_stats, parse_error = await loop.run_in_executor(
+                parse_executor, _analyze_raw_email_in_worker, raw_email, mail_item_metrics)
+            if worker_stats is not None:
+                self.stats.merge(worker_stats)
+            if parse_error is not None:
+                raise parse_error
+            return mail_item_metrics
+        return await loop.run_in_executor(parse_executor, self._email_analyzer._analyze_raw_email, raw_email,
+                                          mail_item_metrics)
+
+    @property
+    def stats(self) -> Union[AnalyzerStats, None]:
+        """
+        The instrumentation statistics of the analyses of this instance, as described in EmailAnalyzer.stats.
+
+        Returns:
+            Union[AnalyzerStats, None]: The statistics, or None if collect_stats is False.
+        """
+        return self._email_analyzer.stats
+
+    def get_directory_report(self) -> dict:
+        """
+        Returns the summary of the last iter_metrics run, as described in EmailAnalyzer.get_directory_report.
+
+        Returns:
+            dict: The summary of the last run, or an empty dictionary if no run has finished yet.
+        """
+        return self._email_analyzer.get_directory_report()
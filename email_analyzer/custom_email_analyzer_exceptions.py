@@ -2,8 +2,9 @@
 Module: custom_email_analyzer_exceptions.py
 
 This module defines custom exception classes for the email_analyzer module. These exceptions provide
-specific error messages related to email file path validation and attachment processing. The logger
-from the log_config module is used to log error messages.
+specific error messages related to email file path validation and attachment processing. The exceptions do not
+log anything themselves, the code handling them decides whether and how they are logged, so every error is logged
+once.
 
 Author: S S R C Kashyap
 Email: 1kasyap97@gmail.com
@@ -11,8 +12,6 @@ Reviewer: Daniel Caffrey
 Email: dcaffrey@topsec.com
 """
 
-from .log_config import logger
-
 
 class InvalidPathError(Exception):
     """
@@ -22,7 +21,6 @@ class InvalidPathError(Exception):
         if message is None:
             message = f"Invalid path: '{path}'. Please check the provided path and ensure it is in the correct format " \
                       f"'/path_to_file/filename.eml'"
-        logger.error(message)
         super().__init__(message)
 
 
@@ -33,7 +31,6 @@ class NotEmailFileError(Exception):
     def __init__(self, file_path: str, message: str = None):
         if message is None:
             message = f"Invalid email file path: '{file_path}'. Provided file is not an email file (.eml)"
-        logger.error(message)
         super().__init__(message)
 
 
@@ -44,7 +41,6 @@ class NoEmailFilesInDirectoryError(Exception):
     def __init__(self, directory_path: str, message: str = None):
         if message is None:
             message = f"Invalid path: '{directory_path}'. Directory does not contain any EML files."
-        logger.error(message)
         super().__init__(message)
 
 
@@ -55,5 +51,26 @@ class AttachmentProcessingError(Exception):
     def __init__(self, attachment_name: str, message: str = None):
         if message is None:
             message = f"Error processing attachment '{attachment_name}'. Please check the file and try again."
-        logger.error(message)
         super().__init__(message)
+
+
+class MessageLimitExceededError(Exception):
+    """
+    MessageLimitExceededError is raised when the analysis of an email goes over one of its AnalysisLimits.
+
+    Attributes:
+        limit_name (str): The name of the exceeded limit, e.g. 'max_parts'.
+        limit (Union[int, float]): The value of the exceeded limit.
+        value (Union[int, float]): The value that went over the limit.
+    """
+    def __init__(self, limit_name: str, limit, value, message: str = None):
+        if message is None:
+            message = f"Email skipped: {limit_name} limit exceeded ({value} > {limit})"
+        super().__init__(message)
+        self.limit_name = limit_name
+        self.limit = limit
+        self.value = value
+
+    def __reduce__(self):
+        # The exception is rebuilt from its constructor arguments when it is sent back by a worker process
+        return self.__class__, (self.limit_name, self.limit, self.value, str(self))
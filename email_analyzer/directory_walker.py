@@ -0,0 +1,190 @@
+"""
+Module: directory_walker.py
+
+This module provides the DirectoryWalker class, used by the EmailAnalyzer class to find the email files of a
+directory tree in a single os.scandir pass, and the iter_prefetched helper, used to read the email files ahead of
+their analysis on a few background threads.
+
+The walker descends into sub-directories up to a maximum depth, keeps the files matching the include patterns and
+not matching the exclude patterns, and follows symbolic links according to a symlink policy. It yields the file
+paths as they are found, so the enumeration of very large trees never has to complete before the analysis starts.
+
+Author: S S R C Kashyap
+Email: 1kasyap97@gmail.com
+Reviewer: Daniel Caffrey
+Email: dcaffrey@topsec.com
+"""
+
+import os
+from collections import deque
+from fnmatch import fnmatch
+from typing import Any, Callable, Iterable, Iterator, Tuple, Union
+
+# importing the package logger from log_config.py to use the same logger instance across the package/s
+from .log_config import logger
+
+# The patterns of the email files found by default
+DEFAULT_INCLUDE_PATTERNS = ('*.eml',)
+
+# The symlink policies: symbolic links are never followed, only followed to files, or followed to files and
+# directories (each directory being visited once, so symlink loops are not an issue)
+SYMLINKS_IGNORE = 'ignore'
+SYMLINKS_FILES = 'files'
+SYMLINKS_FOLLOW = 'follow'
+SYMLINK_POLICIES = (SYMLINKS_IGNORE, SYMLINKS_FILES, SYMLINKS_FOLLOW)
+
+
+def _matches_any(patterns: Tuple[str, ...], name: str, relative_path: str) -> bool:
+    """
+    Checks if a file or directory matches any of the given glob patterns.
+
+    Patterns containing a '/' are matched against the path relative to the walked directory, the other patterns are
+    matched against the name of the file or directory.
+
+    Args:
+        patterns (Tuple[str, ...]): The glob patterns, e.g. '*.eml' or '2023/*/*.eml'.
+        name (str): The name of the file or directory.
+        relative_path (str): The path of the file or directory relative to the walked directory, with '/' separators.
+
+    Returns:
+        bool: True if any pattern matches, False otherwise.
+    """
+    return any(fnmatch(relative_path if '/' in pattern else name, pattern) for pattern in patterns)
+
+
+class DirectoryWalker:
+    """
+    DirectoryWalker finds the files of a directory tree matching glob patterns, using os.scandir.
+
+    Attributes:
+        root_path (str): The path of the walked directory.
+        include_patterns (Tuple[str, ...]): The glob patterns of the files that are yielded.
+        exclude_patterns (Tuple[str, ...]): The glob patterns of the files and directories that are skipped.
+        max_depth (Union[int, None]): The depth of the deepest sub-directories walked, None for no limit.
+        symlink_policy (str): One of SYMLINK_POLICIES.
+    """
+    def __init__(self, root_path: str, include_patterns: Iterable[str] = DEFAULT_INCLUDE_PATTERNS,
+                 exclude_patterns: Iterable[str] = (), max_depth: Union[int, None] = None,
+                 symlink_policy: str = SYMLINKS_FILES):
+        """
+        Initializes the walker.
+
+        Args:
+            root_path (str): The path of the walked directory.
+            include_patterns (Iterable[str]): The glob patterns of the files that are yielded.
+            exclude_patterns (Iterable[str]): The glob patterns of the files and directories that are skipped, the
+                files of an excluded directory are never listed.
+            max_depth (Union[int, None]): The depth of the deepest sub-directories walked: 0 only lists the files
+                of root_path, 1 also lists the files of its sub-directories, and so on. None walks the whole tree.
+            symlink_policy (str): SYMLINKS_IGNORE skips every symbolic link, SYMLINKS_FILES follows the links to
+                files but not the links to directories, and SYMLINKS_FOLLOW follows both.
+
+        Raises:
+            ValueError: If max_depth is negative or symlink_policy is not one of SYMLINK_POLICIES.
+        """
+        if max_depth is not None and max_depth < 0:
+            raise ValueError("max_depth must be None or greater than or equal to 0")
+        if symlink_policy not in SYMLINK_POLICIES:
+            raise ValueError(f"symlink_policy must be one of: {', '.join(SYMLINK_POLICIES)}")
+
+        self.root_path = root_path
+        self.include_patterns = tuple(include_patterns)
+        self.exclude_patterns = tuple(exclude_patterns)
+        self.max_depth = max_depth
+        self.symlink_policy = symlink_policy
+
+    def __iter__(self) -> Iterator[str]:
+        return self.iter_files()
+
+    def iter_files(self) -> Iterator[str]:
+        """
+        Walks the directory tree depth-first and yields the matching files as they are found.
+
+        The files of a directory are yielded in the order os.scandir lists them, and its sub-directories are walked
+        in name order once all its files are yielded. Directories that cannot be listed are logged and skipped.
+
+        Yields:
+            str: The path of a matching file.
+        """
+        follow_directory_links = self.symlink_policy == SYMLINKS_FOLLOW
+        # The (device, inode) pairs of the walked directories, only needed when directory links are followed
+        visited_directories = set()
+        if follow_directory_links:
+            root_stat = os.stat(self.root_path)
+            visited_directories.add((root_stat.st_dev, root_stat.st_ino))
+
+        # The directories left to walk, as (path, path relative to the root, depth) tuples
+        pending_directories = [(self.root_path, '', 0)]
+        while pending_directories:
+            directory_path, relative_directory, depth = pending_directories.pop()
+            sub_directories = []
+            try:
+                with os.scandir(directory_path) as entries:
+                    for entry in entries:
+                        if self.symlink_policy == SYMLINKS_IGNORE and entry.is_symlink():
+                            continue
+                        relative_path = relative_directory + entry.name
+
+                        if entry.is_dir(follow_symlinks=follow_directory_links):
+                            if (self.max_depth is not None and depth >= self.max_depth) or \
+                                    _matches_any(self.exclude_patterns, entry.name, relative_path):
+                                continue
+                            if follow_directory_links:
+                                entry_stat = entry.stat()
+                                if (entry_stat.st_dev, entry_stat.st_ino) in visited_directories:
+                                    continue
+                                visited_directories.add((entry_stat.st_dev, entry_stat.st_ino))
+                            sub_directories.append((entry.path, relative_path + '/', depth + 1))
+
+                        elif entry.is_file() and _matches_any(self.include_patterns, entry.name, relative_path) \
+                                and not _matches_any(self.exclude_patterns, entry.name, relative_path):
+                            yield entry.path
+            except OSError as err:
+                if depth == 0:
+                    raise
+                logger.warning("Skipping directory that cannot be listed: %s", err)
+
+            # The stack is last in, first out, so the sub-directories are pushed in reverse name order
+            pending_directories.extend(sorted(sub_directories, reverse=True))
+
+
+def iter_prefetched(items: Iterable[Any], read_item: Callable[[Any], Any], prefetch: int) -> Iterator[tuple]:
+    """
+    Reads the items of an iterable ahead of their consumption, on a pool of background threads.
+
+    While an item is consumed, the reads of the next prefetch items are already submitted, in flight or completed,
+    so at most prefetch + 1 items are held in memory whatever the number of items. The items are yielded in their
+    original order.
+
+    Args:
+        items (Iterable[Any]): The items to read, e.g. email sources.
+        read_item (Callable[[Any], Any]): The blocking function reading an item.
+        prefetch (int): The number of items read ahead of the item being consumed, e.g. 1 reads the next item
+            while the current one is consumed. If lower than 1, the items are read one at a time by the consuming
+            thread.
+
+    Yields:
+        tuple: An (item, data) tuple, data being the value returned by read_item for the item.
+    """
+    if prefetch < 1:
+        for item in items:
+            yield item, read_item(item)
+        return
+
+    # The thread pool is only imported when files are actually prefetched
+    from concurrent.futures import ThreadPoolExecutor
+    executor = ThreadPoolExecutor(max_workers=prefetch, thread_name_prefix='email_analyzer_prefetch')
+    pending_reads = deque()
+    try:
+        for item in items:
+            pending_reads.append((item, executor.submit(read_item, item)))
+            # The read of the next item is submitted before the oldest one is yielded, so prefetch reads remain
+            # ahead of the item being consumed
+            if len(pending_reads) > prefetch:
+                item, future = pending_reads.popleft()
+                yield item, future.result()
+        while pending_reads:
+            item, future = pending_reads.popleft()
+            yield item, future.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
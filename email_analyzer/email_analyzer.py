@@ -18,49 +18,167 @@ which indicates if any attachments exist in the message.'
 """
 
 # Import Statements
+import mmap
 import os
+import time
+from collections import deque
+from itertools import chain, islice
+from contextlib import contextmanager, ExitStack
 from email.message import Message
-from email.parser import Parser
 from pathlib import Path
 
 # Importing Union and List from the typing module to provide type hints for functions that can return multiple types
-from typing import Union, List
-
-# Importing python-magic module's to identify the attachment file-type from the email attachments
-import magic
+from typing import IO, TYPE_CHECKING, Union, List, Iterable, Iterator
+from weakref import WeakKeyDictionary
 
 # Importing custom exceptions from custom_email_analyzer_exceptions.py to raise proper exception messages
 from .custom_email_analyzer_exceptions import InvalidPathError, NotEmailFileError, NoEmailFilesInDirectoryError, \
-    AttachmentProcessingError
+    MessageLimitExceededError
+
+# Importing the limits bounding the resources used by the analysis of a single email
+from .analysis_limits import AnalysisLimits, flag_limit_exceeded
+
+# Importing the recursive directory walker finding the email files, and the read-ahead helper used to prefetch them
+from .directory_walker import DirectoryWalker, iter_prefetched, DEFAULT_INCLUDE_PATTERNS, SYMLINKS_FILES
+
+# Importing the mbox and Maildir readers used to analyze mailbox archives in place
+from .mailbox_sources import MboxReader, is_mbox_file, is_maildir, iter_maildir_message_paths
 
-# importing the initialized logger from log_config.py to use the same logger instance across the package/s
-from .log_config import logger
+# The following modules are imported by the code paths using them, so importing this module stays cheap and every
+# run only loads what it needs:
+# - the stateless engine extracting the metrics of every email (by the constructor), its email policy and libmagic
+#   settings remain importable from this module (see __getattr__)
+# - the statistics object recording the stage timings, volumes and errors (when instrumentation is enabled)
+# - the size and duplicate trackers aggregating the metrics of a run into the directory report (by
+#   _create_run_trackers, hashlib being only loaded by the runs detecting duplicates)
+# - the persistent metrics index used to skip unchanged email files on repeated scans (by _open_metrics_index, so
+#   json and sqlite3 are only loaded by the runs using an index)
+# - the chunked NDJSON, CSV and Parquet writers used to export the metrics of a run (by export_metrics)
+if TYPE_CHECKING:
+    from .instrumentation import AnalyzerStats
+    from .metrics_index import MetricsIndex
+
+# importing the package logger from log_config.py to use the same logger instance across the package/s
+from .log_config import logger, _restart_logging_in_worker
+
+# Email files of at least this size are memory-mapped instead of being read
+MMAP_THRESHOLD = 1024 * 1024
 
 
 class EmailAnalyzer:
     """
     EmailAnalyzer is a class for analyzing and extracting information from email files (EML format).
 
-    It can handle single email files or a directory containing multiple email files. The class provides methods
+    It can handle single email files, a directory containing multiple email files, mbox archives and Maildir
+    directories. The class provides methods
     to get the email file from the path provided and read the email contents, parse email headers and body, and
-    extract metrics such as subject, sender, attachments, etc.
+    extract metrics such as subject, sender, attachments, etc. The analysis of every email is delegated to an
+    EmailAnalysisEngine, which can also be used on its own to analyze raw emails that are not stored in files.
 
     Attributes:
-        email_file_path (str): The path to the email file or directory containing email files.
+        email_file_path (str): The path to the email file, directory containing email files, mbox archive or
+            Maildir directory.
+        headers_only (bool): Whether iter_metrics and analyze_parallel use the headers-only fast path.
+        detect_attachment_types (bool): Whether the attachment payloads are decoded to detect their file type.
+        index_path (str): The path of the persistent metrics index, if any.
+        use_content_hash (bool): Whether the metrics index validates changed files by their content hash.
+        deduplicate (bool): Whether identical emails and attachments are detected and analyzed only once.
+        dedup_cache_size (int): The number of entries of the deduplication LRU caches.
+        stats (AnalyzerStats): The statistics of the analyses of this instance, or None if collect_stats is False.
+        prefetch (int): The number of email files read ahead of their analysis by iter_metrics and
+            get_email_from_path.
+        path_error (Exception): The error raised by the validation of the path by the last analysis, or None if
+            the path was valid. The error is logged and no metrics are produced for an invalid path.
     """
-    def __init__(self, email_file_path: str):
+    def __init__(self, email_file_path: str, headers_only: bool = False, detect_attachment_types: bool = True,
+                 index_path: str = None, use_content_hash: bool = False, deduplicate: bool = False,
+                 dedup_cache_size: int = 4096, collect_stats: bool = False,
+                 include_patterns: Iterable[str] = DEFAULT_INCLUDE_PATTERNS, exclude_patterns: Iterable[str] = (),
+                 max_depth: Union[int, None] = 0, symlink_policy: str = SYMLINKS_FILES, prefetch: int = 0,
+                 limits: AnalysisLimits = None):
         """
         Initializes the EmailAnalyzer class with the provided email_file_path.
 
         Args:
-            email_file_path (str): The path to the email file or directory containing email files.
+            email_file_path (str): The path to the email file, directory containing email files, mbox archive
+                (a file with a .mbox or .mbx extension, or starting with a 'From ' line) or Maildir directory
+                (a directory with 'cur', 'new' and 'tmp' sub-directories).
+            headers_only (bool): If True, iter_metrics and analyze_parallel only parse the header block of each
+                email and detect attachments with a lightweight scan of the MIME part headers, instead of
+                building the full Message tree. The attachment file names and types are not reported in
+                this mode.
+            detect_attachment_types (bool): If False, the attachment payloads are never decoded and only the
+                attachment file names, declared types and sizes are reported, which is much cheaper for emails
+                with large attachments.
+            index_path (str): The path of a SQLite file used as a persistent metrics index. When given,
+                iter_metrics and analyze_parallel only parse the email files that are new or changed since
+                the previous run, serve the stored metrics of the other files, and drop the entries of deleted
+                files. The index can live next to the analyzed directory or anywhere else, so read-only mail
+                directories can be indexed too.
+            use_content_hash (bool): If True, the metrics index also stores the content hash of every file, so
+                files whose modification time changed but whose content did not are not parsed again.
+            deduplicate (bool): If True, the content hash of every raw email and decoded attachment is added to
+                the metrics, the metrics of identical emails and the detected types of identical attachments
+                are computed only once, and the duplicate clusters are added to the directory report.
+            dedup_cache_size (int): The number of emails and attachments whose results are memoized when
+                deduplicate is enabled, the least recently used results are evicted first.
+            collect_stats (bool): If True, the time spent reading, parsing, walking the MIME parts and detecting
+                the attachment types, the bytes, messages and attachments processed, the errors by exception
+                class and the slowest messages are recorded in the stats attribute, including the work done by
+                the worker processes of analyze_parallel. If False, no timing call is made at all.
+            include_patterns (Iterable[str]): The glob patterns of the email files of a directory. Patterns
+                containing a '/' are matched against the path relative to the directory (e.g. '2023/*/*.eml'),
+                the other ones against the file name.
+            exclude_patterns (Iterable[str]): The glob patterns of the files and sub-directories of a directory
+                that are skipped.
+            max_depth (Union[int, None]): The depth of the deepest sub-directories of a directory searched for
+                email files. 0 only searches the directory itself, None searches the whole tree.
+            symlink_policy (str): 'ignore' skips every symbolic link of a directory, 'files' follows the links
+                to files but not the links to directories, and 'follow' follows both.
+            prefetch (int): The number of email files read ahead on background threads by iter_metrics and
+                get_email_from_path, which hides the latency of slow or networked storage. 0 reads each file
+                when it is analyzed. Prefetched files are always read as a whole, never memory-mapped.
+            limits (AnalysisLimits): The limits bounding the size, MIME depth, part count, decoded attachment size
+                and analysis time of every email analyzed by iter_metrics and analyze_parallel. Emails going over
+                a limit are skipped and flagged with the name of the limit in the 'Limit Exceeded' field of their
+                metrics, email files over the size limit are not even read. If None, no limit is enforced.
+
+        Raises:
+            ValueError: If max_depth or prefetch is negative, or symlink_policy is not a supported policy.
         """
+        if prefetch < 0:
+            raise ValueError("prefetch must be greater than or equal to 0")
 
         self._email_file_path = email_file_path
+        self._headers_only = headers_only
+        # The options given to the constructor, used to build identical analyzers in worker processes
+        self._deduplicate = deduplicate
+        self._analyzer_options: dict = {'headers_only': headers_only,
+                                        'detect_attachment_types': detect_attachment_types,
+                                        'deduplicate': deduplicate,
+                                        'dedup_cache_size': dedup_cache_size,
+                                        'collect_stats': collect_stats,
+                                        'limits': limits}
+        self._index_path = index_path
+        self._use_content_hash = use_content_hash
+        self.prefetch = prefetch
+
+        # The walker finding the email files when the path is a directory, validated here so bad options fail early
+        self._directory_walker: DirectoryWalker = DirectoryWalker(
+            str(Path(email_file_path)) if isinstance(email_file_path, str) else '',
+            include_patterns=include_patterns, exclude_patterns=exclude_patterns, max_depth=max_depth,
+            symlink_policy=symlink_policy)
+        # The stream of email file paths started by _path_checker, consumed by the next _iter_email_sources call
+        self._directory_stream: Union[Iterator[str], None] = None
 
         # flags to check if the path provided is a file or a directory
         self._is_file: bool = False
         self._is_dir: bool = False
+        # flags to check if the path provided is an mbox archive or a Maildir directory
+        self._is_mbox: bool = False
+        self._is_maildir: bool = False
+        # The error raised by the last validation of the path, so callers can tell an invalid path from an empty one
+        self.path_error: Union[Exception, None] = None
 
         # To store multiple raw emails if the input path is a directory
         self._multiple_raw_emails: list = []
@@ -72,295 +190,890 @@ class EmailAnalyzer:
         self.current_mail_item_metrics: dict = {}
         # Store metrics for all parsed email items
         self.parsed_mail_metrics: dict = {}
-        # Store the total size of the email file(s) in bytes
-        self._total_email_size = os.path.getsize(self._email_file_path)
-        # Flag to check if the email has attachments
-        self._has_attachments: bool = False
-        # Store the file name of the attachment, if any
-        self.__attachment_file_name: str = None
-        # Store the detected type of the attachment, if any
-        self.__attachment_type: str = None
-        # Store the detected types of multiple attachments, if any
-        self.__multiple_attachment_types: dict = {}
-        # Store attachment-related information, such as presence and type
-        self._attachment_information: dict = {}
+        # Store the size in bytes of every email parsed by parse_email, taken from the raw email that was parsed
+        self._raw_email_sizes: WeakKeyDictionary = WeakKeyDictionary()
+        # Store the summary (processed count, throughput) of the last streaming or parallel directory run
+        self._directory_report: dict = {}
+        # The engine extracting the metrics of every email, it holds the parser and the deduplication caches
+        from .engine import EmailAnalysisEngine
+        self._engine: EmailAnalysisEngine = EmailAnalysisEngine(headers_only=headers_only,
+                                                                detect_attachment_types=detect_attachment_types,
+                                                                deduplicate=deduplicate,
+                                                                dedup_cache_size=dedup_cache_size,
+                                                                limits=limits)
+        # The open mbox archives of this instance, keyed by path
+        self._mbox_readers: dict = {}
+        # The instrumentation statistics, the code paths check for None so disabled instrumentation costs nothing
+        self.stats: Union['AnalyzerStats', None] = None
+        if collect_stats:
+            from .instrumentation import AnalyzerStats
+            self.stats = AnalyzerStats()
 
     def _path_checker(self):
         """
         Validates the email file path or directory containing email files provided in the EmailAnalyzer constructor.
-        Checks if the path exists and contains valid email file types (EML files).
+        Checks if the path exists and contains valid email file types (EML files), or is an mbox archive or a
+        Maildir directory.
         Raises appropriate custom exceptions in case of invalid input.
 
         Raises:
             InvalidPathError: If the provided path is not a string.
             FileNotFoundError: If the provided path does not exist.
-            NotEmailFileError: If the provided path is a file, but not an email (EML) file.
+            NotEmailFileError: If the provided path is a file, but neither an email (EML) file nor an mbox archive.
             NoEmailFilesInDirectoryError: If the provided path is a directory, but it does not contain any EML files.
         """
-
+        self.path_error = None
         try:
             # The following 'if' conditions check the file path and validate it, if the provided path is not valid one
-            # we log them in a seperate log file using the defined logger and raise exception
+            # we raise an exception, which is logged once by the handlers below
             if not isinstance(self._email_file_path, str):
-                logger.error("Invalid path")
                 raise InvalidPathError(self._email_file_path)
 
             if not os.path.exists(self._email_file_path):
-                logger.error("invalid path")
                 raise FileNotFoundError(f"The provided file path does not exist: '{self._email_file_path}'")
 
             if os.path.isfile(self._email_file_path):
                 if self._email_file_path.endswith(".eml"):
-                    logger.info(f"Valid email File Path")
+                    logger.info("Valid email File Path")
                     self._is_file = True  # if the path provided is a file then we are enabling this flag
+                elif is_mbox_file(self._email_file_path):
+                    logger.info("Valid path: mbox archive.")
+                    self._is_mbox = True  # if the path is an mbox archive then we are enabling the flag
                 else:
-                    logger.error(f"Invalid email File Path: Provided file is not an email file")
                     raise NotEmailFileError(file_path=self._email_file_path,
                                             message="Invalid email File Path: Provided file is not an email file")
+            elif is_maildir(self._email_file_path):
+                logger.info("Valid path: Maildir directory.")
+                self._is_maildir = True  # if the path is a Maildir then we are enabling the flag
             elif os.path.isdir(self._email_file_path):
-                # Check if the provided path is a directory containing email files
-                #  Iterate through the files in the directory and filter out the EML files.
-                email_files = [file for file in os.listdir(self._email_file_path) if file.endswith('.eml')]
-                if email_files:
+                # Check if the provided path is a directory containing email files. The directory is walked only
+                # once: the first email file found validates it, and the same stream of paths is then read.
+                directory_stream = self._directory_walker.iter_files()
+                first_email_file = next(directory_stream, None)
+                if first_email_file is not None:
                     logger.info("Valid path: Directory containing EML files.")
                     self._is_dir = True  # if the path is a directory then we are enabling the flag
+                    self._directory_stream = chain([first_email_file], directory_stream)
 
                 else:
-                    logger.error("Invalid path: Directory does not contain any EML files.")
                     raise NoEmailFilesInDirectoryError(directory_path=self._email_file_path,
                                                        message="Invalid path: Directory does not contain any EML files.")
 
-        except InvalidPathError as err:
-
-            logger.error(err)
-
-        except FileNotFoundError as err:
-
-            logger.error(err)
-
-        except NotEmailFileError as err:
+        except (InvalidPathError, FileNotFoundError, NotEmailFileError, NoEmailFilesInDirectoryError) as err:
 
             logger.error(err)
+            self.path_error = err
+            self._record_error(err)
 
-        except NoEmailFilesInDirectoryError as err:
+        except Exception as err:
 
-            logger.error(err)
+            logger.error("An unexpected error occurred: %s", err)
+            self.path_error = err
+            self._record_error(err)
 
-        except Exception as err:
+    def _record_error(self, error: BaseException):
+        """
+        Counts an error in the instrumentation statistics, if instrumentation is enabled.
 
-            logger.error(f"An unexpected error occurred: {err}")
+        Args:
+            error (BaseException): The exception that was raised.
+        """
+        if self.stats is not None:
+            self.stats.record_error(error)
 
-    def get_email_from_path(self) -> Union[str, list]:
+    def get_email_from_path(self) -> Union[bytes, list]:
         """
         This method retrieves raw email data from the given path (single file or directory).
 
         This method first checks if the provided path is a file or a directory using _path_checker() and enables the
         respective flags _is_file and _is_dir accordingly.
 
-        If it's a file, the method reads and returns the content of the file as a string.
-        If it's a directory, it iterates through the email files in the directory, reads their contents,
-        and appends them to a list of raw emails, which is then returned.
+        If it's a file, the method reads and returns the content of the file as bytes.
+        If it's a directory, an mbox archive or a Maildir, it iterates through the emails it contains, reads
+        their contents, and appends them to a list of raw emails, which is then returned.
+
+        The files are read in binary mode, so 8-bit and mis-encoded emails are read as they are, and read-only
+        files and mailbox mounts are supported.
 
         Returns:
-            Union[str, list]: If a single file is provided, returns raw email content as a string.
-                              If a directory is provided, returns a list of raw email contents.
+            Union[bytes, list]: If a single file is provided, returns raw email content as bytes.
+                                If a directory, an mbox archive or a Maildir is provided, returns a list of
+                                raw email contents.
         """
         # Check and validate the provided path (file or directory) using _path_checker().
         self._path_checker()
 
         if self._is_file:
-            # If the path is a single email file, read the file's content and return it as a string.
-            with open(self._email_file_path, 'r', encoding='utf-8') as email_file:
-                raw_email = email_file.read()
-            return raw_email
+            # If the path is a single email file, read the file's content and return it as bytes.
+            return self._read_email_file(self._email_file_path)
+        elif self._is_dir or self._is_mbox or self._is_maildir:
+            # If the path holds multiple emails, iterate through them, read their contents (ahead of time when
+            # prefetch is enabled), and append them to a new _multiple_raw_emails list, so repeated calls do not
+            # accumulate emails.
+            self._multiple_raw_emails = []
+            try:
+                for _, raw_email in iter_prefetched(self._iter_email_sources(), self._read_email_source,
+                                                    prefetch=0 if self._is_mbox else self.prefetch):
+                    self._multiple_raw_emails.append(raw_email)
+            finally:
+                self._close_mbox_readers()
+
+            # Return the list of raw email contents.
+            return self._multiple_raw_emails
+
+    def _iter_email_sources(self) -> Iterator[tuple]:
+        """
+        Yields the location of every email that should be analyzed for the validated input path.
+
+        An email is located by a (file_path, offset, length) tuple. For emails stored in their own file (single
+        email files, directories of EML files and Maildirs), offset and length are None. For the emails of an
+        mbox archive, they give the location of the email in the archive, which is split by streaming over its
+        'From ' separators. The emails are yielded one at a time, so callers never need to hold the full listing
+        of raw emails.
+
+        Yields:
+            tuple: A (file_path, offset, length) tuple locating an email.
+        """
+        if self._is_file:
+            yield self._email_file_path, None, None
         elif self._is_dir:
-            # If the path is a directory containing email files, iterate through the files,
-            # read their contents, and append them to the _multiple_raw_emails list.
-            for email_file in os.listdir(self._email_file_path):
+            # The stream started by _path_checker is consumed once, later runs walk the directory again
+            directory_stream, self._directory_stream = self._directory_stream, None
+            if directory_stream is None:
+                directory_stream = self._directory_walker.iter_files()
+            # Only the files matching the include patterns are yielded, any other file in the tree is skipped
+            for file_path in directory_stream:
+                yield file_path, None, None
+        elif self._is_maildir:
+            for file_path in iter_maildir_message_paths(self._email_file_path):
+                yield file_path, None, None
+        elif self._is_mbox:
+            for offset, length in self._get_mbox_reader(self._email_file_path).iter_message_spans():
+                yield self._email_file_path, offset, length
+
+    def _get_mbox_reader(self, mbox_path: str) -> MboxReader:
+        """
+        Returns the reader of an mbox archive, opening the archive on first use.
 
-                file_path = Path(self._email_file_path) / email_file
+        Args:
+            mbox_path (str): The path of the mbox archive.
+
+        Returns:
+            MboxReader: The reader of the mbox archive.
+        """
+        if mbox_path not in self._mbox_readers:
+            self._mbox_readers[mbox_path] = MboxReader(mbox_path)
+        return self._mbox_readers[mbox_path]
 
-                with open(file_path, 'r+', encoding='utf-8') as file:
-                    raw_email = file.read()
-                self._multiple_raw_emails.append(raw_email)
+    def _close_mbox_readers(self):
+        """
+        Closes the mbox archives opened by this instance.
+        """
+        for mbox_reader in self._mbox_readers.values():
+            mbox_reader.close()
+        self._mbox_readers = {}
 
-            # Return the list of raw email contents.
-            return self._multiple_raw_emails
+    def _read_email_source(self, email_source: tuple) -> bytes:
+        """
+        Reads a single email, located by a tuple yielded by _iter_email_sources.
 
-    def parse_email(self, raw_email: Union[str, list]) -> Union[Message, List[Message]]:
+        Args:
+            email_source (tuple): The (file_path, offset, length) tuple locating the email.
+
+        Returns:
+            bytes: The raw email content.
+        """
+        file_path, offset, length = email_source
+        if offset is None:
+            return self._read_email_file(file_path)
+        return self._get_mbox_reader(file_path).read_message(offset, length)
+
+    @staticmethod
+    def _read_email_file(file_path: str) -> bytes:
+        """
+        Reads a single email file in binary mode and returns its raw content.
+
+        Args:
+            file_path (str): The path of the email file (EML format).
+
+        Returns:
+            bytes: The raw email content.
+        """
+        with open(file_path, 'rb') as email_file:
+            return email_file.read()
+
+    @staticmethod
+    @contextmanager
+    def _open_email_buffer(file_path: str) -> Iterator[Union[bytes, mmap.mmap]]:
+        """
+        Gives read-only access to the raw content of an email file without copying it into memory when possible.
+
+        Files of at least MMAP_THRESHOLD bytes are memory-mapped, so only the pages that are actually looked at are
+        loaded: the header block in headers-only mode, and in full mode the part headers, boundary delimiters and
+        the payloads that are decoded, since LazyEmailMessage indexes the memory map in place instead of copying it.
+        Smaller files are simply read, as mapping them costs more than reading them.
+
+        Args:
+            file_path (str): The path of the email file (EML format).
+
+        Yields:
+            Union[bytes, mmap.mmap]: The raw email content, as bytes or as a read-only memory map.
+        """
+        with open(file_path, 'rb') as email_file:
+            if os.fstat(email_file.fileno()).st_size < MMAP_THRESHOLD:
+                yield email_file.read()
+            else:
+                with mmap.mmap(email_file.fileno(), 0, access=mmap.ACCESS_READ) as email_map:
+                    yield email_map
+
+    def parse_email(self, raw_email: Union[bytes, str, list]) -> Union[Message, List[Message]]:
         """
         Parses raw email data and returns a parsed email object or a list of parsed email objects.
 
-        This method uses the email.parser.Parser class to parse the raw email data.
-        If a single raw email is provided (as a string), the method parses and returns it as a Message object.
-        If a list of raw emails is provided, it iterates through the list, parses each email, and appends
+        This method uses the email.parser.BytesParser class with the modern email.policy.default policy to
+        parse the raw email data, raw emails given as strings are parsed with the email.parser.Parser class
+        and the same policy.
+        If a single raw email is provided (as bytes or a string), the method parses and returns it as a Message
+        object. If a list of raw emails is provided, it iterates through the list, parses each email, and appends
         the resulting Message objects to a list, which is then returned.
 
         Args:
-            raw_email (Union[str, list]): Raw email data as a string or a list of strings.
+            raw_email (Union[bytes, str, list]): Raw email data as bytes, a string or a list of either.
 
         Returns:
             Union[Message, List[Message]]: A parsed email object (Message) if a single email is provided,
                                            or a list of parsed email objects if a list of emails is provided.
         """
-        # Initialize the email Parser object.
-        email_parser = Parser()
-        if isinstance(raw_email, str):
+        if isinstance(raw_email, (bytes, str)):
             # If a single raw email is provided, parse it and return the resulting Message object.
-            self._parsed_email = email_parser.parsestr(raw_email)
+            self._parsed_email = self._parse_raw_email(raw_email)
             return self._parsed_email
 
         else:
             # If a list of raw emails is provided, iterate through the list, parse each email,
-            # and append the resulting Message objects to the _multiple_parsed_emails list.
+            # and append the resulting Message objects to a new _multiple_parsed_emails list.
+            self._multiple_parsed_emails = []
             for raw_email_item in raw_email:
-                self._multiple_parsed_emails.append(email_parser.parsestr(raw_email_item))
+                self._multiple_parsed_emails.append(self._parse_raw_email(raw_email_item))
 
             # Return the list of parsed email objects (Message instances).
             return self._multiple_parsed_emails
 
+    def _parse_raw_email(self, raw_email: Union[bytes, str]) -> Message:
+        """
+        Parses a single raw email, given as bytes or as a string.
+
+        Args:
+            raw_email (Union[bytes, str]): The raw email content.
+
+        Returns:
+            Message: The parsed email object.
+        """
+        stats = self.stats
+        if stats is not None:
+            parse_start = time.perf_counter()
+
+        parsed_email = self._engine.parse(raw_email)
+        if isinstance(raw_email, str):
+            self._raw_email_sizes[parsed_email] = len(raw_email.encode('utf-8', errors='surrogateescape'))
+        else:
+            self._raw_email_sizes[parsed_email] = len(raw_email)
+
+        if stats is not None:
+            stats.record_stage('parse', time.perf_counter() - parse_start)
+        return parsed_email
+
     @staticmethod
-    def _identify_attachments(attachment_data: str) -> str:
+    def _identify_attachments(attachment_data: bytes) -> str:
         """
         Identifies the file type of an attachment using the `python-magic` library and returns a descriptive string.
 
         This method analyzes the provided attachment data and returns a string describing the identified
-        file type. The `magic` library is used to determine the MIME type of the attachment.
+        file type. The `magic` library is used to determine the MIME type of the attachment from the decoded
+        attachment bytes held in memory, only the first MAGIC_BUFFER_SIZE bytes are inspected.
 
         Args:
-            attachment_data (str): The file path of the attachment.
+            attachment_data (bytes): The decoded content of the attachment.
 
         Returns:
             str: A descriptive string indicating the type of the attachment.
         """
-        # Use the magic library to determine the MIME type of the attachment.
-        file_type = magic.from_file(attachment_data, mime=True)
-
-        # Return a descriptive string based on the identified MIME type.
-        if file_type.startswith('text/'):
-            return "The attachment seems like a document report"
-        elif file_type.startswith('application/pdf'):
-            return "The attachment seems like an invoice"
-        elif file_type.startswith('image/'):
-            return "The attachment seems like an image"
-        elif file_type.startswith('audio/'):
-            return "The attachment seems like an audio file"
-        elif file_type.startswith('application/vnd.ms-excel'):
-            return "The attachment seems like a spreadsheet"
-        elif file_type.startswith('application/zip'):
-            return "The attachment seems like a compressed file"
-        elif file_type.startswith('application/octet-stream'):
-            return "The attachment seems like a code file"
+        from .engine import EmailAnalysisEngine
+        return EmailAnalysisEngine.describe_attachment_type(
+            EmailAnalysisEngine.detect_attachment_mime_type(attachment_data))
+
+    def get_email_metrics(self, parsed_email: Union[Message, List[Message]]) -> dict:
+        """
+        This method extracts metrics from the parsed email(s), such as subject, message ID, from address,
+        total message size, and attachment information. It returns a dictionary containing these metrics
+        for single or multiple emails.
+
+        Args:
+            parsed_email (Union[Message, List[Message]]): A parsed email object or a list of parsed email
+                objects (instances of email.message.Message).
+
+        Returns:
+            dict: A dictionary containing email metrics, such as subject, message ID, from address,
+            total message size, and attachment information. The total message size is the size of the raw
+            email given to parse_email, and is None for Message objects that were not built by parse_email.
+
+        """
+        # Every call returns the metrics of the given email(s) only, never the metrics of a previous call
+        self.parsed_mail_metrics = {}
+
+        # Check if parsed_email is a single email message or a list of messages
+        if isinstance(parsed_email, Message):
+            # If parsed_email is a single email message, extract the metrics and attachment information
+            self.current_mail_item_metrics = self._get_single_email_metrics(
+                parsed_email=parsed_email, message_size=self._raw_email_sizes.get(parsed_email))
+            self.parsed_mail_metrics[f'Item- 1'] = self.current_mail_item_metrics
+
+            return self.parsed_mail_metrics
+
         else:
-            return "The attachment file type is Un-Known"
+            # If parsed_email is a list of email messages, extract the metrics and attachment information
+            # for each message and store it in the parsed_mail_metrics dictionary
+            for index, parsed_item in enumerate(parsed_email):
+                self.current_mail_item_metrics = self._get_single_email_metrics(
+                    parsed_email=parsed_item, message_size=self._raw_email_sizes.get(parsed_item))
+                self.parsed_mail_metrics[f'Item-{index + 1}'] = self.current_mail_item_metrics
 
-    def __check_mail_attachments(self, parsed_email: Message) -> dict:
+            return self.parsed_mail_metrics
+
+    def _get_single_email_metrics(self, parsed_email: Message, message_size: Union[int, None]) -> dict:
         """
-        This private method checks for attachments in a parsed email message, identifies their types,
-        and extracts relevant information about them. The method returns a dictionary containing the
-        attachment information.
+        Extracts the metrics of a single parsed email, such as subject, message ID, from address, total message
+        size, and attachment information, with the analysis engine of this instance.
 
         Args:
             parsed_email (Message): A parsed email object (instance of email.message.Message).
+            message_size (Union[int, None]): The size in bytes of the raw email, if known.
 
         Returns:
-            dict: A dictionary containing attachment information, such as whether the email has
-            attachments, the attachment file names, and their types.
+            dict: A new dictionary containing the metrics of the given email.
+        """
+        return self._engine.get_message_metrics(parsed_email=parsed_email, message_size=message_size,
+                                                stats=self.stats)
 
-        Raises:
-            AttachmentProcessingError: If there's an error while processing the email attachments.
+    def iter_metrics(self) -> Iterator[dict]:
         """
+        Streams the metrics of the email(s) found at the given path, one email at a time.
+
+        Unlike the get_email_from_path -> parse_email -> get_email_metrics flow, which keeps every raw email,
+        every parsed Message object and every metrics dictionary in memory until the whole directory is
+        processed, this generator reads, parses and extracts the metrics of a single email, yields them, and
+        discards the email before moving on to the next file. Memory use therefore stays constant regardless
+        of the number of emails in the directory, and the first result is available as soon as the first
+        email is parsed.
+
+        When prefetch is enabled, up to prefetch email files are read ahead on background threads while the
+        current email is analyzed, which hides the latency of slow or networked storage. Emails whose metrics
+        are found in the metrics index and the emails of mbox archives are never prefetched.
+
+        Yields:
+            dict: The metrics of one email, with the same fields as the items returned by get_email_metrics
+            and an additional 'File Path' field identifying the email file they belong to.
+        """
+        # Check and validate the provided path (file or directory) using _path_checker().
+        self._path_checker()
+
+        start_time = time.perf_counter()
+        processed_count = 0
+        cached_count = 0
+        metrics_index = self._open_metrics_index()
+        # The paths of the email files found during the run, used to drop the index entries of deleted files
+        indexed_paths = []
+        run_trackers = self._create_run_trackers()
+        completed = False
         try:
-            # Set the default state to no attachments initially
-            self._has_attachments = False
+            # The index lookups are made by this thread, only the reads of the email files are prefetched. Without
+            # prefetching, _analyze_email_source reads every email itself, so large files can be memory-mapped and
+            # the reads are counted in the 'read' stage statistics
+            email_lookups = self._iter_indexed_email_sources(metrics_index, indexed_paths)
+            read_ahead = self._prefetch_email_file if self.prefetch > 0 else _skip_read_ahead
+            for email_lookup, raw_email in iter_prefetched(email_lookups, read_ahead, prefetch=self.prefetch):
+                email_source, file_stat, mail_item_metrics = email_lookup
+                if mail_item_metrics is None:
+                    mail_item_metrics = self._analyze_email_source(email_source, raw_email=raw_email)
+                    # The metrics index tracks email files, the emails of an mbox archive are always analyzed
+                    if file_stat is not None:
+                        metrics_index.store(email_source[0], file_stat, mail_item_metrics)
+                else:
+                    cached_count += 1
+
+                for run_tracker in run_trackers:
+                    run_tracker.add(mail_item_metrics)
+                yield mail_item_metrics
+                processed_count += 1
+            completed = True
+        finally:
+            self._close_mbox_readers()
+            self._close_metrics_index(metrics_index, indexed_paths=indexed_paths, completed=completed)
+            self._update_directory_report(processed_count=processed_count, start_time=start_time, workers=1,
+                                          cached_count=cached_count, run_trackers=run_trackers)
+
+    def _iter_indexed_email_sources(self, metrics_index: Union['MetricsIndex', None],
+                                    indexed_paths: List[str]) -> Iterator[tuple]:
+        """
+        Looks the email files found at the given path up in the metrics index, if any.
 
-            # If the email is a multipart message, iterate through its parts
-            if parsed_email.is_multipart():
-                for part in parsed_email.walk():
+        Args:
+            metrics_index (Union[MetricsIndex, None]): The metrics index of the run, if any.
+            indexed_paths (List[str]): The list the paths of the looked up email files are appended to.
 
-                    # Check if the current part is an attachment
-                    if part.get_content_disposition() == 'attachment':
-                        self._has_attachments = True
-                        self.__attachment_file_name = part.get_filename()
-                        attachment_data = part.get_payload(decode=True)
+        Yields:
+            tuple: An (email_source, file_stat, cached_metrics) tuple. file_stat is None for the emails that are not
+            tracked by the index (the emails of an mbox archive, or every email when there is no index), and
+            cached_metrics is None when the email has to be analyzed.
+        """
+        for email_source in self._iter_email_sources():
+            file_path, offset, _ = email_source
+            if metrics_index is None or offset is not None:
+                yield email_source, None, None
+            else:
+                indexed_paths.append(file_path)
+                file_stat = os.stat(file_path)
+                yield email_source, file_stat, metrics_index.lookup(file_path, file_stat)
 
-                        # Write the attachment data to a temporary file
-                        with open(self.__attachment_file_name, 'wb') as attachment_file:
-                            attachment_file.write(attachment_data)
+    def _prefetch_email_file(self, email_lookup: tuple) -> Union[bytes, None]:
+        """
+        Reads an email file ahead of its analysis, on a prefetch thread.
 
-                        # Identify the attachment type
-                        self.__attachment_type = self._identify_attachments(self.__attachment_file_name)
-                        self.__multiple_attachment_types[self.__attachment_file_name] = self.__attachment_type
+        Args:
+            email_lookup (tuple): An (email_source, file_stat, cached_metrics) tuple yielded by
+                _iter_indexed_email_sources.
 
-                        # Update the attachment information dictionary
-                        self._attachment_information['Has Attachment'] = self._has_attachments
-                        self._attachment_information['Attachment File Name'] = self.__attachment_file_name
-                        self._attachment_information['Attachment File Type'] = self.__attachment_type
+        Returns:
+            Union[bytes, None]: The raw email content, or None if the email does not need to be read ahead: its
+            metrics are cached, it belongs to an mbox archive, or the file could not be read or is over the size
+            limit, in which case it is handled again by _analyze_email_source so the error is raised and recorded
+            (or the email flagged) by the consuming thread.
+        """
+        email_source, _, cached_metrics = email_lookup
+        if cached_metrics is not None or email_source[1] is not None:
+            return None
+        try:
+            self._check_email_source_size(email_source)
+            return self._read_email_file(email_source[0])
+        except (OSError, MessageLimitExceededError):
+            return None
 
-                        # Remove the temporary attachment file
-                        os.remove(self.__attachment_file_name)
+    def _check_email_source_size(self, email_source: tuple):
+        """
+        Checks the size of an email against the max_message_bytes limit, before the email is read.
 
-                        return self._attachment_information
+        Args:
+            email_source (tuple): The (file_path, offset, length) tuple locating the email.
 
-            else:
-                # If the email is not a multipart message, it has no attachments
-                self._has_attachments = False
-                self._attachment_information['Has Attachment'] = self._has_attachments
-            return self._attachment_information
+        Raises:
+            MessageLimitExceededError: If the email is larger than the max_message_bytes limit.
+            OSError: If the size of the email file cannot be read.
+        """
+        limits = self._engine.limits
+        if limits is None or limits.max_message_bytes is None:
+            return
+        file_path, offset, length = email_source
+        limits.check_message_size(os.stat(file_path).st_size if offset is None else length)
 
-        except AttachmentProcessingError as attachment_error:
-            # Log any attachment processing errors
-            logger.error(attachment_error)
+    def _open_metrics_index(self) -> Union['MetricsIndex', None]:
+        """
+        Opens the persistent metrics index given to the constructor, if any.
 
-    def get_email_metrics(self, parsed_email: Union[Message, List[Message]]) -> dict:
+        Returns:
+            Union[MetricsIndex, None]: The opened metrics index, or None if no index_path was given.
         """
-        This method extracts metrics from the parsed email(s), such as subject, message ID, from address,
-        total message size, and attachment information. It returns a dictionary containing these metrics
-        for single or multiple emails.
+        if self._index_path is None:
+            return None
+        # Instrumentation does not change the metrics, so toggling it keeps the stored metrics valid
+        index_options = {option: value for option, value in self._analyzer_options.items()
+                         if option not in ('collect_stats', 'limits')}
+        # The limits only change the metrics of the emails they flag, so they are only part of the key when set
+        if self._engine.limits is not None:
+            index_options['limits'] = self._engine.limits.as_dict()
+        import json
+        options_key = json.dumps(index_options, sort_keys=True)
+        from .metrics_index import MetricsIndex
+        return MetricsIndex(self._index_path, options_key=options_key, use_content_hash=self._use_content_hash)
+
+    def _close_metrics_index(self, metrics_index: Union['MetricsIndex', None], indexed_paths: List[str],
+                             completed: bool):
+        """
+        Drops the index entries of deleted email files and closes the persistent metrics index.
 
         Args:
-            parsed_email (Union[Message, List[Message]]): A parsed email object or a list of parsed email
-                objects (instances of email.message.Message).
+            metrics_index (Union[MetricsIndex, None]): The metrics index of the run, if any.
+            indexed_paths (List[str]): The paths of the email files found during the run.
+            completed (bool): Whether the run went through every email file. Entries are only dropped after a
+                complete run of a directory, otherwise files that were not reached yet would be dropped too.
+        """
+        if metrics_index is None:
+            return
+        if completed and (self._is_dir or self._is_maildir):
+            pruned_count = metrics_index.prune(str(Path(self._email_file_path)), indexed_paths)
+            if pruned_count:
+                logger.info("Dropped %d deleted email file(s) from the metrics index", pruned_count)
+        metrics_index.close()
+
+    def _analyze_email_source(self, email_source: tuple, raw_email: Union[bytes, None] = None) -> dict:
+        """
+        Reads, parses and extracts the metrics of a single email, located by a tuple yielded by
+        _iter_email_sources.
+
+        Email files are read as bytes and parsed with BytesParser, or memory-mapped when they are large and only
+        their headers are needed, so the email content is never decoded to text as a whole beforehand. The
+        emails of an mbox archive are copied out of the memory map of the archive one at a time.
+
+        Args:
+            email_source (tuple): The (file_path, offset, length) tuple locating the email.
+            raw_email (Union[bytes, None]): The content of the email file, when it was already read ahead by a
+                prefetch thread. The read is then skipped, and not counted in the 'read' stage statistics.
 
         Returns:
-            dict: A dictionary containing email metrics, such as subject, message ID, from address,
-            total message size, and attachment information.
+            dict: The metrics of the email, including the 'File Path' field, the 'Message Offset' field for the
+            emails of an mbox archive, the 'Content Hash' field when deduplicate is enabled, and the
+            'Limit Exceeded' field when the email went over one of the limits. The dictionary only contains plain
+            values, so it can be pickled and shipped between processes cheaply.
+        """
+        file_path, offset, length = email_source
+        mail_item_metrics = {'File Path': file_path}
+        if raw_email is not None:
+            return self._analyze_raw_email(raw_email=raw_email, mail_item_metrics=mail_item_metrics)
+
+        stats = self.stats
+        if stats is not None:
+            read_start = time.perf_counter()
+
+        if offset is not None:
+            mail_item_metrics['Message Offset'] = offset
+
+        with ExitStack() as exit_stack:
+            try:
+                # Emails over the size limit are flagged without being read
+                self._check_email_source_size(email_source)
+                if offset is None:
+                    # Large emails are memory-mapped, small ones are read as bytes
+                    raw_email = exit_stack.enter_context(self._open_email_buffer(file_path))
+                else:
+                    raw_email = self._get_mbox_reader(file_path).read_message(offset, length)
+            except OSError as err:
+                self._record_error(err)
+                raise
+            except MessageLimitExceededError as limit_error:
+                return flag_limit_exceeded(limit_error, mail_item_metrics, limit_error.value, stats)
+
+            if stats is not None:
+                stats.record_stage('read', time.perf_counter() - read_start)
+            return self._analyze_raw_email(raw_email=raw_email, mail_item_metrics=mail_item_metrics)
+
+    def _analyze_raw_email(self, raw_email: Union[bytes, mmap.mmap], mail_item_metrics: dict) -> dict:
+        """
+        Parses and extracts the metrics of a single raw email with the analysis engine of this instance.
 
+        Args:
+            raw_email (Union[bytes, mmap.mmap]): The raw email content.
+            mail_item_metrics (dict): The metrics identifying where the email comes from.
+
+        Returns:
+            dict: A new dictionary holding the fields of mail_item_metrics followed by the metrics of the email.
         """
-        # Check if parsed_email is a single email message or a list of messages
-        if isinstance(parsed_email, Message):
-            # If parsed_email is a single email message, extract the metrics and attachment information
-            information = self.__check_mail_attachments(parsed_email=parsed_email)
-            self.current_mail_item_metrics['Subject'] = parsed_email['subject']
-            self.current_mail_item_metrics['Message ID'] = parsed_email['message-id']
-            self.current_mail_item_metrics['From Address'] = parsed_email['from']
-            self.current_mail_item_metrics['Total Message Size'] = self._total_email_size
+        return self._engine.analyze_bytes(raw_email, source_fields=mail_item_metrics, stats=self.stats)
 
-            self.current_mail_item_metrics['Has Attachments'] = information['Has Attachment']
-            if self.current_mail_item_metrics['Has Attachments']:
-                self.current_mail_item_metrics['Attachment File Name'] = information['Attachment File Name']
-                self.current_mail_item_metrics['Attachment File Type'] = information['Attachment File Type']
+    def analyze_parallel(self, max_workers: int = None, chunk_size: int = 64, ordered: bool = True) -> Iterator[dict]:
+        """
+        Analyzes the email(s) found at the given path on a pool of worker processes.
 
-            self.parsed_mail_metrics[f'Item- 1'] = self.current_mail_item_metrics
+        The emails are split into chunks of chunk_size emails, and each chunk is read, parsed and analyzed by one
+        worker process, so the CPU-bound parsing and MIME walking is spread over all the available cores. Only the
+        locations of the emails (file paths, and offsets in the case of an mbox archive) are sent to the workers
+        and only the plain metrics dictionaries are sent back, never the raw emails or Message objects. The number
+        of chunks in flight is bounded to twice the number of workers, which keeps memory use constant for very
+        large directories. When instrumentation is enabled, the statistics collected by the workers are sent back
+        with every chunk and merged into the stats attribute.
 
-            return self.parsed_mail_metrics
+        Once the run is finished, the throughput of the run is available through get_directory_report().
 
-        else:
-            # If parsed_email is a list of email messages, extract the metrics and attachment information
-            # for each message and store it in the parsed_mail_metrics dictionary
-            for index, parsed_item in enumerate(parsed_email):
-                self.current_mail_item_metrics = {'Subject': parsed_item['subject'],
-                                                  'Message ID': parsed_item['message-id'],
-                                                  'From Address': parsed_item['from'],
-                                                  'Total Message Size': self._total_email_size}
+        Args:
+            max_workers (int): The number of worker processes. Defaults to the number of CPUs of the machine.
+            chunk_size (int): The number of emails analyzed by a worker per task.
+            ordered (bool): If True, the metrics are yielded in file name order (in archive order for the emails
+                of an mbox archive). If False, the metrics are yielded as soon as their chunk is completed, which
+                keeps all the workers busy when some emails take much longer to analyze than others.
 
-                information = self.__check_mail_attachments(parsed_email=parsed_item)
+        Yields:
+            dict: The metrics of one email, with the same fields as the metrics yielded by iter_metrics.
 
-                self.current_mail_item_metrics['Has Attachments'] = information['Has Attachment']
-                if self.current_mail_item_metrics['Has Attachments']:
-                    self.current_mail_item_metrics['Attachment File Name'] = information['Attachment File Name']
-                    self.current_mail_item_metrics['Attachment File Type'] = information['Attachment File Type']
+        Raises:
+            ValueError: If max_workers or chunk_size is lower than 1.
+        """
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        if max_workers < 1 or chunk_size < 1:
+            raise ValueError("max_workers and chunk_size must be greater than or equal to 1")
 
-                self.parsed_mail_metrics[f'Item-{index + 1}'] = self.current_mail_item_metrics
+        # The process pool, and the multiprocessing machinery behind it, is only imported by the runs using it
+        from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 
-            return self.parsed_mail_metrics
+        # Check and validate the provided path (file or directory) using _path_checker().
+        self._path_checker()
+
+        email_sources = self._iter_email_sources()
+        if ordered and not self._is_mbox:
+            # Results are delivered in the order of submission, so the files are submitted in file name order
+            email_sources = iter(sorted(email_sources))
+
+        start_time = time.perf_counter()
+        processed_count = 0
+        cached_count = 0
+        max_pending_chunks = max_workers * 2
+        # Every pending chunk is a (future, chunk_sources, indexed_metrics, file_stats) tuple. The future analyzes
+        # the chunk emails missing from the metrics index, and is None if every email of the chunk was indexed.
+        pending_chunks = deque()
+        metrics_index = self._open_metrics_index()
+        indexed_paths = []
+        run_trackers = self._create_run_trackers()
+        completed = False
+
+        try:
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_parallel_worker,
+                                     initargs=(self._email_file_path, self._analyzer_options)) as executor:
+                while True:
+                    # Keep the pool busy by topping up the pending chunks until the bound is reached
+                    while len(pending_chunks) < max_pending_chunks:
+                        chunk_sources = list(islice(email_sources, chunk_size))
+                        if not chunk_sources:
+                            break
+
+                        indexed_metrics = {}
+                        file_stats = {}
+                        # The metrics index tracks email files, the emails of an mbox archive are always analyzed
+                        if metrics_index is not None and not self._is_mbox:
+                            for email_source in chunk_sources:
+                                file_path = email_source[0]
+                                indexed_paths.append(file_path)
+                                file_stats[file_path] = os.stat(file_path)
+                                mail_item_metrics = metrics_index.lookup(file_path, file_stats[file_path])
+                                if mail_item_metrics is not None:
+                                    indexed_metrics[email_source] = mail_item_metrics
+
+                        sources_to_analyze = [email_source for email_source in chunk_sources
+                                              if email_source not in indexed_metrics]
+                        future = executor.submit(_analyze_email_sources_chunk, sources_to_analyze) \
+                            if sources_to_analyze else None
+                        pending_chunks.append((future, chunk_sources, indexed_metrics, file_stats))
+
+                    if not pending_chunks:
+                        break
+
+                    if ordered:
+                        completed_chunks = [pending_chunks.popleft()]
+                    else:
+                        if not any(chunk[0] is None or chunk[0].done() for chunk in pending_chunks):
+                            wait([chunk[0] for chunk in pending_chunks], return_when=FIRST_COMPLETED)
+                        completed_chunks = [chunk for chunk in pending_chunks if chunk[0] is None or chunk[0].done()]
+                        for chunk in completed_chunks:
+                            pending_chunks.remove(chunk)
+
+                    for future, chunk_sources, indexed_metrics, file_stats in completed_chunks:
+                        analyzed_metrics, worker_stats, chunk_error = future.result() if future is not None \
+                            else ([], None, None)
+                        if worker_stats is not None:
+                            self.stats.merge(worker_stats)
+                        # The statistics of a failed chunk are merged first, so they count the error that stops the run
+                        if chunk_error is not None:
+                            raise chunk_error
+                        analyzed_metrics = iter(analyzed_metrics)
+                        for email_source in chunk_sources:
+                            if email_source in indexed_metrics:
+                                mail_item_metrics = indexed_metrics[email_source]
+                                cached_count += 1
+                            else:
+                                mail_item_metrics = next(analyzed_metrics)
+                                if email_source[0] in file_stats:
+                                    metrics_index.store(email_source[0], file_stats[email_source[0]],
+                                                        mail_item_metrics)
+                            for run_tracker in run_trackers:
+                                run_tracker.add(mail_item_metrics)
+                            yield mail_item_metrics
+                            processed_count += 1
+            completed = True
+        finally:
+            for chunk in pending_chunks:
+                if chunk[0] is not None:
+                    chunk[0].cancel()
+            self._close_mbox_readers()
+            self._close_metrics_index(metrics_index, indexed_paths=indexed_paths, completed=completed)
+            self._update_directory_report(processed_count=processed_count, start_time=start_time,
+                                          workers=max_workers, cached_count=cached_count,
+                                          run_trackers=run_trackers)
+
+    def export_metrics(self, output: Union[str, IO], output_format: str = None, chunk_size: int = None,
+                       max_workers: int = None) -> int:
+        """
+        Analyzes the email(s) found at the given path and streams their metrics to an NDJSON, CSV or Parquet file.
+
+        The metrics are converted to compact EmailMetricsRecord objects and written in chunks of chunk_size records
+        as the emails are analyzed, so the metrics of the whole run are never held in memory. The columns of the
+        written files are described in the result_writers module.
+
+        Args:
+            output (Union[str, IO]): The path of the output file, or an open file object (in binary mode for
+                Parquet), which is not closed.
+            output_format (str): 'ndjson', 'csv' or 'parquet'. If not given, it is inferred from the extension of
+                the output path (.ndjson, .jsonl, .csv or .parquet). Parquet requires the pyarrow package.
+            chunk_size (int): The number of records buffered before they are written out, i.e. the number of rows
+                of every Parquet row group. Defaults to result_writers.DEFAULT_CHUNK_SIZE.
+            max_workers (int): If given, the emails are analyzed with analyze_parallel on this number of worker
+                processes, otherwise they are analyzed with iter_metrics.
+
+        Returns:
+            int: The number of emails written.
+
+        Raises:
+            ValueError: If the output format is not supported, or cannot be inferred from the output path.
+            ImportError: If the Parquet format is requested and pyarrow is not installed.
+        """
+        from .result_writers import DEFAULT_CHUNK_SIZE, create_metrics_writer
+        if chunk_size is None:
+            chunk_size = DEFAULT_CHUNK_SIZE
+        metrics = self.iter_metrics() if max_workers is None else self.analyze_parallel(max_workers=max_workers)
+        with create_metrics_writer(output, output_format=output_format, chunk_size=chunk_size) as metrics_writer:
+            metrics_writer.write_all(metrics)
+        return metrics_writer.records_written
+
+    def _create_run_trackers(self) -> list:
+        """
+        Creates the trackers aggregating the metrics of the emails of a streaming or parallel run into the
+        directory report.
+
+        Returns:
+            list: The trackers of the run, each providing an add(mail_item_metrics) and a get_report() method.
+        """
+        from .email_size_statistics import SizeTracker
+        run_trackers = [SizeTracker()]
+        if self._deduplicate:
+            from .email_deduplication import DuplicateTracker
+            run_trackers.append(DuplicateTracker())
+        return run_trackers
+
+    def _update_directory_report(self, processed_count: int, start_time: float, workers: int,
+                                 cached_count: int = 0, run_trackers: list = ()):
+        """
+        Stores the summary of a finished streaming or parallel run in the directory report and logs it.
+
+        Args:
+            processed_count (int): The number of emails analyzed during the run.
+            start_time (float): The time.perf_counter() value taken when the run started.
+            workers (int): The number of processes used by the run.
+            cached_count (int): The number of emails served from the metrics index instead of being parsed.
+            run_trackers (list): The trackers of the run, as created by _create_run_trackers.
+        """
+        elapsed_seconds = time.perf_counter() - start_time
+        self._directory_report = {
+            'Messages Processed': processed_count,
+            'Messages Served From Index': cached_count,
+            'Workers': workers,
+            'Elapsed Seconds': round(elapsed_seconds, 6),
+            'Messages Per Second': round(processed_count / elapsed_seconds, 2) if elapsed_seconds > 0 else 0.0,
+        }
+        for run_tracker in run_trackers:
+            self._directory_report.update(run_tracker.get_report())
+        logger.info("Analyzed %d email(s) in %.3fs using %d worker(s)", processed_count, elapsed_seconds, workers)
+
+    def get_directory_report(self) -> dict:
+        """
+        Returns the summary of the last iter_metrics or analyze_parallel run, such as the number of emails
+        processed, the elapsed time, the throughput in messages per second, the total, attachment and body
+        sizes with the email size histogram and, when deduplicate is enabled, the duplicate statistics and
+        clusters of identical emails.
+
+        Returns:
+            dict: The summary of the last run, or an empty dictionary if no run has finished yet.
+        """
+        return dict(self._directory_report)
+
+
+def _skip_read_ahead(email_lookup: tuple) -> None:
+    """
+    Stands for _prefetch_email_file when prefetching is disabled, the email is then read when it is analyzed.
+
+    Args:
+        email_lookup (tuple): An (email_source, file_stat, cached_metrics) tuple yielded by
+            _iter_indexed_email_sources.
+
+    Returns:
+        None: No email content is read ahead.
+    """
+    return None
+
+
+# Analyzer instance used by an analyze_parallel worker process, initialized once per process
+_worker_email_analyzer: EmailAnalyzer = None
+
+
+def _init_parallel_worker(email_file_path: str, analyzer_options: dict):
+    """
+    Initializes the EmailAnalyzer instance of an analyze_parallel worker process.
+
+    Args:
+        email_file_path (str): The path given to the EmailAnalyzer running the parallel analysis.
+        analyzer_options (dict): The constructor options of the EmailAnalyzer running the parallel analysis.
+    """
+    global _worker_email_analyzer
+    _restart_logging_in_worker()
+    _worker_email_analyzer = EmailAnalyzer(email_file_path, **analyzer_options)
+
+
+def _take_worker_stats() -> Union['AnalyzerStats', None]:
+    """
+    Hands over the instrumentation statistics collected by the worker process since the previous call, so they can
+    be merged into the statistics of the parent process.
+
+    Returns:
+        Union[AnalyzerStats, None]: The statistics of the worker, or None if instrumentation is disabled.
+    """
+    worker_stats = _worker_email_analyzer.stats
+    if worker_stats is not None:
+        from .instrumentation import AnalyzerStats
+        _worker_email_analyzer.stats = AnalyzerStats(slowest_count=worker_stats.slowest_count)
+    return worker_stats
+
+
+def _analyze_email_sources_chunk(email_sources: List[tuple]) -> tuple:
+    """
+    Analyzes a chunk of emails inside an analyze_parallel worker process.
+
+    Args:
+        email_sources (List[tuple]): The (file_path, offset, length) tuples locating the emails of the chunk.
+
+    Returns:
+        tuple: The metrics of the emails, in the same order as email_sources (None if the chunk failed), the
+        instrumentation statistics of the chunk (None if instrumentation is disabled), and the exception that made
+        the chunk fail (None if it did not). The exception is returned rather than raised, so the statistics
+        recording it still reach the parent process, which raises it.
+    """
+    try:
+        chunk_metrics = [_worker_email_analyzer._analyze_email_source(email_source) for email_source in email_sources]
+    except Exception as err:
+        return None, _take_worker_stats(), err
+    return chunk_metrics, _take_worker_stats(), None
+
+
+def _analyze_raw_email_in_worker(raw_email: bytes, mail_item_metrics: dict) -> tuple:
+    """
+    Parses and extracts the metrics of a raw email inside a worker process initialized by _init_parallel_worker.
+
+    Args:
+        raw_email (bytes): The raw email content.
+        mail_item_metrics (dict): The metrics identifying where the email comes from.
+
+    Returns:
+        tuple: The metrics of the email (None if its analysis failed), the instrumentation statistics of its
+        analysis (None if instrumentation is disabled), and the exception that made the analysis fail (None if it
+        did not), returned so the statistics recording it still reach the parent process.
+    """
+    try:
+        mail_item_metrics = _worker_email_analyzer._analyze_raw_email(raw_email=raw_email,
+                                                                      mail_item_metrics=mail_item_metrics)
+    except Exception as err:
+        return None, _take_worker_stats(), err
+    return mail_item_metrics, _take_worker_stats(), None
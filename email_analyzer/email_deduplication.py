@@ -0,0 +1,149 @@
+"""
+Module: email_deduplication.py
+
+This module provides the building blocks used by the EmailAnalyzer class to deduplicate identical emails and
+attachments across a corpus. Raw emails and decoded attachment payloads are identified by a content hash, a bounded
+LRU cache memoizes the results computed for a hash, and a tracker collects the duplicate clusters found during a run.
+
+Author: S S R C Kashyap
+Email: 1kasyap97@gmail.com
+Reviewer: Daniel Caffrey
+Email: dcaffrey@topsec.com
+"""
+
+import hashlib
+from collections import OrderedDict
+from typing import Any
+
+
+def content_hash(data: bytes) -> str:
+    """
+    Computes the content hash used to identify identical emails and attachments.
+
+    Args:
+        data (bytes): The raw email or decoded attachment content.
+
+    Returns:
+        str: The hexadecimal BLAKE2b digest of the content.
+    """
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+class LRUCache:
+    """
+    LRUCache is a bounded mapping that evicts the least recently used entry once it holds maxsize entries.
+
+    Attributes:
+        maxsize (int): The maximum number of entries held by the cache.
+        hits (int): The number of lookups that found their key in the cache.
+        misses (int): The number of lookups that did not find their key in the cache.
+    """
+    def __init__(self, maxsize: int):
+        """
+        Initializes an empty LRUCache.
+
+        Args:
+            maxsize (int): The maximum number of entries held by the cache.
+
+        Raises:
+            ValueError: If maxsize is lower than 1.
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be greater than or equal to 1")
+
+        self.maxsize = maxsize
+        self.hits: int = 0
+        self.misses: int = 0
+        self._entries: OrderedDict = OrderedDict()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        Returns the value cached for key, and marks it as the most recently used entry.
+
+        Args:
+            key (str): The key to look up.
+            default (Any): The value returned if key is not in the cache.
+
+        Returns:
+            Any: The cached value, or default if key is not in the cache.
+        """
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: Any):
+        """
+        Caches value for key, evicting the least recently used entry if the cache is full.
+
+        Args:
+            key (str): The key of the entry.
+            value (Any): The value to cache.
+        """
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DuplicateTracker:
+    """
+    DuplicateTracker collects the content hashes of the emails and attachments seen during a run, and reports the
+    clusters of identical emails and the number of duplicate attachments.
+    """
+    def __init__(self):
+        """
+        Initializes an empty DuplicateTracker.
+        """
+        # Maps the content hash of every email seen to the list of the paths of the emails sharing it
+        self._message_paths: dict = {}
+        # The content hashes of every attachment seen
+        self._attachment_hashes: set = set()
+        # The number of attachments whose content hash was already seen
+        self._duplicate_attachment_count: int = 0
+
+    def add(self, mail_item_metrics: dict):
+        """
+        Records the content hashes found in the metrics of an email.
+
+        Args:
+            mail_item_metrics (dict): The metrics of an email, as produced with deduplication enabled.
+        """
+        message_hash = mail_item_metrics.get('Content Hash')
+        if message_hash is not None:
+            # The emails of an mbox archive share the path of the archive, they are told apart by their offset
+            message_location = mail_item_metrics.get('File Path')
+            if mail_item_metrics.get('Message Offset') is not None:
+                message_location = f"{message_location}@{mail_item_metrics['Message Offset']}"
+            self._message_paths.setdefault(message_hash, []).append(message_location)
+
+        for attachment_record in mail_item_metrics.get('Attachments', []):
+            attachment_hash = attachment_record.get('Content Hash')
+            if attachment_hash is None:
+                continue
+            if attachment_hash in self._attachment_hashes:
+                self._duplicate_attachment_count += 1
+            else:
+                self._attachment_hashes.add(attachment_hash)
+
+    def get_report(self) -> dict:
+        """
+        Returns the duplicate statistics of the run.
+
+        Returns:
+            dict: The number of unique and duplicate emails, the number of duplicate attachments, and the
+            duplicate clusters, mapping the content hash of every email seen more than once to its paths.
+        """
+        duplicate_clusters = {message_hash: paths for message_hash, paths in self._message_paths.items()
+                              if len(paths) > 1}
+        return {'Unique Messages': len(self._message_paths),
+                'Duplicate Messages': sum(len(paths) - 1 for paths in duplicate_clusters.values()),
+                'Duplicate Attachments': self._duplicate_attachment_count,
+                'Duplicate Clusters': duplicate_clusters}
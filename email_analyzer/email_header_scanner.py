@@ -0,0 +1,101 @@
+"""
+Module: email_header_scanner.py
+
+This module provides a lightweight alternative to the full email.parser.Parser for the metrics that only depend on
+the email headers. Instead of building the complete Message tree, including every MIME part and attachment payload,
+only the header block of the email (everything up to the first blank line) is parsed, and the presence of
+attachments is detected by scanning the body for attachment Content-Disposition headers.
+
+Author: S S R C Kashyap
+Email: 1kasyap97@gmail.com
+Reviewer: Daniel Caffrey
+Email: dcaffrey@topsec.com
+"""
+
+import mmap
+import re
+from email import policy
+from email.message import Message
+from email.parser import BytesHeaderParser
+from typing import Union
+
+# Matches a line break, like the email parser it accepts CRLF, LF and bare CR line endings. A CR followed by a LF is
+# never matched on its own, so that a single CRLF line break is not taken for two line breaks.
+_LINE_BREAK = rb'(?:\r\n|\r(?!\n)|\n)'
+
+# Matches the blank line separating the header block from the body of an email
+_HEADER_BLOCK_END = re.compile(_LINE_BREAK + _LINE_BREAK)
+
+# Matches the end of a MIME part header declaring the part as an attachment, the value may be folded onto the next
+# line. The pattern starts with a literal, so the regex engine skips quickly to the candidate headers, whose
+# 'Content' prefix and position at the start of a line are then checked on the preceding bytes. Anchoring the
+# pattern itself, or making it case-insensitive as a whole, makes the engine try every position of the body.
+_ATTACHMENT_DISPOSITION = re.compile(rb'-(?i:disposition):[ \t]*(?:' + _LINE_BREAK + rb'[ \t]+)?(?i:attachment)\b')
+
+# The header name preceding the match of _ATTACHMENT_DISPOSITION, compared in lower case
+_CONTENT_PREFIX = b'content'
+
+# The bytes ending a line, the Content-Disposition header is only recognized at the start of a line
+_LINE_BREAK_BYTES = b'\r\n'
+
+# Header parser reused for every email, BytesHeaderParser objects do not keep any state between calls. It uses the
+# same modern policy as the full parser of the EmailAnalyzer class, so both paths return the same header values.
+_header_parser = BytesHeaderParser(policy=policy.default)
+
+
+def split_header_block(raw_email: Union[bytes, mmap.mmap]) -> tuple:
+    """
+    Finds the end of the header block of a raw email, without looking at the body content.
+
+    Args:
+        raw_email (Union[bytes, mmap.mmap]): The raw email content, as bytes or as a memory map.
+
+    Returns:
+        tuple: A (header_block, body_offset) tuple, where header_block is a bytes object and body_offset is the
+        index of the first byte of the body in raw_email. The body is returned as an offset rather than a bytes
+        object to avoid copying large bodies.
+    """
+    header_block_end = _HEADER_BLOCK_END.search(raw_email)
+    if header_block_end is None:
+        return raw_email, len(raw_email)
+    return raw_email[:header_block_end.start()], header_block_end.end()
+
+
+def parse_header_block(header_block: bytes) -> Message:
+    """
+    Parses the header block of an email, as returned by split_header_block.
+
+    Args:
+        header_block (bytes): The header block of the email.
+
+    Returns:
+        Message: A Message object holding the headers of the email and no payload.
+    """
+    return _header_parser.parsebytes(header_block + b'\n\n', headersonly=True)
+
+
+def has_attachment_parts(headers: Message, raw_email: Union[bytes, mmap.mmap], body_offset: int) -> bool:
+    """
+    Checks if a multipart email contains attachments by scanning its body for the Content-Disposition header
+    of an attachment part, without building the MIME tree or decoding any payload.
+
+    Like the full MIME walk, only multipart emails are considered to have attachments.
+
+    Args:
+        headers (Message): The headers of the email, as returned by parse_header_block.
+        raw_email (Union[bytes, mmap.mmap]): The raw email content, as bytes or as a memory map.
+        body_offset (int): The offset of the body in raw_email, as returned by split_header_block.
+
+    Returns:
+        bool: True if at least one MIME part of the email is an attachment, False otherwise.
+    """
+    if headers.get_content_maintype() != 'multipart':
+        return False
+    for disposition in _ATTACHMENT_DISPOSITION.finditer(raw_email, body_offset):
+        header_start = disposition.start() - len(_CONTENT_PREFIX)
+        if header_start < body_offset or raw_email[header_start:disposition.start()].lower() != _CONTENT_PREFIX:
+            continue
+        # The body starts right after the blank line ending the header block, so it always starts a line
+        if header_start == body_offset or raw_email[header_start - 1] in _LINE_BREAK_BYTES:
+            return True
+    return False
@@ -0,0 +1,68 @@
+"""
+Module: email_size_statistics.py
+
+This module provides the SizeTracker class, used by the EmailAnalyzer class to aggregate the sizes of the emails
+analyzed during a run into the directory report: the total size, the share of it taken by attachments, and a
+histogram of the email sizes. The sizes are taken from the metrics of each email, so no extra file system call is
+made to collect them.
+
+Author: S S R C Kashyap
+Email: 1kasyap97@gmail.com
+Reviewer: Daniel Caffrey
+Email: dcaffrey@topsec.com
+"""
+
+# The upper bounds (exclusive) and labels of the buckets of the email size histogram, the last bucket has no bound
+SIZE_HISTOGRAM_BUCKETS = ((4 * 1024, '< 4 KiB'),
+                          (64 * 1024, '4 KiB - 64 KiB'),
+                          (1024 * 1024, '64 KiB - 1 MiB'),
+                          (16 * 1024 * 1024, '1 MiB - 16 MiB'),
+                          (None, '>= 16 MiB'))
+
+
+class SizeTracker:
+    """
+    SizeTracker aggregates the total, attachment and body sizes of the emails seen during a run, and counts the
+    emails falling into each bucket of the size histogram.
+    """
+    def __init__(self):
+        """
+        Initializes an empty SizeTracker.
+        """
+        self._total_bytes: int = 0
+        self._attachment_bytes: int = 0
+        self._size_histogram: dict = {label: 0 for _, label in SIZE_HISTOGRAM_BUCKETS}
+
+    def add(self, mail_item_metrics: dict):
+        """
+        Records the sizes found in the metrics of an email.
+
+        Args:
+            mail_item_metrics (dict): The metrics of an email.
+        """
+        message_size = mail_item_metrics.get('Total Message Size')
+        if message_size is None:
+            return
+
+        self._total_bytes += message_size
+        # Attachments are accounted for with their encoded size, which is the space they take in the email
+        self._attachment_bytes += sum(attachment_record['Encoded Size'] or 0
+                                      for attachment_record in mail_item_metrics.get('Attachments', []))
+
+        for upper_bound, label in SIZE_HISTOGRAM_BUCKETS:
+            if upper_bound is None or message_size < upper_bound:
+                self._size_histogram[label] += 1
+                break
+
+    def get_report(self) -> dict:
+        """
+        Returns the size statistics of the run.
+
+        Returns:
+            dict: The total size of the emails, the size of their attachments, the size of everything else
+            (headers and body parts), all in bytes, and the email size histogram.
+        """
+        return {'Total Bytes': self._total_bytes,
+                'Attachment Bytes': self._attachment_bytes,
+                'Body Bytes': self._total_bytes - self._attachment_bytes,
+                'Size Histogram': dict(self._size_histogram)}
@@ -0,0 +1,540 @@
+"""
+Module: engine.py
+
+This module provides the EmailAnalysisEngine class, the stateless core of the analysis of an email: it takes the raw
+bytes of an email and returns its metrics (subject, message ID, from address, size and attachments). The engine is
+created once, with its parser, email policy and options, and can then analyze any number of emails, from any number
+of threads, without any state carrying over between calls. The EmailAnalyzer class delegates the analysis of every
+email to an engine, and long-running services (e.g. an ingest daemon analyzing emails taken from a queue) can use an
+engine directly, without going through the file system.
+
+Author: S S R C Kashyap
+Email: 1kasyap97@gmail.com
+Reviewer: Daniel Caffrey
+Email: dcaffrey@topsec.com
+"""
+
+import copy
+import mmap
+import os
+import threading
+import time
+from email import policy
+from email.message import Message
+from email.parser import BytesParser, Parser
+from typing import TYPE_CHECKING, Iterable, Iterator, Union
+
+# python-magic (imported by _get_magic_handle on first use), the deduplication helpers (which import hashlib) and the
+# instrumentation statistics are only loaded by the runs that use them, they are only imported here for type annotations
+if TYPE_CHECKING:
+    import magic
+    from .email_deduplication import LRUCache
+    from .instrumentation import AnalyzerStats
+
+# Importing custom exceptions from custom_email_analyzer_exceptions.py to raise proper exception messages
+from .custom_email_analyzer_exceptions import AttachmentProcessingError, MessageLimitExceededError
+
+# Importing the limits bounding the resources used by the analysis of an email
+from .analysis_limits import AnalysisLimits, MessageGuard, flag_limit_exceeded
+
+# Importing the header-only scanning helpers used by the headers-only fast path
+from .email_header_scanner import split_header_block, parse_header_block, has_attachment_parts
+
+# Importing the lazy view of raw emails, which only decodes the headers and payloads the metrics look at
+from .lazy_message import LazyEmailMessage, LazyMimePart
+
+# importing the package logger from log_config.py to use the same logger instance across the package/s
+from .log_config import logger
+
+# The email policy used to parse emails, headers are returned as decoded strings (RFC 2047 encoded words included)
+EMAIL_POLICY = policy.default
+
+# The number of leading bytes of an attachment inspected by libmagic to detect its file type
+MAGIC_BUFFER_SIZE = 64 * 1024
+
+# The magic.Magic handles of the threads of the current process, with the id of the process they were created in
+_magic_handles = threading.local()
+
+
+def _get_magic_handle() -> 'magic.Magic':
+    """
+    Returns the magic.Magic handle of the current thread, creating it on first use.
+
+    Loading libmagic and its database is expensive, so a single handle is reused for every attachment
+    instead of being re-initialized on each call. python-magic serializes the calls made on a handle with a
+    lock, so every thread gets its own handle and threads never wait for each other. A new handle is created
+    after a fork, so worker processes never share the handle of their parent process.
+
+    The python-magic module itself is only imported here, so importing the package, and analyses that never
+    detect an attachment type (e.g. headers-only runs), do not pay for loading libmagic.
+
+    Returns:
+        magic.Magic: A handle that detects the MIME type of a buffer.
+    """
+    if getattr(_magic_handles, 'pid', None) != os.getpid():
+        # Importing python-magic module's to identify the attachment file-type from the email attachments
+        import magic
+        _magic_handles.handle = magic.Magic(mime=True)
+        _magic_handles.pid = os.getpid()
+    return _magic_handles.handle
+
+
+def _header_value(email_headers: Message, header_name: str) -> Union[str, None]:
+    """
+    Returns the value of a header of an email as a plain string.
+
+    The header objects of the modern email policy are str subclasses holding references to parsed header
+    structures, they are converted to plain strings so the metrics stay cheap to pickle and serialize.
+
+    Args:
+        email_headers (Message): The parsed email, or its parsed header block.
+        header_name (str): The name of the header.
+
+    Returns:
+        Union[str, None]: The decoded value of the header, or None if the email has no such header.
+    """
+    header_value = email_headers[header_name]
+    return None if header_value is None else str(header_value)
+
+
+class EmailAnalysisEngine:
+    """
+    EmailAnalysisEngine extracts the metrics of raw emails. It is thread-safe and keeps no state between calls,
+    apart from the deduplication caches when deduplicate is enabled, which only memoize results.
+
+    Attributes:
+        headers_only (bool): Whether only the header block of the emails is parsed.
+        detect_attachment_types (bool): Whether the attachment payloads are decoded to detect their file type.
+        deduplicate (bool): Whether identical emails and attachments are detected and analyzed only once.
+        limits (Union[AnalysisLimits, None]): The limits bounding the resources used by the analysis of an email.
+    """
+    def __init__(self, headers_only: bool = False, detect_attachment_types: bool = True, deduplicate: bool = False,
+                 dedup_cache_size: int = 4096, limits: AnalysisLimits = None):
+        """
+        Initializes the engine, its parser and, if attachment types are detected from decoded payloads, the
+        libmagic handle of the current thread.
+
+        Args:
+            headers_only (bool): If True, only the header block of each email is parsed and attachments are
+                detected with a lightweight scan of the MIME part headers, instead of building the full Message
+                tree. The attachment file names and types are not reported in this mode.
+            detect_attachment_types (bool): If False, the attachment payloads are never decoded and only the
+                attachment file names, declared types and sizes are reported.
+            deduplicate (bool): If True, the content hash of every raw email and decoded attachment is added to
+                the metrics, and the metrics of identical emails and the detected types of identical attachments
+                are computed only once.
+            dedup_cache_size (int): The number of emails and attachments whose results are memoized when
+                deduplicate is enabled, the least recently used results are evicted first.
+            limits (AnalysisLimits): The limits bounding the size, MIME depth, part count, decoded attachment size
+                and analysis time of every email. An email going over a limit is not analyzed any further, its
+                metrics only hold its source fields, its size and the name of the limit in the 'Limit Exceeded'
+                field. In headers-only mode, only the size limit applies. If None, no limit is enforced.
+        """
+        self.headers_only = headers_only
+        self.detect_attachment_types = detect_attachment_types
+        self.deduplicate = deduplicate
+        self.limits = limits
+
+        # BytesParser objects only hold their policy, every call builds its own FeedParser, so one can be shared
+        self._email_parser: BytesParser = BytesParser(policy=EMAIL_POLICY)
+        # Memoized metrics of raw emails and detected MIME types of attachments, keyed by content hash
+        self._message_metrics_cache: Union['LRUCache', None] = None
+        self._attachment_type_cache: Union['LRUCache', None] = None
+        if deduplicate:
+            from . import email_deduplication
+            self._message_metrics_cache = email_deduplication.LRUCache(dedup_cache_size)
+            self._attachment_type_cache = email_deduplication.LRUCache(dedup_cache_size)
+        # The LRU caches reorder their entries on every lookup, so they are shared between threads under a lock
+        self._cache_lock = threading.Lock()
+
+        # Headers-only engines never decode an attachment, so they never load libmagic
+        if detect_attachment_types and not headers_only:
+            _get_magic_handle()
+
+    def analyze_bytes(self, raw_email: Union[bytes, mmap.mmap], source_fields: dict = None,
+                      stats: 'AnalyzerStats' = None) -> dict:
+        """
+        Parses and extracts the metrics of a single raw email.
+
+        Args:
+            raw_email (Union[bytes, mmap.mmap]): The raw email content.
+            source_fields (dict): The fields identifying where the email comes from (e.g. 'File Path' and
+                'Message Offset'), copied at the start of the returned metrics.
+            stats (AnalyzerStats): The statistics recording the analysis, if instrumentation is enabled. An
+                AnalyzerStats object is not thread-safe, so each thread should record into its own object.
+
+        Returns:
+            dict: A new dictionary holding the source fields followed by the metrics of the email, with the
+            'Content Hash' field when deduplicate is enabled, or the 'Limit Exceeded' field when the email went
+            over one of the limits of the engine.
+        """
+        mail_item_metrics = dict(source_fields) if source_fields else {}
+        if stats is None:
+            return self._analyze_raw_email(raw_email=raw_email, mail_item_metrics=mail_item_metrics, stats=None)
+
+        analysis_start = time.perf_counter()
+        try:
+            self._analyze_raw_email(raw_email=raw_email, mail_item_metrics=mail_item_metrics, stats=stats)
+        except Exception as err:
+            stats.record_error(err)
+            raise
+
+        message_location = mail_item_metrics.get('File Path')
+        if mail_item_metrics.get('Message Offset') is not None:
+            message_location = f"{message_location}@{mail_item_metrics['Message Offset']}"
+        stats.record_message(location=message_location, seconds=time.perf_counter() - analysis_start,
+                             message_size=len(raw_email),
+                             attachment_count=len(mail_item_metrics.get('Attachments', ())))
+        return mail_item_metrics
+
+    def analyze_many(self, raw_emails: Iterable[Union[bytes, mmap.mmap]],
+                     stats: 'AnalyzerStats' = None) -> Iterator[dict]:
+        """
+        Parses and extracts the metrics of several raw emails, one at a time.
+
+        Args:
+            raw_emails (Iterable[Union[bytes, mmap.mmap]]): The raw email contents, e.g. a generator reading them
+                from a queue.
+            stats (AnalyzerStats): The statistics recording the analyses, if instrumentation is enabled.
+
+        Yields:
+            dict: The metrics of every email, in the order of raw_emails.
+        """
+        for raw_email in raw_emails:
+            yield self.analyze_bytes(raw_email, stats=stats)
+
+    def parse(self, raw_email: Union[bytes, str]) -> Message:
+        """
+        Parses a raw email, given as bytes or as a string, with the policy of the engine.
+
+        Args:
+            raw_email (Union[bytes, str]): The raw email content.
+
+        Returns:
+            Message: The parsed email object.
+        """
+        if isinstance(raw_email, str):
+            return Parser(policy=EMAIL_POLICY).parsestr(raw_email)
+        return self._email_parser.parsebytes(raw_email)
+
+    def _analyze_raw_email(self, raw_email: Union[bytes, mmap.mmap], mail_item_metrics: dict,
+                           stats: Union['AnalyzerStats', None]) -> dict:
+        """
+        Parses and extracts the metrics of a single raw email, without recording the email in the instrumentation
+        statistics.
+
+        Args:
+            raw_email (Union[bytes, mmap.mmap]): The raw email content.
+            mail_item_metrics (dict): The metrics identifying where the email comes from, completed in place.
+            stats (Union[AnalyzerStats, None]): The statistics recording the stage timings, if any.
+
+        Returns:
+            dict: The completed mail_item_metrics dictionary.
+        """
+        guard = None
+        if self.limits is not None:
+            try:
+                # The size limit is checked first, so oversized emails are not even hashed
+                guard = self.limits.start_message(len(raw_email))
+            except MessageLimitExceededError as limit_error:
+                return flag_limit_exceeded(limit_error, mail_item_metrics, len(raw_email), stats)
+
+        message_hash = None
+        if self._message_metrics_cache is not None:
+            # Identical emails (e.g. re-deliveries or copies sent to several recipients) are only analyzed once
+            from .email_deduplication import content_hash
+            message_hash = content_hash(raw_email)
+            with self._cache_lock:
+                cached_metrics = self._message_metrics_cache.get(message_hash)
+            if cached_metrics is not None:
+                mail_item_metrics.update(copy.deepcopy(cached_metrics))
+                return mail_item_metrics
+
+        if stats is not None:
+            parse_start = time.perf_counter()
+
+        if self.headers_only:
+            mail_item_metrics.update(self.get_header_metrics(raw_email=raw_email))
+            if stats is not None:
+                stats.record_stage('parse', time.perf_counter() - parse_start)
+        else:
+            try:
+                # The raw email is only indexed, the headers and payloads are decoded when the metrics look at them
+                parsed_email = LazyEmailMessage(raw_email, guard=guard)
+                if stats is not None:
+                    stats.record_stage('parse', time.perf_counter() - parse_start)
+                mail_item_metrics.update(self.get_message_metrics(parsed_email=parsed_email,
+                                                                  message_size=len(raw_email), stats=stats,
+                                                                  guard=guard))
+            except MessageLimitExceededError as limit_error:
+                return flag_limit_exceeded(limit_error, mail_item_metrics, len(raw_email), stats)
+
+        if message_hash is not None:
+            mail_item_metrics['Content Hash'] = message_hash
+            cached_metrics = copy.deepcopy({key: value for key, value in mail_item_metrics.items()
+                                            if key not in ('File Path', 'Message Offset')})
+            with self._cache_lock:
+                self._message_metrics_cache.put(message_hash, cached_metrics)
+        return mail_item_metrics
+
+    def get_header_metrics(self, raw_email: Union[bytes, mmap.mmap]) -> dict:
+        """
+        Extracts the metrics of a single raw email using the headers-only fast path.
+
+        Only the header block of the email is parsed, and the attachment flag is computed by scanning the
+        MIME part headers of the body, so no Message tree is built and no attachment payload is decoded.
+
+        Args:
+            raw_email (Union[bytes, mmap.mmap]): The raw email content.
+
+        Returns:
+            dict: A new dictionary containing the subject, message ID, from address, total message size and
+            attachment flag of the given email.
+        """
+        header_block, body_offset = split_header_block(raw_email)
+        email_headers = parse_header_block(header_block)
+
+        return {'Subject': _header_value(email_headers, 'subject'),
+                'Message ID': _header_value(email_headers, 'message-id'),
+                'From Address': _header_value(email_headers, 'from'),
+                'Total Message Size': len(raw_email),
+                'Has Attachments': has_attachment_parts(email_headers, raw_email, body_offset)}
+
+    def get_message_metrics(self, parsed_email: Union[Message, LazyMimePart], message_size: Union[int, None],
+                            stats: 'AnalyzerStats' = None, guard: MessageGuard = None) -> dict:
+        """
+        Extracts the metrics of a single parsed email, such as subject, message ID, from address, total message
+        size, and attachment information.
+
+        Args:
+            parsed_email (Union[Message, LazyMimePart]): A parsed email object (instance of email.message.Message),
+                or a lazy view of a raw email (instance of LazyEmailMessage).
+            message_size (Union[int, None]): The size in bytes of the raw email, if known.
+            stats (AnalyzerStats): The statistics recording the stage timings, if instrumentation is enabled.
+            guard (MessageGuard): The guard enforcing the decoded attachment size and time limits of the email, if
+                any.
+
+        Returns:
+            dict: A new dictionary containing the metrics of the given email.
+
+        Raises:
+            MessageLimitExceededError: If the email goes over a limit of guard.
+        """
+        mail_item_metrics = {'Subject': _header_value(parsed_email, 'subject'),
+                             'Message ID': _header_value(parsed_email, 'message-id'),
+                             'From Address': _header_value(parsed_email, 'from'),
+                             'Total Message Size': message_size}
+
+        if stats is None:
+            attachment_records = self._get_attachment_records(parsed_email=parsed_email, stats=None, guard=guard)
+        else:
+            attachments_start = time.perf_counter()
+            attachment_records = self._get_attachment_records(parsed_email=parsed_email, stats=stats, guard=guard)
+            stats.record_stage('attachments', time.perf_counter() - attachments_start)
+
+        mail_item_metrics['Has Attachments'] = bool(attachment_records)
+        if attachment_records:
+            # The first attachment is also reported in the original single-attachment fields
+            first_attachment = attachment_records[0]
+            mail_item_metrics['Attachment File Name'] = first_attachment['File Name']
+            mail_item_metrics['Attachment File Type'] = first_attachment['Type Description']
+            mail_item_metrics['Attachments'] = attachment_records
+
+        return mail_item_metrics
+
+    def _get_attachment_records(self, parsed_email: Union[Message, LazyMimePart], stats: Union['AnalyzerStats', None],
+                                guard: Union[MessageGuard, None] = None) -> list:
+        """
+        Builds the records of the attachments of a parsed email.
+
+        Every MIME part of the email is visited once, and a record is collected for every attachment, so
+        emails with several attachments report all of them.
+
+        Args:
+            parsed_email (Union[Message, LazyMimePart]): A parsed email object, or a lazy view of a raw email.
+            stats (Union[AnalyzerStats, None]): The statistics recording the errors and stage timings, if any.
+            guard (Union[MessageGuard, None]): The guard enforcing the limits of the email, if any.
+
+        Returns:
+            list: The attachment records built by _get_attachment_record. If an attachment cannot be processed,
+            the error is logged and the records of the attachments processed so far are returned.
+
+        Raises:
+            MessageLimitExceededError: If the attachments go over a limit of guard.
+        """
+        attachment_records = []
+
+        try:
+            # If the email is a multipart message, iterate through its parts, otherwise it has no attachments
+            if parsed_email.is_multipart():
+                for part in parsed_email.walk():
+
+                    # Check if the current part is an attachment
+                    if part.get_content_disposition() == 'attachment':
+                        try:
+                            attachment_record = self._get_attachment_record(part, stats=stats, guard=guard)
+                        except MessageLimitExceededError:
+                            # A limit stops the analysis of the whole email, not only of the attachment
+                            raise
+                        except Exception as err:
+                            raise AttachmentProcessingError(attachment_name=part.get_filename()) from err
+                        attachment_records.append(attachment_record)
+
+        except AttachmentProcessingError as attachment_error:
+            # Log any attachment processing errors, the attachments processed so far are still reported
+            logger.error(attachment_error)
+            if stats is not None:
+                stats.record_error(attachment_error)
+
+        return attachment_records
+
+    def _get_attachment_record(self, part: Union[Message, LazyMimePart], stats: Union['AnalyzerStats', None],
+                               guard: Union[MessageGuard, None] = None) -> dict:
+        """
+        Builds the record describing a single attachment part of an email.
+
+        The payload of the part is decoded at most once, and only when the attachment types are detected.
+
+        Args:
+            part (Union[Message, LazyMimePart]): The MIME part of the email holding the attachment.
+            stats (Union[AnalyzerStats, None]): The statistics recording the detection time, if any.
+            guard (Union[MessageGuard, None]): The guard enforcing the decoded attachment size and time limits of
+                the email, if any. The decoded size is checked before the payload is decoded whenever it can be
+                computed from the encoded payload, and again once the payload is decoded.
+
+        Returns:
+            dict: The file name, declared MIME type, detected MIME type, type description, encoded size and
+            decoded size of the attachment. The detected type, description and sizes are None when they are
+            not available. The content hash of the decoded attachment is added when deduplicate is enabled.
+
+        Raises:
+            MessageLimitExceededError: If the attachment goes over a limit of guard.
+        """
+        encoded_payload = part.get_payload()
+        attachment_record = {'File Name': part.get_filename(),
+                             'Declared Type': part.get_content_type(),
+                             'Detected Type': None,
+                             'Type Description': None,
+                             'Encoded Size': None,
+                             'Decoded Size': None}
+
+        # Attachments holding nested MIME parts (e.g. forwarded emails) have no payload of their own
+        if not isinstance(encoded_payload, str):
+            return attachment_record
+
+        attachment_record['Encoded Size'] = len(encoded_payload)
+        transfer_encoding = part.get('content-transfer-encoding', '').strip().lower()
+        if guard is not None:
+            guard.check_attachment(self.estimate_decoded_size(encoded_payload, transfer_encoding))
+
+        if self.detect_attachment_types:
+            attachment_data = part.get_payload(decode=True) or b''
+            attachment_record['Decoded Size'] = len(attachment_data)
+            if guard is not None:
+                guard.add_attachment(len(attachment_data))
+
+            if self._attachment_type_cache is None:
+                attachment_record['Detected Type'] = self._detect_attachment_type(attachment_data, stats=stats)
+            else:
+                # Identical attachments (e.g. the same invoice template) are only run through libmagic once
+                from .email_deduplication import content_hash
+                attachment_record['Content Hash'] = content_hash(attachment_data)
+                with self._cache_lock:
+                    detected_type = self._attachment_type_cache.get(attachment_record['Content Hash'])
+                if detected_type is None:
+                    detected_type = self._detect_attachment_type(attachment_data, stats=stats)
+                    with self._cache_lock:
+                        self._attachment_type_cache.put(attachment_record['Content Hash'], detected_type)
+                attachment_record['Detected Type'] = detected_type
+            attachment_record['Type Description'] = self.describe_attachment_type(attachment_record['Detected Type'])
+        else:
+            attachment_record['Decoded Size'] = self.estimate_decoded_size(encoded_payload, transfer_encoding)
+            if guard is not None:
+                guard.add_attachment(attachment_record['Decoded Size'] or 0)
+        return attachment_record
+
+    def _detect_attachment_type(self, attachment_data: bytes, stats: Union['AnalyzerStats', None]) -> str:
+        """
+        Detects the MIME type of an attachment with detect_attachment_mime_type, timing the detection in the
+        'detect' stage when instrumentation is enabled.
+
+        Args:
+            attachment_data (bytes): The decoded content of the attachment.
+            stats (Union[AnalyzerStats, None]): The statistics recording the detection time, if any.
+
+        Returns:
+            str: The detected MIME type of the attachment.
+        """
+        if stats is None:
+            return self.detect_attachment_mime_type(attachment_data)
+
+        detect_start = time.perf_counter()
+        detected_type = self.detect_attachment_mime_type(attachment_data)
+        stats.record_stage('detect', time.perf_counter() - detect_start)
+        return detected_type
+
+    @staticmethod
+    def detect_attachment_mime_type(attachment_data: bytes) -> str:
+        """
+        Detects the MIME type of an attachment using the `python-magic` library.
+
+        The MIME type is determined from the decoded attachment bytes held in memory, only the first
+        MAGIC_BUFFER_SIZE bytes are inspected.
+
+        Args:
+            attachment_data (bytes): The decoded content of the attachment.
+
+        Returns:
+            str: The detected MIME type of the attachment, such as 'application/pdf'.
+        """
+        return _get_magic_handle().from_buffer(attachment_data[:MAGIC_BUFFER_SIZE])
+
+    @staticmethod
+    def describe_attachment_type(file_type: str) -> str:
+        """
+        Returns a descriptive string for the MIME type of an attachment.
+
+        Args:
+            file_type (str): The MIME type of the attachment.
+
+        Returns:
+            str: A descriptive string indicating the type of the attachment.
+        """
+        if file_type.startswith('text/'):
+            return "The attachment seems like a document report"
+        elif file_type.startswith('application/pdf'):
+            return "The attachment seems like an invoice"
+        elif file_type.startswith('image/'):
+            return "The attachment seems like an image"
+        elif file_type.startswith('audio/'):
+            return "The attachment seems like an audio file"
+        elif file_type.startswith('application/vnd.ms-excel'):
+            return "The attachment seems like a spreadsheet"
+        elif file_type.startswith('application/zip'):
+            return "The attachment seems like a compressed file"
+        elif file_type.startswith('application/octet-stream'):
+            return "The attachment seems like a code file"
+        else:
+            return "The attachment file type is Un-Known"
+
+    @staticmethod
+    def estimate_decoded_size(encoded_payload: str, transfer_encoding: str) -> Union[int, None]:
+        """
+        Computes the decoded size of an attachment payload from its encoded form, without decoding it.
+
+        Args:
+            encoded_payload (str): The payload of the attachment, as found in the email.
+            transfer_encoding (str): The Content-Transfer-Encoding of the attachment, in lower case.
+
+        Returns:
+            Union[int, None]: The decoded size in bytes, or None if it cannot be computed without decoding the
+            payload (e.g. quoted-printable payloads).
+        """
+        if transfer_encoding == 'base64':
+            # Every 4 base64 characters encode 3 bytes, the line breaks and the '=' padding carry no data
+            data_length = len(encoded_payload) - sum(encoded_payload.count(char) for char in ' \t\r\n')
+            padding_length = len(encoded_payload.rstrip()) - len(encoded_payload.rstrip().rstrip('='))
+            return max(data_length * 3 // 4 - padding_length, 0)
+        elif transfer_encoding in ('', '7bit', '8bit', 'binary'):
+            return len(encoded_payload)
+        return None
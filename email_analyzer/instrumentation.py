@@ -0,0 +1,188 @@
+"""
+Module: instrumentation.py
+
+This module provides the AnalyzerStats class, used by the EmailAnalyzer class to record where the time of an analysis
+goes when instrumentation is enabled: the time spent in every stage of the pipeline (reading, parsing, walking the
+MIME parts and detecting the attachment types with libmagic), the bytes, messages and attachments processed, the
+errors raised by exception class, and the slowest messages. The statistics can be exported as a dictionary or in the
+Prometheus text exposition format.
+
+AnalyzerStats objects only hold plain values, so the statistics collected by worker processes can be sent back to the
+parent process and merged into its own statistics.
+
+Author: S S R C Kashyap
+Email: 1kasyap97@gmail.com
+Reviewer: Daniel Caffrey
+Email: dcaffrey@topsec.com
+"""
+
+import heapq
+
+# The stages of the analysis of an email, in pipeline order. The 'detect' stage is nested in the 'attachments' stage,
+# and the 'parse' stage includes the attachment scan of the headers-only fast path.
+STAGES = ('read', 'parse', 'attachments', 'detect')
+
+
+def _escape_label_value(label_value: str) -> str:
+    """
+    Escapes a label value for the Prometheus text exposition format.
+
+    Args:
+        label_value (str): The raw label value.
+
+    Returns:
+        str: The label value with its backslashes, double quotes and line breaks escaped.
+    """
+    return label_value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class AnalyzerStats:
+    """
+    AnalyzerStats accumulates the timings, volumes, errors and slowest messages of the analyses of an EmailAnalyzer.
+
+    The statistics keep accumulating over the runs of the analyzer, like the counters of a monitoring system, until
+    reset() is called.
+
+    Attributes:
+        slowest_count (int): The number of slowest messages that are kept.
+    """
+    def __init__(self, slowest_count: int = 10):
+        """
+        Initializes empty statistics.
+
+        Args:
+            slowest_count (int): The number of slowest messages that are kept.
+        """
+        self.slowest_count = slowest_count
+        self.reset()
+
+    def reset(self):
+        """
+        Clears every statistic.
+        """
+        self._stage_seconds: dict = {stage: 0.0 for stage in STAGES}
+        self._stage_calls: dict = {stage: 0 for stage in STAGES}
+        self._messages: int = 0
+        self._bytes: int = 0
+        self._attachments: int = 0
+        self._errors: dict = {}
+        # Min-heap of (seconds, location) tuples, so the fastest of the kept messages is the one that is replaced
+        self._slowest_messages: list = []
+
+    def record_stage(self, stage: str, seconds: float):
+        """
+        Records the time spent in a stage of the analysis of an email.
+
+        Args:
+            stage (str): One of STAGES.
+            seconds (float): The time spent in the stage.
+        """
+        self._stage_seconds[stage] += seconds
+        self._stage_calls[stage] += 1
+
+    def record_message(self, location: str, seconds: float, message_size: int, attachment_count: int):
+        """
+        Records an analyzed email.
+
+        Args:
+            location (str): The location of the email, its file path followed by '@offset' for mbox archives.
+            seconds (float): The time spent analyzing the email, reading excluded.
+            message_size (int): The size of the raw email in bytes.
+            attachment_count (int): The number of attachments of the email.
+        """
+        self._messages += 1
+        self._bytes += message_size
+        self._attachments += attachment_count
+        self._add_slow_message(seconds, location)
+
+    def record_error(self, error: BaseException):
+        """
+        Records an error raised while validating the input path or analyzing an email.
+
+        Args:
+            error (BaseException): The exception, counted by its class name.
+        """
+        error_name = type(error).__name__
+        self._errors[error_name] = self._errors.get(error_name, 0) + 1
+
+    def _add_slow_message(self, seconds: float, location: str):
+        """
+        Keeps a message if it is among the slowest_count slowest messages seen so far.
+
+        Args:
+            seconds (float): The time spent analyzing the message.
+            location (str): The location of the message.
+        """
+        if len(self._slowest_messages) < self.slowest_count:
+            heapq.heappush(self._slowest_messages, (seconds, location))
+        elif self._slowest_messages and seconds > self._slowest_messages[0][0]:
+            heapq.heapreplace(self._slowest_messages, (seconds, location))
+
+    def merge(self, other: 'AnalyzerStats'):
+        """
+        Adds the statistics of another AnalyzerStats object, e.g. collected by a worker process, to these statistics.
+
+        Args:
+            other (AnalyzerStats): The statistics to add.
+        """
+        for stage in STAGES:
+            self._stage_seconds[stage] += other._stage_seconds[stage]
+            self._stage_calls[stage] += other._stage_calls[stage]
+        self._messages += other._messages
+        self._bytes += other._bytes
+        self._attachments += other._attachments
+        for error_name, error_count in other._errors.items():
+            self._errors[error_name] = self._errors.get(error_name, 0) + error_count
+        for seconds, location in other._slowest_messages:
+            self._add_slow_message(seconds, location)
+
+    def as_dict(self) -> dict:
+        """
+        Exports the statistics as a dictionary.
+
+        Returns:
+            dict: The messages, bytes and attachments processed, the total seconds and number of calls of every
+            stage, the error counts by exception class, and the slowest messages, slowest first.
+        """
+        return {'Messages': self._messages,
+                'Bytes': self._bytes,
+                'Attachments': self._attachments,
+                'Stage Seconds': {stage: round(seconds, 6) for stage, seconds in self._stage_seconds.items()},
+                'Stage Calls': dict(self._stage_calls),
+                'Errors': dict(self._errors),
+                'Slowest Messages': [{'Location': location, 'Seconds': round(seconds, 6)}
+                                     for seconds, location in sorted(self._slowest_messages, reverse=True)]}
+
+    def to_prometheus(self, prefix: str = 'email_analyzer') -> str:
+        """
+        Exports the statistics in the Prometheus text exposition format.
+
+        Args:
+            prefix (str): The prefix of the metric names.
+
+        Returns:
+            str: The statistics, one sample per line, ending with a line break.
+        """
+        lines = []
+
+        def add_metric(name: str, metric_type: str, description: str, samples: list):
+            lines.append(f'# HELP {prefix}_{name} {description}')
+            lines.append(f'# TYPE {prefix}_{name} {metric_type}')
+            for labels, value in samples:
+                label_text = ','.join(f'{label}="{_escape_label_value(str(label_value))}"'
+                                      for label, label_value in labels.items())
+                lines.append(f'{prefix}_{name}{{{label_text}}} {value}' if label_text else f'{prefix}_{name} {value}')
+
+        add_metric('messages_total', 'counter', 'Emails analyzed.', [({}, self._messages)])
+        add_metric('bytes_total', 'counter', 'Bytes of the emails analyzed.', [({}, self._bytes)])
+        add_metric('attachments_total', 'counter', 'Attachments of the emails analyzed.', [({}, self._attachments)])
+        add_metric('stage_seconds_total', 'counter', 'Time spent in each stage of the analysis.',
+                   [({'stage': stage}, seconds) for stage, seconds in self._stage_seconds.items()])
+        add_metric('stage_calls_total', 'counter', 'Number of times each stage of the analysis ran.',
+                   [({'stage': stage}, calls) for stage, calls in self._stage_calls.items()])
+        add_metric('errors_total', 'counter', 'Errors raised, by exception class.',
+                   [({'error': error_name}, error_count) for error_name, error_count in sorted(self._errors.items())])
+        add_metric('slowest_message_seconds', 'gauge', 'Analysis time of the slowest emails.',
+                   [({'rank': rank, 'location': location}, seconds) for rank, (seconds, location)
+                    in enumerate(sorted(self._slowest_messages, reverse=True), start=1)])
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,322 @@
+"""
+Module: lazy_message.py
+
+This module provides the LazyEmailMessage class, a read-only view of a raw email used by the analysis engine instead
+of the full email.message.Message tree built by the email parser.
+
+A single pass over the raw email records the byte offsets of the header block and the body of every MIME part, and
+only the header blocks are parsed, into header-only Message objects whose header values are decoded when they are
+looked up. The payload of a part is only decoded when it is asked for, which in practice means the attachment parts,
+so the text bodies, inline images and other parts of large multipart emails are never copied or decoded. The view
+implements the subset of the Message interface used to extract the metrics of an email (header lookup, walk,
+is_multipart, get_payload, get_filename, get_content_type, ...), with the same results as the email parser.
+
+Author: S S R C Kashyap
+Email: 1kasyap97@gmail.com
+Reviewer: Daniel Caffrey
+Email: dcaffrey@topsec.com
+"""
+
+import mmap
+import re
+from email.message import Message
+from typing import Iterator, List, Union
+
+# Importing the guard enforcing the MIME depth, part count and time limits of an email while it is indexed
+from .analysis_limits import MessageGuard
+
+# Importing the header-only scanning helpers, so the header values are parsed exactly as in the headers-only fast path
+from .email_header_scanner import parse_header_block
+
+# Matches the header block of a MIME part: as in the email parser, lines end with '\r\n', '\n' or a bare '\r', the
+# header block ends at the first line that is neither a header line nor a continuation line, and that line is only
+# consumed when it is blank
+_HEADER_BLOCK = re.compile(rb'(?:(?:From |[\041-\071\073-\176]*:|[ \t])[^\r\n]*(?:\r\n|\r|\n|\Z))*(?:\r\n|\r|\n)?')
+
+# The bytes ending a line, a boundary delimiter is only recognized at the start of a line
+_LINE_BREAK_BYTES = b'\r\n'
+
+
+def _strip_trailing_line_break(raw_email: Union[bytes, mmap.mmap], start: int, end: int) -> int:
+    """
+    Removes the line break preceding a boundary delimiter, or ending the last part of a multipart body, from a part.
+    Only the last two bytes of the part are looked at, the body of the part is not scanned again.
+
+    Args:
+        raw_email (Union[bytes, mmap.mmap]): The raw email holding the part.
+        start (int): The offset of the first byte of the part in raw_email.
+        end (int): The offset following the last byte of the part in raw_email.
+
+    Returns:
+        int: The offset following the last byte of the part, without its trailing '\r\n', '\n' or '\r'.
+    """
+    last_bytes = raw_email[max(start, end - 2):end]
+    if last_bytes.endswith(b'\r\n'):
+        return end - 2
+    if last_bytes.endswith((b'\n', b'\r')):
+        return end - 1
+    return end
+
+
+class LazyMimePart:
+    """
+    LazyMimePart is a MIME part of a raw email, located by byte offsets in the raw email. Its header block is parsed
+    when the part is indexed, its payload is decoded on first access.
+
+    Attributes:
+        headers (Message): The headers of the part, in a Message object without payload until the payload of the
+            part is accessed.
+        header_start (int): The offset of the first byte of the header block of the part in the raw email.
+        body_start (int): The offset of the first byte of the body of the part in the raw email.
+        end (int): The offset following the last byte of the body of the part in the raw email.
+        depth (int): The nesting depth of the part, 0 for the email itself.
+    """
+    __slots__ = ('headers', 'header_start', 'body_start', 'end', 'depth', '_raw_email', '_subparts',
+                 '_payload_loaded')
+
+    def __init__(self, raw_email: Union[bytes, mmap.mmap], start: int, end: int, depth: int = 0,
+                 default_type: str = 'text/plain', guard: MessageGuard = None):
+        """
+        Indexes a MIME part of a raw email, and the nested parts it contains.
+
+        Args:
+            raw_email (Union[bytes, mmap.mmap]): The raw email holding the part.
+            start (int): The offset of the first byte of the part (its header block) in raw_email.
+            end (int): The offset following the last byte of the part in raw_email.
+            depth (int): The nesting depth of the part, 0 for the email itself.
+            default_type (str): The content type of the part when it has no Content-Type header, 'message/rfc822'
+                for the parts of a multipart/digest.
+            guard (MessageGuard): The guard enforcing the limits of the email, if any. Every part is counted
+                before it is indexed, so a multipart bomb is stopped before it is walked any deeper.
+
+        Raises:
+            MessageLimitExceededError: If the email goes over the MIME depth, part count or time limits of guard.
+        """
+        if guard is not None:
+            guard.check_part(depth)
+
+        self._raw_email = raw_email
+        self.header_start = start
+        self.end = end
+        self.depth = depth
+        self._payload_loaded = False
+
+        self.body_start = self._find_body_start(raw_email, start, end)
+        self.headers: Message = parse_header_block(raw_email[start:self.body_start])
+        if default_type != 'text/plain':
+            self.headers.set_default_type(default_type)
+        # The nested parts of multipart and message/* parts, None for the parts holding a payload of their own
+        self._subparts: Union[List['LazyMimePart'], None] = self._index_subparts(guard)
+
+    @staticmethod
+    def _find_body_start(raw_email: Union[bytes, mmap.mmap], start: int, end: int) -> int:
+        """
+        Finds the end of the header block of a part, without looking at its body.
+
+        Args:
+            raw_email (Union[bytes, mmap.mmap]): The raw email holding the part.
+            start (int): The offset of the first byte of the part in raw_email.
+            end (int): The offset following the last byte of the part in raw_email.
+
+        Returns:
+            int: The offset of the first byte of the body of the part, or end if the part has no body.
+        """
+        return _HEADER_BLOCK.match(raw_email, start, end).end()
+
+    def _index_subparts(self, guard: Union[MessageGuard, None]) -> Union[List['LazyMimePart'], None]:
+        """
+        Indexes the nested parts of the part, following the rules of the email parser.
+
+        Args:
+            guard (Union[MessageGuard, None]): The guard enforcing the limits of the email, if any.
+
+        Returns:
+            Union[List[LazyMimePart], None]: The nested parts, or None if the part holds a payload of its own, which
+            is also the case of multipart parts without a boundary or without any boundary delimiter.
+        """
+        content_maintype = self.headers.get_content_maintype()
+        if content_maintype == 'message':
+            if self.headers.get_content_subtype() == 'delivery-status':
+                return self._index_header_blocks(guard)
+            # Any other message/* part encloses a complete email
+            return [LazyMimePart(self._raw_email, self.body_start, self.end, depth=self.depth + 1, guard=guard)]
+
+        if content_maintype != 'multipart':
+            return None
+        boundary = self.headers.get_boundary()
+        if boundary is None:
+            return None
+        return self._index_multipart_body(boundary.encode('ascii', 'surrogateescape'), guard)
+
+    def _index_header_blocks(self, guard: Union[MessageGuard, None]) -> List['LazyMimePart']:
+        """
+        Splits the body of a message/delivery-status part into its blocks of headers, separated by blank lines.
+
+        Args:
+            guard (Union[MessageGuard, None]): The guard enforcing the limits of the email, if any.
+
+        Returns:
+            List[LazyMimePart]: A part without body for every block of headers.
+        """
+        header_blocks = []
+        block_start = self.body_start
+        while block_start < self.end:
+            block = LazyMimePart(self._raw_email, block_start, self.end, depth=self.depth + 1, guard=guard)
+            # The block only spans its headers, the rest of the body holds the next blocks
+            block.end = block.body_start
+            header_blocks.append(block)
+            if block.body_start == block_start:
+                break
+            block_start = block.body_start
+        return header_blocks
+
+    def _index_multipart_body(self, boundary: bytes,
+                              guard: Union[MessageGuard, None]) -> Union[List['LazyMimePart'], None]:
+        """
+        Splits the body of a multipart part on its boundary delimiters.
+
+        As in the email parser, the line break preceding a delimiter belongs to the delimiter, consecutive
+        delimiters do not delimit empty parts, and the last part runs to the end of the body when the close
+        delimiter is missing.
+
+        Args:
+            boundary (bytes): The boundary of the multipart part.
+            guard (Union[MessageGuard, None]): The guard enforcing the limits of the email, if any.
+
+        Returns:
+            Union[List[LazyMimePart], None]: The parts of the body, or None if the body contains no opening
+            delimiter, in which case the email parser keeps the whole body as the payload of the part.
+        """
+        # The pattern starts with a literal, so the regex engine skips quickly to the candidate delimiters, whose
+        # position at the start of a line is then checked on the preceding byte
+        delimiter_pattern = re.compile(rb'--' + re.escape(boundary) + rb'(--)?[ \t]*(?:\r\n|\r|\n|\Z)')
+        default_type = 'message/rfc822' if self.headers.get_content_subtype() == 'digest' else 'text/plain'
+
+        subparts = []
+        part_start = None
+        for delimiter in delimiter_pattern.finditer(self._raw_email, self.body_start, self.end):
+            if delimiter.start() and self._raw_email[delimiter.start() - 1] not in _LINE_BREAK_BYTES:
+                continue
+            if part_start is None and delimiter.group(1):
+                # A close delimiter before any opening delimiter, the email parser treats the body as a payload
+                return None
+            if part_start is not None and part_start < delimiter.start():
+                part_end = _strip_trailing_line_break(self._raw_email, part_start, delimiter.start())
+                subparts.append(LazyMimePart(self._raw_email, part_start, part_end, depth=self.depth + 1,
+                                             default_type=default_type, guard=guard))
+            if delimiter.group(1):
+                return subparts
+            part_start = delimiter.end()
+
+        if part_start is None:
+            return None
+        if part_start < self.end:
+            # Without a close delimiter, the last part runs to the end of the body, minus its last line break
+            part_end = _strip_trailing_line_break(self._raw_email, part_start, self.end)
+            subparts.append(LazyMimePart(self._raw_email, part_start, part_end, depth=self.depth + 1,
+                                         default_type=default_type, guard=guard))
+        return subparts
+
+    def __getitem__(self, header_name: str):
+        return self.headers[header_name]
+
+    def __contains__(self, header_name: str) -> bool:
+        return header_name in self.headers
+
+    def get(self, header_name: str, failobj=None):
+        """
+        Returns the value of a header of the part, or failobj if the part has no such header.
+        """
+        return self.headers.get(header_name, failobj)
+
+    def get_content_type(self) -> str:
+        return self.headers.get_content_type()
+
+    def get_content_maintype(self) -> str:
+        return self.headers.get_content_maintype()
+
+    def get_content_subtype(self) -> str:
+        return self.headers.get_content_subtype()
+
+    def get_content_disposition(self) -> Union[str, None]:
+        return self.headers.get_content_disposition()
+
+    def get_filename(self, failobj=None) -> Union[str, None]:
+        return self.headers.get_filename(failobj)
+
+    def get_content_charset(self, failobj=None) -> Union[str, None]:
+        return self.headers.get_content_charset(failobj)
+
+    def is_multipart(self) -> bool:
+        """
+        Checks if the part holds nested parts, as multipart and message/* parts do.
+
+        Returns:
+            bool: True if the payload of the part is a list of parts, False otherwise.
+        """
+        return self._subparts is not None
+
+    def walk(self) -> Iterator['LazyMimePart']:
+        """
+        Walks the part and its nested parts depth-first, in the order of Message.walk.
+
+        Yields:
+            LazyMimePart: The part itself, followed by its nested parts and their own nested parts.
+        """
+        yield self
+        if self._subparts is not None:
+            for subpart in self._subparts:
+                yield from subpart.walk()
+
+    def iter_parts(self) -> Iterator['LazyMimePart']:
+        """
+        Yields the nested parts of the part, without descending into them.
+        """
+        if self._subparts is not None:
+            yield from self._subparts
+
+    def get_payload(self, decode: bool = False) -> Union[List['LazyMimePart'], str, bytes, None]:
+        """
+        Returns the payload of the part, decoding it on first access.
+
+        Args:
+            decode (bool): If True, the Content-Transfer-Encoding of the part is decoded and bytes are returned,
+                as with Message.get_payload.
+
+        Returns:
+            Union[List[LazyMimePart], str, bytes, None]: The nested parts of multipart and message/* parts,
+            otherwise the payload of the part, as found in the email or decoded.
+        """
+        if self._subparts is not None:
+            return None if decode else self._subparts
+        if not self._payload_loaded:
+            # The email parser works on the raw email decoded as ASCII with surrogate escapes, and so does the view
+            payload = bytes(self._raw_email[self.body_start:self.end])
+            self.headers.set_payload(payload.decode('ascii', 'surrogateescape'))
+            self._payload_loaded = True
+        return self.headers.get_payload(decode=decode)
+
+
+class LazyEmailMessage(LazyMimePart):
+    """
+    LazyEmailMessage is a lazy view of a raw email, the MIME part spanning the whole raw email.
+
+    Attributes:
+        size (int): The size in bytes of the raw email.
+    """
+    __slots__ = ('size',)
+
+    def __init__(self, raw_email: Union[bytes, mmap.mmap], guard: MessageGuard = None):
+        """
+        Indexes the header blocks and MIME parts of a raw email, in a single pass over the raw email.
+
+        Args:
+            raw_email (Union[bytes, mmap.mmap]): The raw email content. It is referenced, not copied, so it must
+                not be modified or closed while the view is used.
+            guard (MessageGuard): The guard enforcing the limits of the email, if any.
+
+        Raises:
+            MessageLimitExceededError: If the email goes over the MIME depth, part count or time limits of guard.
+        """
+        self.size = len(raw_email)
+        super().__init__(raw_email, 0, self.size, guard=guard)
@@ -1,9 +1,13 @@
 """
 Module: log_config.py
 
-This module configures the logger for the email_analyzer package. It sets the logging level, format,
-and the file where logs will be saved. This configuration allows for consistent and centralized
-logging throughout the project.
+This module provides the logger of the email_analyzer package and the functions used to configure it. Importing the
+package does not configure logging: the package logger only has a NullHandler, so nothing is written anywhere until
+the application either configures the logging module itself or calls configure_logging.
+
+configure_logging sends the records of the package to a sink chosen by the caller (a file, a stream or any logging
+handler) through a QueueHandler, and a QueueListener writes them from a background thread, so the threads and
+processes analyzing emails never wait on a file write.
 
 Author: S S R C Kashyap
 Email: 1kasyap97@gmail.com
@@ -11,16 +15,110 @@ Reviewer: Daniel Caffrey
 Email: dcaffrey@topsec.com
 """
 
+import atexit
 import logging
+import os
+from typing import TYPE_CHECKING
+
+# logging.handlers (and the socket module behind it) is imported by configure_logging, when logging is configured
+if TYPE_CHECKING:
+    from logging.handlers import QueueHandler, QueueListener
+
+# The format of the records written by configure_logging, unless the given handler already has a formatter
+DEFAULT_LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# The logger of the package, every module of the package logs through it
+logger = logging.getLogger('email_analyzer')
+logger.addHandler(logging.NullHandler())
+
+# The queue handler attached to the package logger and the listener draining its queue, set by configure_logging
+_queue_handler: 'QueueHandler' = None
+_queue_listener: 'QueueListener' = None
+# The id of the process running _queue_listener, a forked worker process has to start its own listener
+_listener_pid: int = None
+# Whether the sink handler was created by configure_logging, in which case it is closed by shutdown_logging
+_owns_sink_handler: bool = False
+
+
+def configure_logging(level: int = logging.INFO, handler: logging.Handler = None, filename: str = None,
+                      log_format: str = DEFAULT_LOG_FORMAT):
+    """
+    Sends the records of the package logger to the given sink through a background writer thread.
+
+    Calling configure_logging again replaces the previous configuration. The records are no longer propagated
+    to the root logger, so they are not written twice when the application also configures the root logger.
+
+    Args:
+        level (int): The minimum level of the records that are written, e.g. logging.INFO.
+        handler (logging.Handler): The handler writing the records. If not given, the records are appended to
+            filename, or written to the standard error stream if filename is not given either.
+        filename (str): The path of the file the records are appended to, when no handler is given.
+        log_format (str): The format of the records, used when the handler has no formatter of its own.
+    """
+    global _queue_handler, _queue_listener, _listener_pid, _owns_sink_handler
+    import queue
+    from logging.handlers import QueueHandler, QueueListener
+    shutdown_logging()
+
+    _owns_sink_handler = handler is None
+    if handler is None:
+        handler = logging.FileHandler(filename, encoding='utf-8') if filename else logging.StreamHandler()
+    if handler.formatter is None:
+        handler.setFormatter(logging.Formatter(log_format))
+
+    log_queue = queue.SimpleQueue()
+    _queue_handler = QueueHandler(log_queue)
+    _queue_listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    _queue_listener.start()
+    _listener_pid = os.getpid()
+
+    logger.addHandler(_queue_handler)
+    logger.setLevel(level)
+    logger.propagate = False
+
+
+def shutdown_logging():
+    """
+    Writes the pending records, stops the background writer thread and restores the default configuration of the
+    package logger. It is called automatically when the interpreter exits.
+    """
+    global _queue_handler, _queue_listener, _listener_pid, _owns_sink_handler
+    if _queue_listener is None:
+        return
+
+    # Stopping the listener of another process would wait forever, as its thread does not exist in this process
+    if _listener_pid == os.getpid():
+        _queue_listener.stop()
+        if _owns_sink_handler:
+            for handler in _queue_listener.handlers:
+                handler.close()
+    logger.removeHandler(_queue_handler)
+    logger.setLevel(logging.NOTSET)
+    logger.propagate = True
+    _queue_handler = _queue_listener = _listener_pid = None
+    _owns_sink_handler = False
+
+
+def _restart_logging_in_worker():
+    """
+    Starts the background writer thread of a forked worker process.
+
+    A forked process inherits the queue handler of its parent but not the thread of its listener, so without a
+    listener of its own the records of the worker would pile up in its copy of the queue. The new listener writes
+    to the inherited sink, and is stopped when the worker process exits.
+    """
+    global _queue_listener, _listener_pid
+    if _queue_listener is None or _listener_pid == os.getpid():
+        return
+    from logging.handlers import QueueListener
+
+    _queue_listener = QueueListener(_queue_handler.queue, *_queue_listener.handlers, respect_handler_level=True)
+    _queue_listener.start()
+    _listener_pid = os.getpid()
+    # Worker processes do not run the atexit handlers, the finalizers of the multiprocessing module are run instead.
+    # The module is already loaded in a worker process, it is imported here to keep it out of the package import.
+    from multiprocessing import util as multiprocessing_util
+    multiprocessing_util.Finalize(None, _queue_listener.stop, exitpriority=10)
+
 
-# Configure the logger
-logging.basicConfig(level=logging.INFO,
-                    format='%(asctime)s - %(levelname)s - %(message)s',
-                    filename='./email_analyzer_logs.log')
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
-
-# Additional developer comments:
-# - The logging level is set to INFO by default, which includes INFO, WARNING, ERROR, and CRITICAL levels to be logged.
-# - The log format includes the timestamp, log level, and the log message.
-# - Logs are saved to the email_analyzer_logs.log file in the same directory as the log_config module.
\ No newline at end of file
+atexit.register(shutdown_logging)
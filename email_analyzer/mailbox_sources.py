@@ -0,0 +1,177 @@
+"""
+Module: mailbox_sources.py
+
+This module provides the readers used by the EmailAnalyzer class to analyze mailbox archives in place, instead of
+requiring every email to be stored in its own .eml file. Two formats are supported:
+
+- mbox archives, a single file holding many emails, each one starting with a 'From ' separator line. The archive is
+  memory-mapped and split by streaming over the separators, so only the email being analyzed is ever copied into
+  memory, whatever the size of the archive. The body lines that were quoted when the email was stored ('>From ',
+  '>>From ', ...) are unquoted as in the mboxrd format, so the emails are analyzed as they were delivered.
+- Maildir directories, holding one email per file in their 'cur' and 'new' sub-directories (and in the same
+  sub-directories of their Maildir++ folders).
+
+Author: S S R C Kashyap
+Email: 1kasyap97@gmail.com
+Reviewer: Daniel Caffrey
+Email: dcaffrey@topsec.com
+"""
+
+import mmap
+import os
+import re
+from typing import Iterator
+
+# File extensions of mbox archives
+MBOX_EXTENSIONS = ('.mbox', '.mbx')
+
+# Matches the 'From ' separator line starting every email of an mbox archive
+_MBOX_SEPARATOR = re.compile(rb'^From [^\n]*\n', re.MULTILINE)
+
+# Matches the body lines of an email quoted with a '>' when it was stored in the archive, the mboxrd format quotes
+# every '>*From ' line with one more '>', so one '>' is removed (the quoting of the mboxo format, which only quotes
+# the 'From ' lines, cannot be told apart from a '>From ' line of the original email, which is then unquoted too)
+_MBOX_QUOTED_FROM_LINE = re.compile(rb'^>(>*From )', re.MULTILINE)
+
+# The sub-directories of a Maildir holding delivered emails, 'tmp' only holds emails being delivered
+MAILDIR_MESSAGE_DIRECTORIES = ('cur', 'new')
+
+
+def is_mbox_file(file_path: str) -> bool:
+    """
+    Checks if a file is an mbox archive, either by its extension or by its first line.
+
+    Args:
+        file_path (str): The path of the file.
+
+    Returns:
+        bool: True if the file is an mbox archive, False otherwise.
+    """
+    if file_path.lower().endswith(MBOX_EXTENSIONS):
+        return True
+    with open(file_path, 'rb') as file:
+        return file.read(5) == b'From '
+
+
+def is_maildir(directory_path: str) -> bool:
+    """
+    Checks if a directory is a Maildir, i.e. if it has 'cur', 'new' and 'tmp' sub-directories.
+
+    Args:
+        directory_path (str): The path of the directory.
+
+    Returns:
+        bool: True if the directory is a Maildir, False otherwise.
+    """
+    return all(os.path.isdir(os.path.join(directory_path, sub_directory))
+               for sub_directory in MAILDIR_MESSAGE_DIRECTORIES + ('tmp',))
+
+
+def iter_maildir_message_paths(maildir_path: str) -> Iterator[str]:
+    """
+    Yields the path of every email of a Maildir, including the emails of its Maildir++ folders.
+
+    Args:
+        maildir_path (str): The path of the Maildir.
+
+    Yields:
+        str: The path of an email file.
+    """
+    # The Maildir itself, followed by its Maildir++ folders, which are sub-directories starting with a '.'
+    folder_paths = [maildir_path]
+    with os.scandir(maildir_path) as entries:
+        folder_paths.extend(sorted(entry.path for entry in entries
+                                   if entry.name.startswith('.') and entry.is_dir() and is_maildir(entry.path)))
+
+    for folder_path in folder_paths:
+        for sub_directory in MAILDIR_MESSAGE_DIRECTORIES:
+            with os.scandir(os.path.join(folder_path, sub_directory)) as entries:
+                for entry in entries:
+                    # Hidden files are not emails (e.g. the dovecot index files)
+                    if not entry.name.startswith('.') and entry.is_file():
+                        yield entry.path
+
+
+class MboxReader:
+    """
+    MboxReader gives access to the emails of an mbox archive through a read-only memory map of the archive.
+
+    Every email is identified by its byte offset and length in the archive, excluding its 'From ' separator line,
+    so emails can be located once by iter_message_spans and read later, possibly by another process, with
+    read_message.
+
+    Attributes:
+        mbox_path (str): The path of the mbox archive.
+    """
+    def __init__(self, mbox_path: str):
+        """
+        Opens and memory-maps the mbox archive.
+
+        Args:
+            mbox_path (str): The path of the mbox archive.
+        """
+        self.mbox_path = mbox_path
+        self._mbox_file = open(mbox_path, 'rb')
+        # Empty files cannot be memory-mapped, an empty archive simply holds no email
+        if os.fstat(self._mbox_file.fileno()).st_size:
+            self._mbox_map = mmap.mmap(self._mbox_file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._mbox_map = b''
+
+    def iter_message_spans(self) -> Iterator[tuple]:
+        """
+        Streams over the 'From ' separators of the archive and yields the location of every email.
+
+        Yields:
+            tuple: An (offset, length) tuple locating an email in the archive.
+        """
+        message_start = None
+        for separator in _MBOX_SEPARATOR.finditer(self._mbox_map):
+            if message_start is not None:
+                yield message_start, self._message_end(message_start, separator.start()) - message_start
+            message_start = separator.end()
+
+        if message_start is not None:
+            yield message_start, self._message_end(message_start, len(self._mbox_map)) - message_start
+
+    def _message_end(self, message_start: int, separator_start: int) -> int:
+        """
+        Returns the end offset of an email, excluding the line break that precedes the next 'From ' separator.
+
+        Args:
+            message_start (int): The offset of the first byte of the email.
+            separator_start (int): The offset of the next separator, or the size of the archive.
+
+        Returns:
+            int: The offset following the last byte of the email.
+        """
+        if separator_start > message_start and self._mbox_map[separator_start - 1:separator_start] == b'\n':
+            separator_start -= 1
+            if separator_start > message_start and self._mbox_map[separator_start - 1:separator_start] == b'\r':
+                separator_start -= 1
+        return separator_start
+
+    def read_message(self, offset: int, length: int) -> bytes:
+        """
+        Reads a single email of the archive, with its quoted '>From ' lines unquoted.
+
+        Args:
+            offset (int): The offset of the email, as yielded by iter_message_spans.
+            length (int): The length of the email in the archive, as yielded by iter_message_spans.
+
+        Returns:
+            bytes: The raw email content, which is shorter than length when quoted lines were unquoted.
+        """
+        raw_email = self._mbox_map[offset:offset + length]
+        # Most emails have no quoted line at all, and are returned without a second copy
+        if b'>From ' in raw_email:
+            raw_email = _MBOX_QUOTED_FROM_LINE.sub(rb'\1', raw_email)
+        return raw_email
+
+    def close(self):
+        """
+        Closes the memory map and the mbox archive.
+        """
+        if isinstance(self._mbox_map, mmap.mmap):
+            self._mbox_map.close()
+        self._mbox_file.close()
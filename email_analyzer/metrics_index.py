@@ -0,0 +1,175 @@
+"""
+Module: metrics_index.py
+
+This module provides a persistent, on-disk index of email metrics backed by SQLite. The index remembers the metrics of
+every analyzed email file together with the size, modification time and (optionally) content hash of the file, so
+that repeated scans of the same directory only need to parse the files that are new or have changed since the last
+scan, and can serve the metrics of every other file straight from the index.
+
+Author: S S R C Kashyap
+Email: 1kasyap97@gmail.com
+Reviewer: Daniel Caffrey
+Email: dcaffrey@topsec.com
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+from typing import Union, Iterable
+
+# The number of stored entries after which the pending changes are committed to disk
+_COMMIT_INTERVAL = 1000
+
+
+class MetricsIndex:
+    """
+    MetricsIndex is a SQLite-backed cache of email metrics keyed by file path.
+
+    An entry is only served when the size and modification time of the file, and the analyzer options used to
+    compute the metrics, are the same as when the entry was stored. When content hashing is enabled, a file whose
+    size or modification time changed but whose content hash did not (e.g. a file that was touched or copied) is
+    also served from the index, instead of being parsed again.
+
+    Attributes:
+        index_path (str): The path of the SQLite database file holding the index.
+        options_key (str): A key identifying the analyzer options the stored metrics were computed with.
+        use_content_hash (bool): Whether content hashes are stored and used to validate changed files.
+    """
+    def __init__(self, index_path: str, options_key: str = '', use_content_hash: bool = False):
+        """
+        Opens (or creates) the index stored at index_path.
+
+        Args:
+            index_path (str): The path of the SQLite database file holding the index.
+            options_key (str): A key identifying the analyzer options the stored metrics were computed with.
+                Entries stored with different options are never served.
+            use_content_hash (bool): If True, the content hash of every analyzed file is stored, and used to
+                validate files whose size or modification time changed.
+        """
+        self.index_path = index_path
+        self.options_key = options_key
+        self.use_content_hash = use_content_hash
+
+        # The number of entries stored since the last commit
+        self._pending_changes: int = 0
+
+        self._connection = sqlite3.connect(index_path)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute('CREATE TABLE IF NOT EXISTS email_metrics ('
+                                 'file_path TEXT PRIMARY KEY, '
+                                 'file_size INTEGER NOT NULL, '
+                                 'mtime_ns INTEGER NOT NULL, '
+                                 'content_hash TEXT, '
+                                 'options_key TEXT NOT NULL, '
+                                 'metrics TEXT NOT NULL)')
+        self._connection.commit()
+
+    @staticmethod
+    def hash_file(file_path: str) -> str:
+        """
+        Computes the content hash of a file.
+
+        Args:
+            file_path (str): The path of the file.
+
+        Returns:
+            str: The hexadecimal BLAKE2b digest of the file content.
+        """
+        file_hash = hashlib.blake2b(digest_size=20)
+        with open(file_path, 'rb') as file:
+            for block in iter(lambda: file.read(1024 * 1024), b''):
+                file_hash.update(block)
+        return file_hash.hexdigest()
+
+    def lookup(self, file_path: str, file_stat: os.stat_result) -> Union[dict, None]:
+        """
+        Returns the stored metrics of a file if they are still valid for its current state.
+
+        Args:
+            file_path (str): The path of the email file.
+            file_stat (os.stat_result): The current stat result of the email file.
+
+        Returns:
+            Union[dict, None]: The stored metrics, or None if the file is not in the index or has changed.
+        """
+        row = self._connection.execute('SELECT file_size, mtime_ns, content_hash, options_key, metrics '
+                                       'FROM email_metrics WHERE file_path = ?', (file_path,)).fetchone()
+        if row is None:
+            return None
+
+        file_size, mtime_ns, content_hash, options_key, metrics = row
+        if options_key != self.options_key:
+            return None
+
+        if file_size == file_stat.st_size and mtime_ns == file_stat.st_mtime_ns:
+            return json.loads(metrics)
+
+        # The file changed on disk, its content hash tells whether the content itself changed
+        if self.use_content_hash and content_hash is not None and file_size == file_stat.st_size \
+                and content_hash == self.hash_file(file_path):
+            self._connection.execute('UPDATE email_metrics SET mtime_ns = ? WHERE file_path = ?',
+                                     (file_stat.st_mtime_ns, file_path))
+            self._count_change()
+            return json.loads(metrics)
+
+        return None
+
+    def store(self, file_path: str, file_stat: os.stat_result, metrics: dict):
+        """
+        Stores the metrics of a file, replacing any previous entry of the file.
+
+        Args:
+            file_path (str): The path of the email file.
+            file_stat (os.stat_result): The stat result of the email file taken before it was analyzed.
+            metrics (dict): The metrics of the email file.
+        """
+        content_hash = self.hash_file(file_path) if self.use_content_hash else None
+        self._connection.execute('INSERT OR REPLACE INTO email_metrics '
+                                 '(file_path, file_size, mtime_ns, content_hash, options_key, metrics) '
+                                 'VALUES (?, ?, ?, ?, ?, ?)',
+                                 (file_path, file_stat.st_size, file_stat.st_mtime_ns, content_hash,
+                                  self.options_key, json.dumps(metrics)))
+        self._count_change()
+
+    def prune(self, directory_path: str, existing_paths: Iterable[str]) -> int:
+        """
+        Drops the entries of the files of a directory that no longer exist.
+
+        Args:
+            directory_path (str): The directory whose entries are pruned, entries of other directories are kept.
+            existing_paths (Iterable[str]): The paths of the email files currently found in the directory.
+
+        Returns:
+            int: The number of dropped entries.
+        """
+        existing_paths = set(existing_paths)
+        directory_prefix = os.path.join(directory_path, '')
+        stale_paths = [(file_path,) for (file_path,) in self._connection.execute('SELECT file_path FROM email_metrics')
+                       if file_path.startswith(directory_prefix) and file_path not in existing_paths]
+        self._connection.executemany('DELETE FROM email_metrics WHERE file_path = ?', stale_paths)
+        self.commit()
+        return len(stale_paths)
+
+    def _count_change(self):
+        """
+        Counts a pending change and commits the pending changes once _COMMIT_INTERVAL is reached.
+        """
+        self._pending_changes += 1
+        if self._pending_changes >= _COMMIT_INTERVAL:
+            self.commit()
+
+    def commit(self):
+        """
+        Commits the pending changes of the index to disk.
+        """
+        self._connection.commit()
+        self._pending_changes = 0
+
+    def close(self):
+        """
+        Commits the pending changes and closes the index.
+        """
+        self.commit()
+        self._connection.close()
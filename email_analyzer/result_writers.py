@@ -0,0 +1,332 @@
+"""
+Module: result_writers.py
+
+This module provides a compact record type for the metrics of an email, and writers streaming these records to
+NDJSON, CSV or Parquet files in chunks, as the emails are analyzed. The output of a run of any size can therefore be
+loaded straight into an analytics stack, without ever holding the metrics of the whole run in memory.
+
+The records use snake_case field names (file_path, subject, total_message_size, ...), which are also the column
+names of the written files. Writing Parquet files requires the optional pyarrow package, which is only imported
+when a ParquetWriter is created.
+
+Author: S S R C Kashyap
+Email: 1kasyap97@gmail.com
+Reviewer: Daniel Caffrey
+Email: dcaffrey@topsec.com
+"""
+
+import csv
+import json
+import os
+from typing import IO, Iterable, Union
+
+# The fields of an EmailMetricsRecord, mapped to the keys of the metrics dictionaries they are taken from
+RECORD_FIELDS = (('file_path', 'File Path'),
+                 ('message_offset', 'Message Offset'),
+                 ('subject', 'Subject'),
+                 ('message_id', 'Message ID'),
+                 ('from_address', 'From Address'),
+                 ('total_message_size', 'Total Message Size'),
+                 ('has_attachments', 'Has Attachments'),
+                 ('content_hash', 'Content Hash'),
+                 ('limit_exceeded', 'Limit Exceeded'))
+
+# The fields of the attachments of an EmailMetricsRecord, mapped to the keys of the attachment records
+ATTACHMENT_FIELDS = (('file_name', 'File Name'),
+                     ('declared_type', 'Declared Type'),
+                     ('detected_type', 'Detected Type'),
+                     ('type_description', 'Type Description'),
+                     ('encoded_size', 'Encoded Size'),
+                     ('decoded_size', 'Decoded Size'),
+                     ('content_hash', 'Content Hash'))
+
+# The columns of the CSV files, the attachments are flattened into ';' separated lists
+CSV_COLUMNS = tuple(field for field, _ in RECORD_FIELDS) + ('attachment_count', 'attachment_file_names',
+                                                            'attachment_detected_types')
+
+# The number of records buffered by a writer before they are written out
+DEFAULT_CHUNK_SIZE = 1000
+
+
+class EmailMetricsRecord:
+    """
+    EmailMetricsRecord holds the metrics of a single email in slots instead of a dictionary, and its attachments
+    as tuples of values in ATTACHMENT_FIELDS order, so large batches of records stay compact in memory.
+    """
+    __slots__ = tuple(field for field, _ in RECORD_FIELDS) + ('attachments',)
+
+    def __init__(self, **fields):
+        """
+        Initializes the record from its field values, the missing fields are set to None.
+
+        Args:
+            **fields: The values of the fields listed in RECORD_FIELDS, and 'attachments', a tuple of attachment
+                tuples.
+        """
+        for field, _ in RECORD_FIELDS:
+            setattr(self, field, fields.get(field))
+        self.attachments = fields.get('attachments', ())
+
+    @classmethod
+    def from_metrics(cls, mail_item_metrics: dict) -> 'EmailMetricsRecord':
+        """
+        Builds a record from the metrics of an email, as yielded by EmailAnalyzer.iter_metrics.
+
+        Args:
+            mail_item_metrics (dict): The metrics of the email.
+
+        Returns:
+            EmailMetricsRecord: The record holding the same metrics.
+        """
+        record = cls.__new__(cls)
+        for field, metrics_key in RECORD_FIELDS:
+            setattr(record, field, mail_item_metrics.get(metrics_key))
+        record.attachments = tuple(tuple(attachment_record.get(attachment_key)
+                                         for _, attachment_key in ATTACHMENT_FIELDS)
+                                   for attachment_record in mail_item_metrics.get('Attachments', ()))
+        return record
+
+    def as_dict(self) -> dict:
+        """
+        Returns the record as a dictionary with snake_case keys, the attachments being a list of dictionaries.
+
+        Returns:
+            dict: The fields of the record.
+        """
+        record_fields = {field: getattr(self, field) for field, _ in RECORD_FIELDS}
+        record_fields['attachments'] = [dict(zip((field for field, _ in ATTACHMENT_FIELDS), attachment))
+                                        for attachment in self.attachments]
+        return record_fields
+
+    def as_flat_dict(self) -> dict:
+        """
+        Returns the record as a flat dictionary, keyed by CSV_COLUMNS.
+
+        Returns:
+            dict: The fields of the record, with the attachment count and the ';' separated attachment file names
+            and detected types instead of the attachment list.
+        """
+        record_fields = {field: getattr(self, field) for field, _ in RECORD_FIELDS}
+        record_fields['attachment_count'] = len(self.attachments)
+        record_fields['attachment_file_names'] = ';'.join(attachment[0] or '' for attachment in self.attachments)
+        record_fields['attachment_detected_types'] = ';'.join(attachment[2] or '' for attachment in self.attachments)
+        return record_fields
+
+
+class MetricsWriter:
+    """
+    MetricsWriter is the base class of the writers, it buffers the records and hands them over to _write_chunk in
+    chunks of chunk_size records. Writers are context managers, the buffered records are written when they are
+    closed.
+
+    Attributes:
+        chunk_size (int): The number of records buffered before they are written out.
+        records_written (int): The number of records written so far.
+    """
+    # Whether the output file is opened in binary mode, when a path is given
+    binary = False
+
+    def __init__(self, output: Union[str, IO], chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """
+        Initializes the writer.
+
+        Args:
+            output (Union[str, IO]): The path of the output file, or an open file object, which is not closed by
+                the writer.
+            chunk_size (int): The number of records buffered before they are written out.
+
+        Raises:
+            ValueError: If chunk_size is lower than 1.
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be greater than or equal to 1")
+
+        self.chunk_size = chunk_size
+        self.records_written = 0
+        self._records: list = []
+        if isinstance(output, (str, os.PathLike)):
+            self._output = open(output, 'wb') if self.binary else open(output, 'w', encoding='utf-8', newline='')
+            self._owns_output = True
+        else:
+            self._output = output
+            self._owns_output = False
+
+    def write(self, mail_item_metrics: Union[dict, EmailMetricsRecord]):
+        """
+        Adds the metrics of an email to the output, writing the buffered records once chunk_size are buffered.
+
+        Args:
+            mail_item_metrics (Union[dict, EmailMetricsRecord]): The metrics of the email, as yielded by
+                EmailAnalyzer.iter_metrics, or the record holding them.
+        """
+        if not isinstance(mail_item_metrics, EmailMetricsRecord):
+            mail_item_metrics = EmailMetricsRecord.from_metrics(mail_item_metrics)
+        self._records.append(mail_item_metrics)
+        if len(self._records) >= self.chunk_size:
+            self.flush()
+
+    def write_all(self, metrics: Iterable[Union[dict, EmailMetricsRecord]]) -> int:
+        """
+        Adds the metrics of every email of an iterable to the output.
+
+        Args:
+            metrics (Iterable[Union[dict, EmailMetricsRecord]]): The metrics, e.g. the iter_metrics generator.
+
+        Returns:
+            int: The number of records written so far, including the records still buffered.
+        """
+        for mail_item_metrics in metrics:
+            self.write(mail_item_metrics)
+        return self.records_written + len(self._records)
+
+    def flush(self):
+        """
+        Writes the buffered records out.
+        """
+        if self._records:
+            self._write_chunk(self._records)
+            self.records_written += len(self._records)
+            self._records = []
+        self._output.flush()
+
+    def close(self):
+        """
+        Writes the buffered records out and closes the output file, if it was opened by the writer.
+        """
+        try:
+            self.flush()
+            self._close_format()
+        finally:
+            if self._owns_output:
+                self._output.close()
+
+    def _write_chunk(self, records: list):
+        """
+        Writes a chunk of records to the output file.
+
+        Args:
+            records (list): The EmailMetricsRecord objects of the chunk.
+        """
+        raise NotImplementedError
+
+    def _close_format(self):
+        """
+        Writes the end of the output format, if any, before the output file is closed.
+        """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class NDJSONWriter(MetricsWriter):
+    """
+    NDJSONWriter writes one JSON object per line and per email, with the attachments as a nested list.
+    """
+    def _write_chunk(self, records: list):
+        self._output.write(''.join(json.dumps(record.as_dict(), ensure_ascii=False) + '\n' for record in records))
+
+
+class CSVWriter(MetricsWriter):
+    """
+    CSVWriter writes a header row followed by one row per email, with the columns listed in CSV_COLUMNS.
+    """
+    def __init__(self, output: Union[str, IO], chunk_size: int = DEFAULT_CHUNK_SIZE):
+        super().__init__(output, chunk_size=chunk_size)
+        self._csv_writer = csv.DictWriter(self._output, fieldnames=CSV_COLUMNS)
+        self._csv_writer.writeheader()
+
+    def _write_chunk(self, records: list):
+        self._csv_writer.writerows(record.as_flat_dict() for record in records)
+
+
+class ParquetWriter(MetricsWriter):
+    """
+    ParquetWriter writes a Parquet file with one row group per chunk, the attachments being a list of structs.
+    It requires the optional pyarrow package.
+    """
+    binary = True
+
+    def __init__(self, output: Union[str, IO], chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """
+        Initializes the writer.
+
+        Args:
+            output (Union[str, IO]): The path of the output file, or a file object open in binary mode.
+            chunk_size (int): The number of records of every row group.
+
+        Raises:
+            ImportError: If pyarrow is not installed.
+        """
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as err:
+            raise ImportError("Writing Parquet files requires the pyarrow package: pip install pyarrow") from err
+
+        self._pyarrow = pyarrow
+        self._schema = pyarrow.schema([
+            ('file_path', pyarrow.string()),
+            ('message_offset', pyarrow.int64()),
+            ('subject', pyarrow.string()),
+            ('message_id', pyarrow.string()),
+            ('from_address', pyarrow.string()),
+            ('total_message_size', pyarrow.int64()),
+            ('has_attachments', pyarrow.bool_()),
+            ('content_hash', pyarrow.string()),
+            ('limit_exceeded', pyarrow.string()),
+            ('attachments', pyarrow.list_(pyarrow.struct([
+                ('file_name', pyarrow.string()),
+                ('declared_type', pyarrow.string()),
+                ('detected_type', pyarrow.string()),
+                ('type_description', pyarrow.string()),
+                ('encoded_size', pyarrow.int64()),
+                ('decoded_size', pyarrow.int64()),
+                ('content_hash', pyarrow.string())]))),
+        ])
+        super().__init__(output, chunk_size=chunk_size)
+        self._parquet_writer = pyarrow.parquet.ParquetWriter(self._output, self._schema)
+
+    def _write_chunk(self, records: list):
+        table = self._pyarrow.Table.from_pylist([record.as_dict() for record in records], schema=self._schema)
+        self._parquet_writer.write_table(table)
+
+    def _close_format(self):
+        self._parquet_writer.close()
+
+
+# The writers of every output format, keyed by format name
+METRICS_WRITERS = {'ndjson': NDJSONWriter, 'csv': CSVWriter, 'parquet': ParquetWriter}
+
+# The output formats inferred from the extensions of the output files
+_FORMAT_EXTENSIONS = {'.ndjson': 'ndjson', '.jsonl': 'ndjson', '.csv': 'csv', '.parquet': 'parquet'}
+
+
+def create_metrics_writer(output: Union[str, IO], output_format: str = None,
+                          chunk_size: int = DEFAULT_CHUNK_SIZE) -> MetricsWriter:
+    """
+    Creates the writer of an output format.
+
+    Args:
+        output (Union[str, IO]): The path of the output file, or an open file object.
+        output_format (str): One of the keys of METRICS_WRITERS. If not given, it is inferred from the extension of
+            the output path.
+        chunk_size (int): The number of records buffered before they are written out.
+
+    Returns:
+        MetricsWriter: The writer of the output format.
+
+    Raises:
+        ValueError: If the output format is not supported, or cannot be inferred from the output path.
+    """
+    if output_format is None and isinstance(output, (str, os.PathLike)):
+        output_format = _FORMAT_EXTENSIONS.get(os.path.splitext(output)[1].lower())
+    if output_format is None:
+        raise ValueError(f"Cannot infer the output format of '{output}', "
+                         f"pass one of the supported formats: {', '.join(METRICS_WRITERS)}")
+    if output_format not in METRICS_WRITERS:
+        raise ValueError(f"Unsupported output format: '{output_format}'. "
+                         f"Supported formats: {', '.join(METRICS_WRITERS)}")
+    return METRICS_WRITERS[output_format](output, chunk_size=chunk_size)
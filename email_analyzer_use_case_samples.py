@@ -48,7 +48,7 @@ def directory_containing_email_files_with_and_without_attachments(dir_path: str)
 
 
 if __name__ == '__main__':
-    directory_path = 'C:/Users/kashyap/PycharmProjects/top_sec_email_analyzer/assets'
+    directory_path = 'assets'
     plain_email_file_path = 'assets/email-plain-text.eml'
     email_with_attachments_path = 'assets/email-with-attachments.eml'
 
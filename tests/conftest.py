@@ -0,0 +1,68 @@
+"""
+Module: conftest.py
+
+This module provides the fixtures shared by the tests of the package: the directory of sample emails of the
+repository, a helper writing minimal emails, and directories of email files built from both.
+
+Author: S S R C Kashyap
+Email: 1kasyap97@gmail.com
+Reviewer: Daniel Caffrey
+Email: dcaffrey@topsec.com
+"""
+
+import os
+import shutil
+
+import pytest
+
+ASSETS_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'assets')
+
+# The subjects of the emails of the mail_directory fixture, each email is written to the file '<subject>.eml'
+MAIL_SUBJECTS = ('a', 'b', 'c')
+
+
+def _write_email(file_path, subject: str):
+    """
+    Writes a minimal email with the given subject.
+    """
+    file_path.write_bytes(f'From: a@b.c\r\nSubject: {subject}\r\n\r\nbody\r\n'.encode())
+
+
+@pytest.fixture
+def assets_directory() -> str:
+    """
+    Returns the directory of the sample emails of the repository.
+    """
+    return ASSETS_DIRECTORY
+
+
+@pytest.fixture
+def write_email():
+    """
+    Returns a function writing a minimal email with a given subject to a given path.
+    """
+    return _write_email
+
+
+@pytest.fixture
+def mail_directory(tmp_path):
+    """
+    Builds a directory of minimal emails, one per subject of MAIL_SUBJECTS. The directory is created inside tmp_path,
+    which leaves room next to it for files that must not be analyzed (e.g. a metrics index).
+    """
+    directory = tmp_path / 'mail'
+    directory.mkdir()
+    for subject in MAIL_SUBJECTS:
+        _write_email(directory / f'{subject}.eml', subject)
+    return directory
+
+
+@pytest.fixture
+def sample_mail_directory(mail_directory):
+    """
+    Adds copies of the sample emails of the repository to the minimal emails of mail_directory.
+    """
+    for file_name in os.listdir(ASSETS_DIRECTORY):
+        if file_name.endswith('.eml'):
+            shutil.copy(os.path.join(ASSETS_DIRECTORY, file_name), mail_directory / file_name)
+    return mail_directory
@@ -0,0 +1,122 @@
+"""
+Module: test_analysis_limits.py
+
+This module checks that every limit of AnalysisLimits is enforced at its bound: an email going over a limit is
+skipped and flagged with the name of the limit in the 'Limit Exceeded' field of its metrics, by the engine and by
+EmailAnalyzer, while an email right at the limit is analyzed as usual.
+
+Author: S S R C Kashyap
+Email: 1kasyap97@gmail.com
+Reviewer: Daniel Caffrey
+Email: dcaffrey@topsec.com
+"""
+
+import pytest
+
+from email_analyzer import AnalysisLimits, AnalyzerStats, EmailAnalysisEngine, EmailAnalyzer
+from email_analyzer.analysis_limits import flag_limit_exceeded
+from email_analyzer.custom_email_analyzer_exceptions import MessageLimitExceededError
+
+# An email with a nested multipart: 5 parts (the email included), a MIME depth of 2, and two 4-byte attachments
+RAW_EMAIL = (b'From: a@b.c\r\n'
+             b'Subject: Limits\r\n'
+             b'Content-Type: multipart/mixed; boundary=outer\r\n'
+             b'\r\n'
+             b'--outer\r\n'
+             b'Content-Type: multipart/alternative; boundary=inner\r\n'
+             b'\r\n'
+             b'--inner\r\n'
+             b'Content-Type: text/plain\r\n'
+             b'\r\n'
+             b'text\r\n'
+             b'--inner--\r\n'
+             b'--outer\r\n'
+             b'Content-Type: application/octet-stream\r\n'
+             b'Content-Disposition: attachment; filename="one.bin"\r\n'
+             b'Content-Transfer-Encoding: base64\r\n'
+             b'\r\n'
+             b'AAECAw==\r\n'
+             b'--outer\r\n'
+             b'Content-Type: application/octet-stream\r\n'
+             b'Content-Disposition: attachment; filename="two.bin"\r\n'
+             b'\r\n'
+             b'abcd\r\n'
+             b'--outer--\r\n')
+
+# The limits the email is right at, and the same limits lowered by one
+LIMITS_AT_BOUND = {'max_message_bytes': len(RAW_EMAIL), 'max_mime_depth': 2, 'max_parts': 5,
+                   'max_attachment_bytes': 8}
+
+
+@pytest.mark.parametrize('limit_name', LIMITS_AT_BOUND.keys())
+def test_limit_is_flagged_above_its_bound(limit_name):
+    engine = EmailAnalysisEngine(detect_attachment_types=False,
+                                 limits=AnalysisLimits(**{limit_name: LIMITS_AT_BOUND[limit_name] - 1}))
+
+    assert engine.analyze_bytes(RAW_EMAIL) == {'Total Message Size': len(RAW_EMAIL), 'Limit Exceeded': limit_name}
+
+
+def test_attachment_limit_is_enforced_on_parsed_messages():
+    # The MIME depth and part count are checked while the lazy view indexes the email, the decoded attachment size
+    # while the attachments of any message are walked
+    limits = AnalysisLimits(max_attachment_bytes=LIMITS_AT_BOUND['max_attachment_bytes'] - 1)
+    engine = EmailAnalysisEngine(detect_attachment_types=False)
+    guard = limits.start_message(len(RAW_EMAIL))
+
+    with pytest.raises(MessageLimitExceededError) as limit_error:
+        engine.get_message_metrics(engine.parse(RAW_EMAIL), len(RAW_EMAIL), guard=guard)
+    assert limit_error.value.limit_name == 'max_attachment_bytes'
+
+
+def test_email_at_every_bound_is_analyzed():
+    engine = EmailAnalysisEngine(detect_attachment_types=False, limits=AnalysisLimits(**LIMITS_AT_BOUND))
+
+    metrics = engine.analyze_bytes(RAW_EMAIL)
+
+    assert 'Limit Exceeded' not in metrics
+    assert [attachment['File Name'] for attachment in metrics['Attachments']] == ['one.bin', 'two.bin']
+
+
+def test_time_budget_is_flagged():
+    engine = EmailAnalysisEngine(detect_attachment_types=False, limits=AnalysisLimits(time_budget=1e-9))
+
+    assert engine.analyze_bytes(RAW_EMAIL)['Limit Exceeded'] == 'time_budget'
+
+
+@pytest.mark.parametrize('prefetch', (0, 2))
+def test_analyzer_flags_oversized_files_without_reading_them(tmp_path, monkeypatch, prefetch):
+    (tmp_path / 'large.eml').write_bytes(RAW_EMAIL)
+    (tmp_path / 'small.eml').write_bytes(b'From: a@b.c\r\nSubject: Small\r\n\r\nbody\r\n')
+    mail_analyzer = EmailAnalyzer(str(tmp_path), limits=AnalysisLimits(max_message_bytes=100), collect_stats=True,
+                                  prefetch=prefetch)
+    read_paths = []
+
+    def recording_open(file_path, *args, **kwargs):
+        read_paths.append(file_path)
+        return open(file_path, *args, **kwargs)
+
+    # Every email file is opened by the analyzer module, whether it is read ahead, read or memory-mapped
+    monkeypatch.setattr('email_analyzer.email_analyzer.open', recording_open, raising=False)
+
+    metrics = {mail_item_metrics['File Path']: mail_item_metrics for mail_item_metrics in mail_analyzer.iter_metrics()}
+
+    assert metrics[str(tmp_path / 'large.eml')]['Limit Exceeded'] == 'max_message_bytes'
+    assert metrics[str(tmp_path / 'small.eml')]['Subject'] == 'Small'
+    assert read_paths == [str(tmp_path / 'small.eml')]
+    assert mail_analyzer.stats.as_dict()['Errors'] == {'MessageLimitExceededError': 1}
+
+
+def test_flag_limit_exceeded_records_the_error():
+    limit_error = MessageLimitExceededError(limit_name='max_parts', limit=1, value=2)
+    stats = AnalyzerStats()
+
+    metrics = flag_limit_exceeded(limit_error, {'File Path': 'x.eml'}, 10, stats)
+
+    assert metrics == {'File Path': 'x.eml', 'Total Message Size': 10, 'Limit Exceeded': 'max_parts'}
+    assert stats.as_dict()['Errors'] == {'MessageLimitExceededError': 1}
+
+
+@pytest.mark.parametrize('limits', ({'max_parts': -1}, {'max_message_bytes': -1}, {'time_budget': 0}))
+def test_invalid_limits_are_rejected(limits):
+    with pytest.raises(ValueError):
+        AnalysisLimits(**limits)
@@ -0,0 +1,87 @@
+"""
+Module: test_async_email_analyzer.py
+
+This module checks that AsyncEmailAnalyzer produces the same metrics as EmailAnalyzer, with and without parse
+worker processes, that it keeps at most `concurrency` reads in flight, and that it enforces the analysis limits on
+the emails returned by custom file readers.
+
+Author: S S R C Kashyap
+Email: 1kasyap97@gmail.com
+Reviewer: Daniel Caffrey
+Email: dcaffrey@topsec.com
+"""
+
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+from email_analyzer import AnalysisLimits, AsyncEmailAnalyzer, EmailAnalyzer
+
+def collect_metrics(async_analyzer: AsyncEmailAnalyzer) -> list:
+    """
+    Runs an asynchronous analysis to completion.
+
+    Returns:
+        list: The metrics of the emails, sorted by file path as they are yielded in completion order.
+    """
+    async def collect():
+        return [mail_item_metrics async for mail_item_metrics in async_analyzer.iter_metrics()]
+    return sorted(asyncio.run(collect()), key=lambda mail_item_metrics: mail_item_metrics['File Path'])
+
+
+@pytest.mark.parametrize('parse_workers', (0, 2))
+def test_async_metrics_match_sync_metrics(sample_mail_directory, parse_workers):
+    sync_metrics = sorted(EmailAnalyzer(str(sample_mail_directory), detect_attachment_types=False).iter_metrics(),
+                          key=lambda mail_item_metrics: mail_item_metrics['File Path'])
+
+    async_analyzer = AsyncEmailAnalyzer(str(sample_mail_directory), concurrency=3, parse_workers=parse_workers,
+                                        detect_attachment_types=False)
+
+    assert collect_metrics(async_analyzer) == sync_metrics
+    assert async_analyzer.get_directory_report()['Messages Processed'] == len(sync_metrics)
+
+
+def test_reads_in_flight_are_bounded_by_concurrency(sample_mail_directory):
+    lock = threading.Lock()
+    reads_in_flight = [0]
+    max_reads_in_flight = [0]
+
+    def slow_reader(email_source):
+        with lock:
+            reads_in_flight[0] += 1
+            max_reads_in_flight[0] = max(max_reads_in_flight[0], reads_in_flight[0])
+        time.sleep(0.02)
+        with lock:
+            reads_in_flight[0] -= 1
+        with open(email_source[0], 'rb') as email_file:
+            return email_file.read()
+
+    metrics = collect_metrics(AsyncEmailAnalyzer(str(sample_mail_directory), concurrency=3, file_reader=slow_reader,
+                                                 detect_attachment_types=False))
+
+    assert len(metrics) == len(os.listdir(sample_mail_directory))
+    assert 1 < max_reads_in_flight[0] <= 3
+
+
+def test_limits_are_enforced_on_custom_readers(sample_mail_directory):
+    def custom_reader(email_source):
+        with open(email_source[0], 'rb') as email_file:
+            return email_file.read()
+
+    async_analyzer = AsyncEmailAnalyzer(str(sample_mail_directory), detect_attachment_types=False,
+                                        limits=AnalysisLimits(max_message_bytes=1000), file_reader=custom_reader)
+
+    flagged_files = {os.path.basename(mail_item_metrics['File Path'])
+                     for mail_item_metrics in collect_metrics(async_analyzer) if 'Limit Exceeded' in mail_item_metrics}
+
+    assert flagged_files == {file_name for file_name in os.listdir(sample_mail_directory)
+                             if os.path.getsize(sample_mail_directory / file_name) > 1000}
+
+
+@pytest.mark.parametrize('options', ({'concurrency': 0}, {'parse_workers': -1}))
+def test_invalid_options_are_rejected(options):
+    with pytest.raises(ValueError):
+        AsyncEmailAnalyzer('.', **options)
@@ -0,0 +1,48 @@
+"""
+Module: test_benchmarks.py
+
+This module checks the helpers of the benchmark scripts: the nearest-rank percentiles reported by the pipeline
+benchmark, and the determinism of the synthetic corpus generator.
+
+Author: S S R C Kashyap
+Email: 1kasyap97@gmail.com
+Reviewer: Daniel Caffrey
+Email: dcaffrey@topsec.com
+"""
+
+import os
+import sys
+
+import pytest
+
+# The benchmark scripts are not part of the package, they import each other from their own directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+from benchmark_pipeline import percentile  # noqa: E402
+from corpus_generator import generate_corpus  # noqa: E402
+
+
+@pytest.mark.parametrize('fraction, expected', ((0.0, 1), (0.01, 1), (0.5, 50), (0.99, 99), (0.999, 100), (1.0, 100)))
+def test_percentile_is_the_nearest_rank(fraction, expected):
+    assert percentile(list(range(1, 101)), fraction) == expected
+
+
+@pytest.mark.parametrize('values, fraction, expected', (([7], 0.5, 7), ([7], 0.99, 7), ([1, 2], 0.5, 1),
+                                                        ([1, 2], 0.51, 2), ([1, 2, 3, 4], 0.75, 3)))
+def test_percentile_of_small_samples(values, fraction, expected):
+    assert percentile(values, fraction) == expected
+
+
+def test_percentile_of_no_values():
+    assert percentile([], 0.5) == 0.0
+
+
+def test_corpus_is_deterministic(tmp_path):
+    corpus_sizes = [generate_corpus(str(tmp_path / corpus_name), messages=5, body_size=256, attachment_size=512,
+                                    seed=7)
+                    for corpus_name in ('first', 'second')]
+
+    assert corpus_sizes[0] == corpus_sizes[1]
+    assert sorted(os.listdir(tmp_path / 'first')) == sorted(os.listdir(tmp_path / 'second'))
+    for file_name in os.listdir(tmp_path / 'first'):
+        assert (tmp_path / 'first' / file_name).read_bytes() == (tmp_path / 'second' / file_name).read_bytes()
@@ -0,0 +1,108 @@
+"""
+Module: test_cli.py
+
+This module checks the exit status, output and error messages of the command line interface
+("python -m email_analyzer"), and that importing the package does not load the modules only some analyses need.
+
+Author: S S R C Kashyap
+Email: 1kasyap97@gmail.com
+Reviewer: Daniel Caffrey
+Email: dcaffrey@topsec.com
+"""
+
+import io
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from email_analyzer.__main__ import main
+
+PACKAGE_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RAW_EMAIL = b'From: a@b.c\r\nSubject: Hello\r\nMessage-ID: <1@b.c>\r\n\r\nbody\r\n'
+
+
+@pytest.fixture
+def email_path(tmp_path):
+    """
+    Writes a single email file.
+    """
+    file_path = tmp_path / 'message.eml'
+    file_path.write_bytes(RAW_EMAIL)
+    return str(file_path)
+
+
+def output_records(captured_output: str) -> list:
+    """
+    Returns the NDJSON records written to the standard output.
+    """
+    return [json.loads(line) for line in captured_output.splitlines()]
+
+
+def test_valid_email_exits_with_zero(email_path, capsys):
+    assert main(['--no-type-detection', email_path]) == 0
+
+    captured = capsys.readouterr()
+    assert [record['subject'] for record in output_records(captured.out)] == ['Hello']
+    assert captured.err == ''
+
+
+def test_missing_path_exits_with_one(tmp_path, capsys):
+    missing_path = str(tmp_path / 'missing.eml')
+
+    assert main([missing_path]) == 1
+    assert capsys.readouterr().err == f"email_analyzer: no such file or directory: '{missing_path}'\n"
+
+
+@pytest.mark.parametrize('workers', (1, 2))
+def test_file_that_is_not_an_email_exits_with_one(tmp_path, capsys, workers):
+    text_path = tmp_path / 'notes.txt'
+    text_path.write_text('not an email')
+
+    assert main(['--workers', str(workers), str(text_path)]) == 1
+    captured = capsys.readouterr()
+    assert captured.out == ''
+    assert captured.err.startswith(f"email_analyzer: cannot analyze '{text_path}': ")
+
+
+def test_directory_without_emails_exits_with_one(tmp_path, capsys):
+    assert main([str(tmp_path)]) == 1
+    captured = capsys.readouterr()
+    assert captured.out == ''
+    assert captured.err.startswith(f"email_analyzer: cannot analyze '{tmp_path}': ")
+
+
+def test_valid_paths_are_analyzed_after_an_invalid_one(tmp_path, email_path, capsys):
+    assert main(['--no-type-detection', str(tmp_path / 'missing.eml'), email_path]) == 1
+    assert len(output_records(capsys.readouterr().out)) == 1
+
+
+def test_stdin_email(monkeypatch, capsys):
+    monkeypatch.setattr(sys, 'stdin', io.TextIOWrapper(io.BytesIO(RAW_EMAIL)))
+
+    assert main(['--no-type-detection', '-']) == 0
+    record, = output_records(capsys.readouterr().out)
+    assert (record['file_path'], record['subject']) == ('-', 'Hello')
+
+
+@pytest.mark.parametrize('arguments', (['--workers', '0', 'x.eml'], ['--chunk-size', '0', 'x.eml'],
+                                       ['--format', 'parquet', 'x.eml'], ['-', '-']))
+def test_invalid_arguments_exit_with_two(arguments, capsys):
+    with pytest.raises(SystemExit) as system_exit:
+        main(arguments)
+    assert system_exit.value.code == 2
+
+
+def test_import_does_not_load_optional_modules():
+    optional_modules = ('json', 'csv', 'hashlib', 'sqlite3', 'magic', 'asyncio', 'multiprocessing', 'pyarrow',
+                        'email_analyzer.engine', 'email_analyzer.result_writers', 'email_analyzer.instrumentation')
+    code = ('import sys; from email_analyzer import EmailAnalyzer; '
+            f'print(",".join(name for name in {optional_modules!r} if name in sys.modules))')
+
+    completed = subprocess.run([sys.executable, '-c', code], cwd=PACKAGE_DIRECTORY, capture_output=True, text=True,
+                               check=True)
+
+    assert completed.stdout.strip() == ''
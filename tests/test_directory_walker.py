@@ -0,0 +1,113 @@
+"""
+Module: test_directory_walker.py
+
+This module checks the read-ahead depth and ordering of iter_prefetched, and the glob, depth and symbolic link
+filters of DirectoryWalker.
+
+Author: S S R C Kashyap
+Email: 1kasyap97@gmail.com
+Reviewer: Daniel Caffrey
+Email: dcaffrey@topsec.com
+"""
+
+import os
+import threading
+
+import pytest
+
+from email_analyzer.directory_walker import SYMLINKS_FILES, SYMLINKS_IGNORE, DirectoryWalker, iter_prefetched
+
+
+class CountingItems:
+    """
+    An iterable of integers counting how many of them were taken by iter_prefetched, i.e. submitted for reading.
+    """
+    def __init__(self, count: int):
+        self.count = count
+        self.taken = 0
+
+    def __iter__(self):
+        for item in range(self.count):
+            self.taken += 1
+            yield item
+
+
+@pytest.mark.parametrize('prefetch', (1, 2, 4))
+def test_prefetch_reads_are_in_flight_ahead_of_the_consumed_item(prefetch):
+    items = CountingItems(10)
+    taken_when_yielded = []
+
+    for item, data in iter_prefetched(items, lambda item: item * 10, prefetch):
+        assert data == item * 10
+        taken_when_yielded.append(items.taken)
+
+    # While an item is consumed, the reads of the next prefetch items are already submitted
+    assert taken_when_yielded == [min(item + 1 + prefetch, items.count) for item in range(items.count)]
+
+
+def test_prefetch_reads_run_on_background_threads():
+    reading_threads = set()
+
+    def read_item(item):
+        reading_threads.add(threading.get_ident())
+        return item
+
+    assert [item for item, _ in iter_prefetched(range(5), read_item, 2)] == [0, 1, 2, 3, 4]
+    assert threading.get_ident() not in reading_threads
+
+
+def test_no_prefetch_reads_on_the_consuming_thread():
+    items = CountingItems(3)
+    reading_threads = set()
+
+    def read_item(item):
+        reading_threads.add(threading.get_ident())
+        return item
+
+    for item, _ in iter_prefetched(items, read_item, 0):
+        assert items.taken == item + 1
+    assert reading_threads == {threading.get_ident()}
+
+
+@pytest.fixture
+def mail_tree(tmp_path):
+    """
+    Builds a directory tree of email and other files, two levels deep.
+    """
+    for relative_path in ('a.eml', 'notes.txt', '2023/b.eml', '2023/01/c.eml', '.Trash/d.eml'):
+        file_path = tmp_path / relative_path
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_bytes(b'Subject: x\r\n\r\nbody\r\n')
+    return tmp_path
+
+
+def relative_files(walker: DirectoryWalker) -> list:
+    """
+    Returns the files found by a walker, as sorted paths relative to its root with '/' separators.
+    """
+    return sorted(os.path.relpath(file_path, walker.root_path).replace(os.sep, '/') for file_path in walker)
+
+
+def test_walker_filters_by_depth_and_patterns(mail_tree):
+    assert relative_files(DirectoryWalker(str(mail_tree), max_depth=0)) == ['a.eml']
+    assert relative_files(DirectoryWalker(str(mail_tree), max_depth=1)) == ['.Trash/d.eml', '2023/b.eml', 'a.eml']
+    assert relative_files(DirectoryWalker(str(mail_tree), exclude_patterns=['.Trash'])) == \
+        ['2023/01/c.eml', '2023/b.eml', 'a.eml']
+    assert relative_files(DirectoryWalker(str(mail_tree), include_patterns=['2023/*/*.eml'])) == ['2023/01/c.eml']
+
+
+@pytest.mark.skipif(not hasattr(os, 'symlink'), reason='symbolic links are not supported')
+def test_walker_symlink_policies(mail_tree):
+    os.symlink(mail_tree / 'a.eml', mail_tree / 'link.eml')
+    os.symlink(mail_tree / '2023', mail_tree / 'linked_directory', target_is_directory=True)
+
+    assert relative_files(DirectoryWalker(str(mail_tree), max_depth=None, symlink_policy=SYMLINKS_IGNORE)) == \
+        ['.Trash/d.eml', '2023/01/c.eml', '2023/b.eml', 'a.eml']
+    assert relative_files(DirectoryWalker(str(mail_tree), max_depth=None, symlink_policy=SYMLINKS_FILES)) == \
+        ['.Trash/d.eml', '2023/01/c.eml', '2023/b.eml', 'a.eml', 'link.eml']
+
+
+@pytest.mark.parametrize('options', ({'max_depth': -1}, {'symlink_policy': 'sometimes'}))
+def test_walker_rejects_invalid_options(options):
+    with pytest.raises(ValueError):
+        DirectoryWalker('.', **options)
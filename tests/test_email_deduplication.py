@@ -0,0 +1,84 @@
+"""
+Module: test_email_deduplication.py
+
+This module checks the LRU cache memoizing the results of identical emails and attachments, and the duplicate
+clusters reported by EmailAnalyzer when deduplication is enabled.
+
+Author: S S R C Kashyap
+Email: 1kasyap97@gmail.com
+Reviewer: Daniel Caffrey
+Email: dcaffrey@topsec.com
+"""
+
+import base64
+
+import pytest
+
+from email_analyzer import EmailAnalyzer
+from email_analyzer.email_deduplication import LRUCache, content_hash
+
+
+def build_email(subject: str, attachment: bytes) -> bytes:
+    """
+    Builds an email with a single base64 attachment.
+    """
+    return (f'From: a@b.c\r\n'
+            f'Subject: {subject}\r\n'
+            f'Content-Type: multipart/mixed; boundary=B\r\n'
+            f'\r\n'
+            f'--B\r\n'
+            f'Content-Type: application/octet-stream\r\n'
+            f'Content-Disposition: attachment; filename="data.bin"\r\n'
+            f'Content-Transfer-Encoding: base64\r\n'
+            f'\r\n'
+            f'{base64.b64encode(attachment).decode()}\r\n'
+            f'--B--\r\n').encode()
+
+
+def test_lru_cache_evicts_the_least_recently_used_entry():
+    cache = LRUCache(maxsize=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+
+    cache.put('c', 3)
+
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c'), len(cache)) == (1, 3, 2)
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_lru_cache_rejects_an_empty_size():
+    with pytest.raises(ValueError):
+        LRUCache(maxsize=0)
+
+
+@pytest.mark.parametrize('parallel', (False, True), ids=('iter_metrics', 'analyze_parallel'))
+def test_duplicates_are_reported(tmp_path, parallel):
+    (tmp_path / 'a.eml').write_bytes(build_email('same', b'shared attachment'))
+    (tmp_path / 'b.eml').write_bytes(build_email('same', b'shared attachment'))
+    (tmp_path / 'c.eml').write_bytes(build_email('other', b'shared attachment'))
+    # The attachments are only decoded, and hashed, when their types are detected
+    pytest.importorskip('magic')
+    mail_analyzer = EmailAnalyzer(str(tmp_path), deduplicate=True)
+
+    metrics = list(mail_analyzer.analyze_parallel(max_workers=2) if parallel else mail_analyzer.iter_metrics())
+    report = mail_analyzer.get_directory_report()
+
+    duplicate_hash = content_hash((tmp_path / 'a.eml').read_bytes())
+    assert [mail_item_metrics['Content Hash'] for mail_item_metrics in metrics].count(duplicate_hash) == 2
+    assert (report['Unique Messages'], report['Duplicate Messages'], report['Duplicate Attachments']) == (2, 1, 2)
+    assert list(report['Duplicate Clusters']) == [duplicate_hash]
+    assert sorted(report['Duplicate Clusters'][duplicate_hash]) == [str(tmp_path / 'a.eml'), str(tmp_path / 'b.eml')]
+
+
+def test_duplicate_emails_get_the_same_metrics(tmp_path):
+    (tmp_path / 'a.eml').write_bytes(build_email('same', b'attachment'))
+    (tmp_path / 'b.eml').write_bytes(build_email('same', b'attachment'))
+
+    first_metrics, second_metrics = EmailAnalyzer(str(tmp_path), deduplicate=True,
+                                                  detect_attachment_types=False).iter_metrics()
+
+    assert {first_metrics.pop('File Path'), second_metrics.pop('File Path')} == {str(tmp_path / 'a.eml'),
+                                                                                 str(tmp_path / 'b.eml')}
+    assert first_metrics == second_metrics
@@ -0,0 +1,95 @@
+"""
+Module: test_email_header_scanner.py
+
+This module checks that the headers-only scan finds the end of the header block and the attachment parts of emails
+written with LF, CRLF and bare CR line endings, and that it reports the same metrics as the full analysis.
+
+Author: S S R C Kashyap
+Email: 1kasyap97@gmail.com
+Reviewer: Daniel Caffrey
+Email: dcaffrey@topsec.com
+"""
+
+import pytest
+
+from email_analyzer import EmailAnalyzer
+from email_analyzer.email_header_scanner import has_attachment_parts, parse_header_block, split_header_block
+
+LINE_ENDINGS = (b'\n', b'\r\n', b'\r')
+
+MULTIPART_EMAIL_LINES = (
+    b'From: a@b.c',
+    b'Subject: Report',
+    b'MIME-Version: 1.0',
+    b'Content-Type: multipart/mixed; boundary="XYZ"',
+    b'',
+    b'--XYZ',
+    b'Content-Type: text/plain',
+    b'',
+    b'body',
+    b'--XYZ',
+    b'Content-Type: application/pdf',
+    b'Content-Disposition:',
+    b' attachment; filename="report.pdf"',
+    b'Content-Transfer-Encoding: base64',
+    b'',
+    b'JVBERi0xLjQK',
+    b'--XYZ--',
+    b'',
+)
+
+
+def build_email(lines: tuple, line_ending: bytes) -> bytes:
+    """
+    Joins the lines of an email with the given line ending.
+    """
+    return line_ending.join(lines)
+
+
+@pytest.mark.parametrize('line_ending', LINE_ENDINGS)
+def test_header_block_ends_at_the_first_blank_line(line_ending):
+    raw_email = build_email(MULTIPART_EMAIL_LINES, line_ending)
+
+    header_block, body_offset = split_header_block(raw_email)
+
+    assert header_block == build_email(MULTIPART_EMAIL_LINES[:4], line_ending)
+    assert raw_email[body_offset:].startswith(b'--XYZ')
+
+
+@pytest.mark.parametrize('line_ending', LINE_ENDINGS)
+def test_single_line_breaks_do_not_end_the_header_block(line_ending):
+    raw_email = build_email((b'From: a@b.c', b'Subject: no body'), line_ending)
+
+    assert split_header_block(raw_email) == (raw_email, len(raw_email))
+
+
+@pytest.mark.parametrize('line_ending', LINE_ENDINGS)
+def test_folded_attachment_disposition_is_found(line_ending):
+    raw_email = build_email(MULTIPART_EMAIL_LINES, line_ending)
+    header_block, body_offset = split_header_block(raw_email)
+
+    assert has_attachment_parts(parse_header_block(header_block), raw_email, body_offset)
+
+
+@pytest.mark.parametrize('header_name, has_attachments', ((b'CONTENT-DISPOSITION:', True),
+                                                          (b'content-disposition:', True),
+                                                          (b'X-Content-Disposition:', False),
+                                                          (b'Content-Type: text/plain; x-content-disposition:', False)))
+def test_only_content_disposition_headers_are_considered(header_name, has_attachments):
+    lines = tuple(header_name if line == b'Content-Disposition:' else line for line in MULTIPART_EMAIL_LINES)
+    raw_email = build_email(lines, b'\r\n')
+    header_block, body_offset = split_header_block(raw_email)
+
+    assert has_attachment_parts(parse_header_block(header_block), raw_email, body_offset) is has_attachments
+
+
+@pytest.mark.parametrize('line_ending', LINE_ENDINGS)
+def test_headers_only_metrics_match_full_metrics(tmp_path, line_ending):
+    email_path = tmp_path / 'report.eml'
+    email_path.write_bytes(build_email(MULTIPART_EMAIL_LINES, line_ending))
+
+    full_metrics, = EmailAnalyzer(str(email_path), detect_attachment_types=False).iter_metrics()
+    headers_metrics, = EmailAnalyzer(str(email_path), detect_attachment_types=False, headers_only=True).iter_metrics()
+
+    assert headers_metrics['Has Attachments'] is True
+    assert {key: full_metrics[key] for key in headers_metrics} == headers_metrics
@@ -0,0 +1,55 @@
+"""
+Module: test_email_size_statistics.py
+
+This module checks that the size of every email is reported from the bytes actually read, and that the size totals
+and histogram of a run add up.
+
+Author: S S R C Kashyap
+Email: 1kasyap97@gmail.com
+Reviewer: Daniel Caffrey
+Email: dcaffrey@topsec.com
+"""
+
+import os
+
+import pytest
+
+from email_analyzer import EmailAnalyzer
+from email_analyzer.email_size_statistics import SIZE_HISTOGRAM_BUCKETS, SizeTracker
+
+@pytest.mark.parametrize('message_size, label', ((0, '< 4 KiB'), (4 * 1024 - 1, '< 4 KiB'),
+                                                 (4 * 1024, '4 KiB - 64 KiB'), (1024 * 1024, '1 MiB - 16 MiB'),
+                                                 (16 * 1024 * 1024, '>= 16 MiB')))
+def test_histogram_buckets(message_size, label):
+    size_tracker = SizeTracker()
+
+    size_tracker.add({'Total Message Size': message_size})
+
+    histogram = size_tracker.get_report()['Size Histogram']
+    assert list(histogram) == [bucket_label for _, bucket_label in SIZE_HISTOGRAM_BUCKETS]
+    assert histogram == {bucket_label: int(bucket_label == label) for _, bucket_label in SIZE_HISTOGRAM_BUCKETS}
+
+
+def test_totals_split_attachments_from_the_body():
+    size_tracker = SizeTracker()
+    size_tracker.add({'Total Message Size': 1000, 'Attachments': [{'Encoded Size': 300}, {'Encoded Size': None}]})
+    size_tracker.add({'Total Message Size': 500})
+    # Emails whose size is unknown (e.g. unreadable files) are left out
+    size_tracker.add({'File Path': 'unreadable.eml'})
+
+    report = size_tracker.get_report()
+
+    assert (report['Total Bytes'], report['Attachment Bytes'], report['Body Bytes']) == (1500, 300, 1200)
+    assert sum(report['Size Histogram'].values()) == 2
+
+
+@pytest.mark.parametrize('headers_only', (False, True))
+def test_sizes_are_the_bytes_read(assets_directory, headers_only):
+    mail_analyzer = EmailAnalyzer(assets_directory, headers_only=headers_only, detect_attachment_types=False)
+
+    metrics = list(mail_analyzer.iter_metrics())
+
+    for mail_item_metrics in metrics:
+        assert mail_item_metrics['Total Message Size'] == os.path.getsize(mail_item_metrics['File Path'])
+    assert mail_analyzer.get_directory_report()['Total Bytes'] == \
+        sum(os.path.getsize(mail_item_metrics['File Path']) for mail_item_metrics in metrics)
@@ -0,0 +1,74 @@
+"""
+Module: test_engine.py
+
+This module checks that a single EmailAnalysisEngine, with its deduplication caches, can be shared by several threads:
+the metrics are the same as those of a sequential run, and the metrics returned to a caller are its own, so changing
+them does not change the metrics later served from the caches.
+
+Author: S S R C Kashyap
+Email: 1kasyap97@gmail.com
+Reviewer: Daniel Caffrey
+Email: dcaffrey@topsec.com
+"""
+
+import copy
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from email_analyzer import EmailAnalysisEngine
+
+
+@pytest.fixture
+def raw_emails(assets_directory) -> list:
+    """
+    Returns the sample emails of the repository and variants of them, each one repeated several times in a row so
+    the caches get hits.
+    """
+    samples = []
+    for file_name in sorted(os.listdir(assets_directory)):
+        with open(os.path.join(assets_directory, file_name), 'rb') as email_file:
+            samples.append(email_file.read())
+    variants = [sample.replace(b'\r\n\r\n', f'\r\nX-Variant: {index}\r\n\r\n'.encode(), 1)
+                for index, sample in enumerate(samples * 4)]
+    return [raw_email for raw_email in samples + variants for _ in range(5)]
+
+
+@pytest.mark.parametrize('detect_attachment_types', (False, True))
+def test_shared_engine_matches_a_sequential_run(raw_emails, detect_attachment_types):
+    if detect_attachment_types:
+        pytest.importorskip('magic')
+    sequential_engine = EmailAnalysisEngine(detect_attachment_types=detect_attachment_types, deduplicate=True)
+    sequential_metrics = [sequential_engine.analyze_bytes(raw_email) for raw_email in raw_emails]
+    # The cache of the shared engine is smaller than the number of distinct emails, so entries are evicted too
+    shared_engine = EmailAnalysisEngine(detect_attachment_types=detect_attachment_types, deduplicate=True,
+                                        dedup_cache_size=4)
+
+    def analyze_and_tamper(raw_email: bytes) -> dict:
+        mail_item_metrics = shared_engine.analyze_bytes(raw_email)
+        returned_metrics = copy.deepcopy(mail_item_metrics)
+        # The caller owns the returned metrics, changing them must not reach the other threads through the caches
+        for attachment in mail_item_metrics.get('Attachments', ()):
+            attachment['File Name'] = 'tampered'
+        mail_item_metrics['Subject'] = 'tampered'
+        return returned_metrics
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        shared_metrics = list(executor.map(analyze_and_tamper, raw_emails))
+
+    assert shared_metrics == sequential_metrics
+
+
+def test_changing_returned_attachments_does_not_change_the_cache(assets_directory):
+    with open(os.path.join(assets_directory, 'email-with-attachments.eml'), 'rb') as email_file:
+        raw_email = email_file.read()
+    engine = EmailAnalysisEngine(detect_attachment_types=False, deduplicate=True)
+
+    first_metrics = engine.analyze_bytes(raw_email)
+    expected_metrics = copy.deepcopy(first_metrics)
+    assert first_metrics['Attachments']
+    first_metrics['Attachments'][0]['File Name'] = 'tampered'
+    first_metrics['Attachments'].append({'File Name': 'extra'})
+
+    assert engine.analyze_bytes(raw_email) == expected_metrics
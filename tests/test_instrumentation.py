@@ -0,0 +1,89 @@
+"""
+Module: test_instrumentation.py
+
+This module checks that AnalyzerStats records, merges and exports the statistics of the analyses, and that the
+statistics collected by the worker processes of analyze_parallel reach the parent process, including the statistics
+of a chunk whose analysis failed.
+
+Author: S S R C Kashyap
+Email: 1kasyap97@gmail.com
+Reviewer: Daniel Caffrey
+Email: dcaffrey@topsec.com
+"""
+
+import multiprocessing
+
+import pytest
+
+from email_analyzer import AnalyzerStats, EmailAnalysisEngine, EmailAnalyzer
+
+
+def test_stats_record_and_merge():
+    first_stats = AnalyzerStats(slowest_count=2)
+    first_stats.record_stage('parse', 0.5)
+    first_stats.record_message('a.eml', 0.5, message_size=100, attachment_count=1)
+    first_stats.record_message('b.eml', 0.1, message_size=50, attachment_count=0)
+    second_stats = AnalyzerStats(slowest_count=2)
+    second_stats.record_message('c.eml', 0.3, message_size=10, attachment_count=2)
+    second_stats.record_error(ValueError('broken'))
+
+    first_stats.merge(second_stats)
+    stats = first_stats.as_dict()
+
+    assert (stats['Messages'], stats['Bytes'], stats['Attachments']) == (3, 160, 3)
+    assert stats['Stage Calls']['parse'] == 1
+    assert stats['Errors'] == {'ValueError': 1}
+    assert [message['Location'] for message in stats['Slowest Messages']] == ['a.eml', 'c.eml']
+
+
+def test_prometheus_export_escapes_labels():
+    stats = AnalyzerStats()
+    stats.record_message('dir/"quoted"\\name.eml', 0.25, message_size=10, attachment_count=0)
+
+    exported = stats.to_prometheus(prefix='mail')
+
+    assert 'mail_messages_total 1\n' in exported
+    assert 'mail_slowest_message_seconds{rank="1",location="dir/\\"quoted\\"\\\\name.eml"} 0.25\n' in exported
+    assert exported.endswith('\n')
+
+
+def test_iter_metrics_collects_stats(mail_directory):
+    mail_analyzer = EmailAnalyzer(str(mail_directory), collect_stats=True, detect_attachment_types=False)
+
+    assert len(list(mail_analyzer.iter_metrics())) == 3
+    assert mail_analyzer.stats.as_dict()['Messages'] == 3
+    assert mail_analyzer.stats.as_dict()['Stage Calls']['read'] == 3
+
+
+def test_no_stats_without_instrumentation(mail_directory):
+    mail_analyzer = EmailAnalyzer(str(mail_directory), detect_attachment_types=False)
+
+    list(mail_analyzer.iter_metrics())
+    assert mail_analyzer.stats is None
+
+
+def test_parallel_stats_are_merged(mail_directory):
+    mail_analyzer = EmailAnalyzer(str(mail_directory), collect_stats=True, detect_attachment_types=False)
+
+    assert len(list(mail_analyzer.analyze_parallel(max_workers=2, chunk_size=1))) == 3
+    assert mail_analyzer.stats.as_dict()['Messages'] == 3
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != 'fork',
+                    reason='the failure is injected in the parent process and inherited by forked workers')
+def test_stats_of_a_failed_chunk_are_merged(mail_directory, monkeypatch):
+    analyze_raw_email = EmailAnalysisEngine._analyze_raw_email
+
+    def failing_analyze_raw_email(self, raw_email, mail_item_metrics, stats):
+        if b'Subject: c' in raw_email:
+            raise ValueError('unparsable email')
+        return analyze_raw_email(self, raw_email, mail_item_metrics, stats)
+
+    monkeypatch.setattr(EmailAnalysisEngine, '_analyze_raw_email', failing_analyze_raw_email)
+    mail_analyzer = EmailAnalyzer(str(mail_directory), collect_stats=True, detect_attachment_types=False)
+
+    with pytest.raises(ValueError, match='unparsable email'):
+        list(mail_analyzer.analyze_parallel(max_workers=1, chunk_size=3))
+    stats = mail_analyzer.stats.as_dict()
+    assert stats['Errors'] == {'ValueError': 1}
+    assert stats['Messages'] == 2
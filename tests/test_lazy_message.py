@@ -0,0 +1,139 @@
+"""
+Module: test_lazy_message.py
+
+This module checks that LazyEmailMessage, the offset-indexed view used by the analysis engine, walks the MIME parts
+of an email and decodes their payloads exactly as the full email parser does, whatever the line endings of the email
+and including the malformed and special multipart structures the parser handles on its own.
+
+Author: S S R C Kashyap
+Email: 1kasyap97@gmail.com
+Reviewer: Daniel Caffrey
+Email: dcaffrey@topsec.com
+"""
+
+import pytest
+
+from email_analyzer.engine import EmailAnalysisEngine
+from email_analyzer.lazy_message import LazyEmailMessage
+
+# The test emails, written with '\n' line endings and converted to the line endings under test
+EMAILS = {
+    'attachments': (b'From: a@b.c\n'
+                    b'Subject: Report\n'
+                    b'Content-Type: multipart/mixed; boundary="B"\n'
+                    b'\n'
+                    b'preamble\n'
+                    b'--B\n'
+                    b'Content-Type: text/plain\n'
+                    b'\n'
+                    b'Hello\n'
+                    b'--B\n'
+                    b'Content-Type: application/octet-stream\n'
+                    b'Content-Disposition: attachment; filename="data.bin"\n'
+                    b'Content-Transfer-Encoding: base64\n'
+                    b'\n'
+                    b'AAEC/w==\n'
+                    b'--B--\n'
+                    b'epilogue\n'),
+    'missing_close_delimiter': (b'From: a@b.c\n'
+                                b'Content-Type: multipart/mixed; boundary=Q\n'
+                                b'\n'
+                                b'--Q\n'
+                                b'Content-Disposition: attachment; filename=x.bin\n'
+                                b'\n'
+                                b'\x00\x01\xff\n'),
+    'digest': (b'From: a@b.c\n'
+               b'Content-Type: multipart/digest; boundary=D\n'
+               b'\n'
+               b'--D\n'
+               b'\n'
+               b'From: q@r.s\n'
+               b'Subject: d1\n'
+               b'\n'
+               b'body\n'
+               b'--D\n'
+               b'Content-Disposition: attachment; filename=d.txt\n'
+               b'\n'
+               b'plain\n'
+               b'--D--\n'),
+    'delivery_status': (b'From: a@b.c\n'
+                        b'Content-Type: multipart/report; boundary=R\n'
+                        b'\n'
+                        b'--R\n'
+                        b'Content-Type: message/delivery-status\n'
+                        b'\n'
+                        b'Reporting-MTA: x\n'
+                        b'\n'
+                        b'Final-Recipient: y\n'
+                        b'--R\n'
+                        b'Content-Disposition: attachment; filename=r.txt\n'
+                        b'\n'
+                        b'r\n'
+                        b'--R--\n'),
+    'nested': (b'From: a@b.c\n'
+               b'Content-Type: multipart/mixed; boundary=outer\n'
+               b'\n'
+               b'--outer\n'
+               b'Content-Type: multipart/alternative; boundary=inner\n'
+               b'\n'
+               b'--inner\n'
+               b'Content-Type: text/plain\n'
+               b'\n'
+               b'text\n'
+               b'--inner\n'
+               b'Content-Type: text/html\n'
+               b'\n'
+               b'<p>html</p>\n'
+               b'--inner--\n'
+               b'--outer\n'
+               b'Content-Type: text/csv; name="rows.csv"\n'
+               b'Content-Disposition: attachment\n'
+               b'\n'
+               b'a,b\n'
+               b'--outer--\n'),
+}
+
+LINE_ENDINGS = {'lf': b'\n', 'crlf': b'\r\n', 'bare_cr': b'\r'}
+
+
+def walk_signature(message) -> list:
+    """
+    Returns what the metrics depend on for every part of a message: its type, disposition, file name and payload.
+
+    Args:
+        message: An email.message.Message tree or a LazyEmailMessage.
+
+    Returns:
+        list: A tuple per part, in walk order.
+    """
+    return [(part.get_content_type(), part.get_content_disposition(), part.get_filename(), part.is_multipart(),
+             None if part.is_multipart() else (part.get_payload(), part.get_payload(decode=True)))
+            for part in message.walk()]
+
+
+@pytest.mark.parametrize('line_ending', LINE_ENDINGS.values(), ids=LINE_ENDINGS.keys())
+@pytest.mark.parametrize('email_name', EMAILS.keys())
+def test_lazy_view_matches_full_parser(email_name, line_ending):
+    raw_email = EMAILS[email_name].replace(b'\n', line_ending)
+    engine = EmailAnalysisEngine(detect_attachment_types=False)
+
+    parsed_email = engine.parse(raw_email)
+    lazy_email = LazyEmailMessage(raw_email)
+
+    assert walk_signature(lazy_email) == walk_signature(parsed_email)
+    assert (engine.get_message_metrics(lazy_email, len(raw_email))
+            == engine.get_message_metrics(parsed_email, len(raw_email)))
+
+
+def test_lazy_view_headers_match_full_parser():
+    raw_email = (b'From: =?utf-8?q?J=C3=B6rg?= <jorg@example.com>\r\n'
+                 b'Subject: a folded\r\n'
+                 b' subject\r\n'
+                 b'Message-ID: <id@example.com>\r\n'
+                 b'\r\n'
+                 b'body\r\n')
+    parsed_email = EmailAnalysisEngine().parse(raw_email)
+    lazy_email = LazyEmailMessage(raw_email)
+
+    for header_name in ('From', 'Subject', 'Message-ID', 'X-Missing'):
+        assert lazy_email.get(header_name) == parsed_email.get(header_name)
@@ -0,0 +1,104 @@
+"""
+Module: test_log_config.py
+
+This module checks that importing the package leaves the logging configuration of the application alone, that
+configure_logging writes the records of the package from its background thread, and that the records logged by the
+forked worker processes of analyze_parallel are written too.
+
+Author: S S R C Kashyap
+Email: 1kasyap97@gmail.com
+Reviewer: Daniel Caffrey
+Email: dcaffrey@topsec.com
+"""
+
+import logging
+import multiprocessing
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from email_analyzer import AnalysisLimits, EmailAnalyzer, configure_logging, shutdown_logging
+from email_analyzer.log_config import logger
+
+PACKAGE_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class RecordingHandler(logging.Handler):
+    """
+    Keeps the messages of the records it handles, along with the thread that handled them.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.handled = []
+
+    def emit(self, record: logging.LogRecord):
+        self.handled.append((record.getMessage(), threading.current_thread()))
+
+
+@pytest.fixture(autouse=True)
+def restore_logging():
+    """
+    Restores the default configuration of the package logger after every test.
+    """
+    yield
+    shutdown_logging()
+
+
+def test_import_does_not_configure_logging(tmp_path, assets_directory):
+    code = ('import logging; import email_analyzer; from email_analyzer import EmailAnalyzer; '
+            f'list(EmailAnalyzer({assets_directory!r}, detect_attachment_types=False).iter_metrics()); '
+            'print(len(logging.getLogger().handlers))')
+
+    completed = subprocess.run([sys.executable, '-c', code], cwd=str(tmp_path), capture_output=True, text=True,
+                               check=True, env=dict(os.environ, PYTHONPATH=PACKAGE_DIRECTORY))
+
+    assert completed.stdout.strip() == '0'
+    assert completed.stderr == ''
+    assert os.listdir(tmp_path) == []
+
+
+def test_records_are_written_by_the_listener_thread():
+    sink = RecordingHandler()
+    configure_logging(level=logging.INFO, handler=sink)
+
+    logger.debug('below the level')
+    logger.info('first record')
+    logger.warning('second record')
+    shutdown_logging()
+
+    assert [message for message, _ in sink.handled] == ['first record', 'second record']
+    assert all(thread is not threading.current_thread() for _, thread in sink.handled)
+    # The package logger is back to its default configuration
+    assert logger.propagate and logger.level == logging.NOTSET
+
+
+def test_records_are_appended_to_a_file(tmp_path):
+    log_path = tmp_path / 'email_analyzer.log'
+    configure_logging(filename=str(log_path), log_format='%(levelname)s %(message)s')
+
+    logger.info('written to the file')
+    shutdown_logging()
+
+    assert log_path.read_text(encoding='utf-8') == 'INFO written to the file\n'
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != 'fork',
+                    reason='the listener is only restarted in worker processes forked from a configured parent')
+def test_records_of_forked_workers_are_written(tmp_path, mail_directory):
+    log_path = tmp_path / 'email_analyzer.log'
+    configure_logging(filename=str(log_path), log_format='%(process)d %(message)s')
+    # Every email is over the limit, so each worker logs a warning when it skips one
+    mail_analyzer = EmailAnalyzer(str(mail_directory), detect_attachment_types=False,
+                                  limits=AnalysisLimits(max_message_bytes=10))
+
+    assert len(list(mail_analyzer.analyze_parallel(max_workers=2, chunk_size=1))) == 3
+    shutdown_logging()
+
+    skipped_records = [line.split(' ', 1) for line in log_path.read_text(encoding='utf-8').splitlines()
+                       if 'Skipping email' in line]
+    assert len(skipped_records) == 3
+    assert all(int(process_id) != os.getpid() for process_id, _ in skipped_records)
@@ -0,0 +1,124 @@
+"""
+Module: test_mailbox_sources.py
+
+This module checks the splitting of mbox archives into emails, the unquoting of their '>From ' lines, and the
+detection and listing of mbox archives and Maildir directories, on their own and through EmailAnalyzer.
+
+Author: S S R C Kashyap
+Email: 1kasyap97@gmail.com
+Reviewer: Daniel Caffrey
+Email: dcaffrey@topsec.com
+"""
+
+import os
+
+import pytest
+
+from email_analyzer import EmailAnalyzer
+from email_analyzer.mailbox_sources import MboxReader, is_maildir, is_mbox_file, iter_maildir_message_paths
+
+FIRST_EMAIL = (b'Subject: first\n'
+               b'\n'
+               b'From the start, this line is quoted.\n'
+               b'>From this one too, with mboxrd quoting.\n'
+               b'Not a From line.\n')
+SECOND_EMAIL = (b'Subject: second\n'
+                b'\n'
+                b'body\n')
+
+
+def build_mbox(line_ending: bytes) -> bytes:
+    """
+    Builds an mbox archive of FIRST_EMAIL and SECOND_EMAIL, quoting their '>*From ' lines as the mboxrd format does
+    and ending every email with a blank line.
+
+    Args:
+        line_ending (bytes): The line ending of the archive.
+
+    Returns:
+        bytes: The content of the archive.
+    """
+    quoted_first_email = FIRST_EMAIL.replace(b'\n>From ', b'\n>>From ').replace(b'\nFrom ', b'\n>From ')
+    archive = (b'From alice@example.com Mon Jan  1 00:00:00 2024\n' + quoted_first_email + b'\n'
+               b'From bob@example.com Tue Jan  2 00:00:00 2024\n' + SECOND_EMAIL + b'\n')
+    return archive.replace(b'\n', line_ending)
+
+
+@pytest.mark.parametrize('line_ending', (b'\n', b'\r\n'), ids=('lf', 'crlf'))
+def test_mbox_is_split_and_unquoted(tmp_path, line_ending):
+    mbox_path = tmp_path / 'archive'
+    mbox_path.write_bytes(build_mbox(line_ending))
+
+    mbox_reader = MboxReader(str(mbox_path))
+    try:
+        raw_emails = [mbox_reader.read_message(offset, length) for offset, length in mbox_reader.iter_message_spans()]
+    finally:
+        mbox_reader.close()
+
+    # The line break preceding a separator belongs to the separator, and one '>' is removed from quoted lines
+    assert raw_emails == [FIRST_EMAIL.replace(b'\n', line_ending), SECOND_EMAIL.replace(b'\n', line_ending)]
+
+
+def test_message_spans_locate_the_emails(tmp_path):
+    archive = build_mbox(b'\n')
+    mbox_path = tmp_path / 'archive.mbox'
+    mbox_path.write_bytes(archive)
+
+    mbox_reader = MboxReader(str(mbox_path))
+    try:
+        spans = list(mbox_reader.iter_message_spans())
+    finally:
+        mbox_reader.close()
+
+    assert [archive[offset:offset + length].split(b'\n', 1)[0] for offset, length in spans] == \
+        [b'Subject: first', b'Subject: second']
+
+
+def test_empty_mbox_holds_no_email(tmp_path):
+    mbox_path = tmp_path / 'empty.mbox'
+    mbox_path.write_bytes(b'')
+
+    mbox_reader = MboxReader(str(mbox_path))
+    try:
+        assert list(mbox_reader.iter_message_spans()) == []
+    finally:
+        mbox_reader.close()
+
+
+def test_mbox_detection(tmp_path):
+    (tmp_path / 'archive.MBOX').write_bytes(b'')
+    (tmp_path / 'archive').write_bytes(build_mbox(b'\n'))
+    (tmp_path / 'message.txt').write_bytes(SECOND_EMAIL)
+
+    assert is_mbox_file(str(tmp_path / 'archive.MBOX'))
+    assert is_mbox_file(str(tmp_path / 'archive'))
+    assert not is_mbox_file(str(tmp_path / 'message.txt'))
+
+
+def test_analyzer_reports_mbox_emails_with_their_offsets(tmp_path):
+    archive = build_mbox(b'\r\n')
+    mbox_path = tmp_path / 'archive.mbox'
+    mbox_path.write_bytes(archive)
+
+    metrics = list(EmailAnalyzer(str(mbox_path), detect_attachment_types=False).iter_metrics())
+
+    assert [mail_item_metrics['Subject'] for mail_item_metrics in metrics] == ['first', 'second']
+    assert all(mail_item_metrics['File Path'] == str(mbox_path) for mail_item_metrics in metrics)
+    assert archive[metrics[1]['Message Offset']:].startswith(b'Subject: second')
+
+
+def test_maildir_emails_are_listed_with_their_folders(tmp_path):
+    for folder in ('', '.Archive/'):
+        for sub_directory in ('cur', 'new', 'tmp'):
+            (tmp_path / folder / sub_directory).mkdir(parents=True)
+    (tmp_path / 'new' / '1.host').write_bytes(SECOND_EMAIL)
+    (tmp_path / 'cur' / '2.host').write_bytes(SECOND_EMAIL)
+    (tmp_path / 'cur' / '.dovecot.index').write_bytes(b'')
+    (tmp_path / 'tmp' / '3.host').write_bytes(SECOND_EMAIL)
+    (tmp_path / '.Archive' / 'cur' / '4.host').write_bytes(SECOND_EMAIL)
+
+    assert is_maildir(str(tmp_path))
+    assert not is_maildir(str(tmp_path / 'cur'))
+    assert sorted(os.path.basename(path) for path in iter_maildir_message_paths(str(tmp_path))) == \
+        ['1.host', '2.host', '4.host']
+    assert len(list(EmailAnalyzer(str(tmp_path), detect_attachment_types=False).iter_metrics())) == 3
@@ -0,0 +1,137 @@
+"""
+Module: test_metrics_index.py
+
+This module checks that the persistent metrics index serves the stored metrics of unchanged email files only, and
+that its entries are invalidated when a file is modified, when the analyzer options change, and when a file is
+deleted.
+
+Author: S S R C Kashyap
+Email: 1kasyap97@gmail.com
+Reviewer: Daniel Caffrey
+Email: dcaffrey@topsec.com
+"""
+
+import os
+import sqlite3
+from contextlib import closing
+
+import pytest
+
+from email_analyzer import EmailAnalyzer
+from email_analyzer.metrics_index import MetricsIndex
+
+
+def touch(file_path):
+    """
+    Moves the modification time of a file forward, so the change is seen whatever the timestamp resolution.
+    """
+    file_stat = os.stat(file_path)
+    os.utime(file_path, ns=(file_stat.st_atime_ns, file_stat.st_mtime_ns + 2_000_000_000))
+
+
+@pytest.fixture
+def index_path(tmp_path) -> str:
+    """
+    Returns the path of an index that does not exist yet, next to the directory of the mail_directory fixture.
+    """
+    return str(tmp_path / 'index.sqlite3')
+
+
+def run_indexed(directory, index_path: str, **analyzer_options) -> tuple:
+    """
+    Analyzes a directory with a metrics index.
+
+    Returns:
+        tuple: The subjects keyed by file name, and the number of emails served from the index.
+    """
+    mail_analyzer = EmailAnalyzer(str(directory), index_path=index_path, detect_attachment_types=False,
+                                  **analyzer_options)
+    subjects = {os.path.basename(mail_item_metrics['File Path']): mail_item_metrics['Subject']
+                for mail_item_metrics in mail_analyzer.iter_metrics()}
+    return subjects, mail_analyzer.get_directory_report()['Messages Served From Index']
+
+
+def indexed_file_names(index_path: str) -> list:
+    """
+    Returns the sorted names of the files with an entry in an index.
+    """
+    with closing(sqlite3.connect(index_path)) as connection:
+        return sorted(os.path.basename(file_path) for (file_path,) in
+                      connection.execute('SELECT file_path FROM email_metrics'))
+
+
+def test_unchanged_files_are_served_from_the_index(mail_directory, index_path):
+
+    assert run_indexed(mail_directory, index_path) == ({'a.eml': 'a', 'b.eml': 'b', 'c.eml': 'c'}, 0)
+    assert run_indexed(mail_directory, index_path) == ({'a.eml': 'a', 'b.eml': 'b', 'c.eml': 'c'}, 3)
+
+
+def test_modified_file_is_analyzed_again(mail_directory, index_path, write_email):
+    run_indexed(mail_directory, index_path)
+
+    write_email(mail_directory / 'b.eml', 'b2')
+    touch(mail_directory / 'b.eml')
+
+    assert run_indexed(mail_directory, index_path) == ({'a.eml': 'a', 'b.eml': 'b2', 'c.eml': 'c'}, 2)
+    assert run_indexed(mail_directory, index_path) == ({'a.eml': 'a', 'b.eml': 'b2', 'c.eml': 'c'}, 3)
+
+
+def test_deleted_file_is_dropped_from_the_index(mail_directory, index_path):
+    run_indexed(mail_directory, index_path)
+    assert indexed_file_names(index_path) == ['a.eml', 'b.eml', 'c.eml']
+
+    os.remove(mail_directory / 'c.eml')
+
+    assert run_indexed(mail_directory, index_path) == ({'a.eml': 'a', 'b.eml': 'b'}, 2)
+    assert indexed_file_names(index_path) == ['a.eml', 'b.eml']
+
+
+def test_interrupted_run_does_not_drop_entries(mail_directory, index_path):
+    run_indexed(mail_directory, index_path)
+
+    metrics_stream = EmailAnalyzer(str(mail_directory), index_path=index_path,
+                                   detect_attachment_types=False).iter_metrics()
+    next(metrics_stream)
+    metrics_stream.close()
+
+    assert indexed_file_names(index_path) == ['a.eml', 'b.eml', 'c.eml']
+
+
+def test_changed_options_invalidate_the_entries(mail_directory, index_path):
+    run_indexed(mail_directory, index_path)
+
+    assert run_indexed(mail_directory, index_path, headers_only=True)[1] == 0
+
+
+def test_touched_file_is_analyzed_again_without_content_hash(mail_directory, index_path):
+    run_indexed(mail_directory, index_path)
+
+    touch(mail_directory / 'a.eml')
+
+    assert run_indexed(mail_directory, index_path)[1] == 2
+
+
+def test_touched_file_is_served_by_content_hash(mail_directory, index_path):
+    run_indexed(mail_directory, index_path, use_content_hash=True)
+
+    touch(mail_directory / 'a.eml')
+
+    assert run_indexed(mail_directory, index_path, use_content_hash=True)[1] == 3
+
+
+def test_prune_keeps_the_entries_of_other_directories(tmp_path, write_email):
+    for directory_name in ('mail', 'mail2'):
+        (tmp_path / directory_name).mkdir()
+        write_email(tmp_path / directory_name / 'a.eml', directory_name)
+    metrics_index = MetricsIndex(str(tmp_path / 'index.sqlite3'))
+    try:
+        for directory_name in ('mail', 'mail2'):
+            file_path = str(tmp_path / directory_name / 'a.eml')
+            metrics_index.store(file_path, os.stat(file_path), {'Subject': directory_name})
+
+        # 'mail2' starts with 'mail', but is not inside it
+        assert metrics_index.prune(str(tmp_path / 'mail'), []) == 1
+        file_path = str(tmp_path / 'mail2' / 'a.eml')
+        assert metrics_index.lookup(file_path, os.stat(file_path)) == {'Subject': 'mail2'}
+    finally:
+        metrics_index.close()
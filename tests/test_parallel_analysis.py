@@ -0,0 +1,88 @@
+"""
+Module: test_parallel_analysis.py
+
+This module checks the contract of EmailAnalyzer.analyze_parallel: the metrics are the same as those of
+iter_metrics, they are yielded in file name order when ordered is True and all of them as their chunks complete when
+it is False, the pool options are validated, and the throughput of the run is reported.
+
+Author: S S R C Kashyap
+Email: 1kasyap97@gmail.com
+Reviewer: Daniel Caffrey
+Email: dcaffrey@topsec.com
+"""
+
+import os
+
+import pytest
+
+from email_analyzer import EmailAnalyzer
+
+# The subjects of the emails of the many_mail_directory fixture, written in reverse file name order
+SUBJECTS = tuple(f'{index:02d}' for index in range(10))
+
+
+@pytest.fixture
+def many_mail_directory(tmp_path, write_email):
+    """
+    Builds a directory of ten minimal emails, created in reverse file name order so that the directory listing
+    order is unlikely to match the file name order.
+    """
+    for subject in reversed(SUBJECTS):
+        write_email(tmp_path / f'{subject}.eml', subject)
+    return tmp_path
+
+
+def file_names(metrics: list) -> list:
+    """
+    Returns the file names of the analyzed emails, in the order of their metrics.
+    """
+    return [os.path.basename(mail_item_metrics['File Path']) for mail_item_metrics in metrics]
+
+
+@pytest.mark.parametrize('max_workers, chunk_size', ((1, 1), (2, 1), (2, 3), (3, 64)))
+def test_ordered_metrics_are_yielded_in_file_name_order(many_mail_directory, max_workers, chunk_size):
+    mail_analyzer = EmailAnalyzer(str(many_mail_directory), detect_attachment_types=False)
+
+    metrics = list(mail_analyzer.analyze_parallel(max_workers=max_workers, chunk_size=chunk_size))
+
+    assert file_names(metrics) == [f'{subject}.eml' for subject in SUBJECTS]
+    assert [mail_item_metrics['Subject'] for mail_item_metrics in metrics] == list(SUBJECTS)
+
+
+@pytest.mark.parametrize('chunk_size', (1, 4))
+def test_unordered_metrics_cover_every_email(many_mail_directory, chunk_size):
+    mail_analyzer = EmailAnalyzer(str(many_mail_directory), detect_attachment_types=False)
+
+    metrics = list(mail_analyzer.analyze_parallel(max_workers=2, chunk_size=chunk_size, ordered=False))
+
+    assert sorted(file_names(metrics)) == [f'{subject}.eml' for subject in SUBJECTS]
+
+
+def test_parallel_metrics_match_iter_metrics(sample_mail_directory):
+    mail_analyzer = EmailAnalyzer(str(sample_mail_directory), detect_attachment_types=False)
+
+    sequential_metrics = sorted(mail_analyzer.iter_metrics(),
+                                key=lambda mail_item_metrics: mail_item_metrics['File Path'])
+    parallel_metrics = list(mail_analyzer.analyze_parallel(max_workers=2, chunk_size=2))
+
+    assert parallel_metrics == sequential_metrics
+
+
+def test_throughput_is_reported(many_mail_directory):
+    mail_analyzer = EmailAnalyzer(str(many_mail_directory), detect_attachment_types=False)
+
+    list(mail_analyzer.analyze_parallel(max_workers=2, chunk_size=3))
+    report = mail_analyzer.get_directory_report()
+
+    assert (report['Messages Processed'], report['Messages Served From Index'], report['Workers']) == (10, 0, 2)
+    assert report['Elapsed Seconds'] > 0
+    assert report['Messages Per Second'] > 0
+
+
+@pytest.mark.parametrize('options', ({'max_workers': 0}, {'chunk_size': 0}, {'max_workers': -1, 'chunk_size': 1}))
+def test_invalid_pool_options_are_rejected(many_mail_directory, options):
+    mail_analyzer = EmailAnalyzer(str(many_mail_directory), detect_attachment_types=False)
+
+    with pytest.raises(ValueError):
+        next(mail_analyzer.analyze_parallel(**options))
+    assert mail_analyzer.get_directory_report() == {}
@@ -0,0 +1,80 @@
+"""
+Module: test_result_writers.py
+
+This module checks that the NDJSON, CSV and Parquet writers write every record once, in order, whatever their chunk
+size, and that the output format is inferred from the extension of the output file.
+
+Author: S S R C Kashyap
+Email: 1kasyap97@gmail.com
+Reviewer: Daniel Caffrey
+Email: dcaffrey@topsec.com
+"""
+
+import csv
+import io
+import json
+
+import pytest
+
+from email_analyzer import EmailMetricsRecord, create_metrics_writer
+from email_analyzer.result_writers import CSV_COLUMNS, CSVWriter, NDJSONWriter
+
+METRICS = [{'File Path': f'{index}.eml', 'Subject': f'Subject {index}', 'Total Message Size': 100 + index,
+            'Has Attachments': index % 2 == 1,
+            'Attachments': [{'File Name': f'{index}.pdf', 'Detected Type': 'application/pdf', 'Decoded Size': 10}]
+            if index % 2 == 1 else []}
+           for index in range(5)]
+
+
+@pytest.mark.parametrize('chunk_size', (1, 2, 1000))
+def test_ndjson_records(chunk_size):
+    output = io.StringIO()
+
+    with create_metrics_writer(output, output_format='ndjson', chunk_size=chunk_size) as metrics_writer:
+        assert metrics_writer.write_all(METRICS) == len(METRICS)
+
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert records == [EmailMetricsRecord.from_metrics(mail_item_metrics).as_dict() for mail_item_metrics in METRICS]
+    assert records[1]['attachments'][0]['file_name'] == '1.pdf'
+
+
+@pytest.mark.parametrize('chunk_size', (1, 3))
+def test_csv_records(chunk_size):
+    output = io.StringIO()
+
+    with create_metrics_writer(output, output_format='csv', chunk_size=chunk_size) as metrics_writer:
+        metrics_writer.write_all(METRICS)
+
+    rows = list(csv.DictReader(io.StringIO(output.getvalue())))
+    assert tuple(rows[0]) == CSV_COLUMNS
+    assert [row['subject'] for row in rows] == [mail_item_metrics['Subject'] for mail_item_metrics in METRICS]
+    assert [row['attachment_count'] for row in rows] == ['0', '1', '0', '1', '0']
+    assert rows[3]['attachment_file_names'] == '3.pdf'
+
+
+def test_parquet_records(tmp_path):
+    parquet = pytest.importorskip('pyarrow.parquet')
+    output_path = tmp_path / 'metrics.parquet'
+
+    with create_metrics_writer(str(output_path), chunk_size=2) as metrics_writer:
+        metrics_writer.write_all(METRICS)
+
+    table = parquet.read_table(output_path)
+    assert table.column('subject').to_pylist() == [mail_item_metrics['Subject'] for mail_item_metrics in METRICS]
+    assert [len(attachments) for attachments in table.column('attachments').to_pylist()] == [0, 1, 0, 1, 0]
+
+
+@pytest.mark.parametrize('file_name, writer_class', (('metrics.ndjson', NDJSONWriter), ('metrics.JSONL', NDJSONWriter),
+                                                     ('metrics.csv', CSVWriter)))
+def test_format_is_inferred_from_the_extension(tmp_path, file_name, writer_class):
+    metrics_writer = create_metrics_writer(str(tmp_path / file_name))
+    try:
+        assert isinstance(metrics_writer, writer_class)
+    finally:
+        metrics_writer.close()
+
+
+@pytest.mark.parametrize('output, output_format', (('metrics.txt', None), ('metrics.csv', 'xml')))
+def test_unsupported_format_is_rejected(tmp_path, output, output_format):
+    with pytest.raises(ValueError):
+        create_metrics_writer(str(tmp_path / output), output_format=output_format)